@@ -0,0 +1,119 @@
+import itertools
+import threading
+from collections.abc import Iterable, Iterator
+
+from .caching import get_generation
+from .models import Offer, OfferAlert, SavedSearch
+
+SAVED_SEARCH_GENERATION_KEY = "offers:saved-searches:generation"
+
+# (size, property_type, sharing), blanks and None being wildcards as on SavedSearch
+type IndexKey = tuple[str, str, bool | None]
+# (min_price, max_price, saved search id, user id)
+type Interval = tuple[float, float, int, int]
+
+
+class IntervalTree:
+    """A centered interval tree over closed price intervals, answering which contain a price.
+
+    Each node keeps the intervals containing its center, sorted by lower bound and by upper
+    bound, and passes the intervals entirely below or above it to its children. A lookup
+    descends a single path, and at each node reads matching intervals only, stopping at the
+    first that does not match, so it costs O(log n + k) for k matches.
+    """
+
+    __slots__ = ("center", "by_min", "by_max", "below", "above")
+
+    def __init__(self, intervals: list[Interval]) -> None:
+        # The median endpoint, so each side holds at most half the intervals
+        endpoints = sorted(bound for interval in intervals for bound in interval[:2])
+        self.center = endpoints[len(endpoints) // 2]
+        below = [interval for interval in intervals if interval[1] < self.center]
+        above = [interval for interval in intervals if interval[0] > self.center]
+        here = [interval for interval in intervals if interval[0] <= self.center <= interval[1]]
+        self.by_min = sorted(here, key=lambda interval: interval[0])
+        self.by_max = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.below = IntervalTree(below) if below else None
+        self.above = IntervalTree(above) if above else None
+
+    def stab(self, price: int) -> Iterator[Interval]:
+        """Yield the intervals containing the price."""
+        node: IntervalTree | None = self
+        while node is not None:
+            if price < node.center:
+                # Every interval here ends at or above the center, so past the price
+                yield from itertools.takewhile(lambda interval: interval[0] <= price, node.by_min)
+                node = node.below
+            else:
+                # Every interval here starts at or below the center, so before the price
+                yield from itertools.takewhile(lambda interval: interval[1] >= price, node.by_max)
+                node = node.above
+
+
+class SavedSearchIndex:
+    """An inverted index from offer attributes to the saved searches they match.
+
+    Searches are bucketed on their exact-match criteria, and each bucket keeps its price
+    intervals in an IntervalTree. Matching an offer probes the (at most 8) buckets its
+    attributes or wildcards select, and looks the price up in each, so the work grows with
+    the number of matches rather than the number of searches.
+    """
+
+    def __init__(self, searches: Iterable[SavedSearch]) -> None:
+        buckets: dict[IndexKey, list[Interval]] = {}
+        for search in searches:
+            key = (search.size, search.property_type, search.sharing)
+            buckets.setdefault(key, []).append(
+                (
+                    search.min_price or 0,
+                    float("inf") if search.max_price is None else search.max_price,
+                    search.pk,
+                    search.user_id,
+                )
+            )
+        self._buckets = {key: IntervalTree(intervals) for key, intervals in buckets.items()}
+
+    def match(self, offer: Offer) -> list[tuple[int, int]]:
+        """Return `(saved search id, user id)` for every search the offer matches."""
+        matches: list[tuple[int, int]] = []
+        for key in itertools.product(
+            (offer.size, ""), (offer.property_type, ""), (offer.sharing, None)
+        ):
+            if (tree := self._buckets.get(key)) is not None:
+                matches.extend(
+                    (search_id, user_id) for _, _, search_id, user_id in tree.stab(offer.price)
+                )
+        return matches
+
+
+_index: SavedSearchIndex | None = None
+_index_generation: int | None = None
+_index_lock = threading.Lock()
+
+
+def get_saved_search_index() -> SavedSearchIndex:
+    """Return this process's index, rebuilding it if any process has changed saved searches.
+
+    Changes are seen through the generation in the default cache, so only by the processes
+    sharing it, see the `offers.W001` check.
+    """
+    global _index, _index_generation
+    # Read the generation before the searches, so a change racing the rebuild forces another
+    generation = get_generation(SAVED_SEARCH_GENERATION_KEY)
+    with _index_lock:
+        if _index is None or _index_generation != generation:
+            _index = SavedSearchIndex(SavedSearch.objects.iterator())
+            _index_generation = generation
+        return _index
+
+
+def queue_offer_alerts(offer: Offer) -> int:
+    """Queue an alert in the outbox for each saved search matching a new offer."""
+    alerts = [
+        OfferAlert(saved_search_id=search_id, offer=offer)
+        for search_id, user_id in get_saved_search_index().match(offer)
+        # Nobody needs telling about their own offer
+        if user_id != offer.author_id
+    ]
+    OfferAlert.objects.bulk_create(alerts)
+    return len(alerts)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class OffersConfig(AppConfig):
     name = "offers"
+
+    def ready(self) -> None:
+        # Connect the signal receivers and register the system checks
+        from . import checks, signals  # noqa: F401
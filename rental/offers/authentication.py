@@ -0,0 +1,88 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from rest_framework.authentication import TokenAuthentication
+
+from .caching import get_generation, invalidate_generation
+
+
+def token_user_generation_key(user_id: Any) -> str:
+    return f"offers:token-users:{user_id}:generation"
+
+
+def revoke_user_tokens(user_id: Any) -> None:
+    """Stop every process from serving the user's cached tokens, see TokenUserCache."""
+    invalidate_generation(token_user_generation_key(user_id))
+
+
+def copy_credentials(user: Any, token: Any) -> tuple[Any, Any]:
+    # A view changing the user it was handed must not change it for the requests to come
+    user, token = copy.copy(user), copy.copy(token)
+    token.user = user
+    return user, token
+
+
+class TokenUserCache:
+    """A bounded LRU mapping of token keys to resolved `(user, token)` pairs.
+
+    The entries live in process memory, so each is stored with the user's revocation generation
+    and only served while that generation in the default cache, which every process shares, is
+    unchanged. Entries also expire after `ttl` seconds. Every hit returns fresh copies, so
+    concurrent requests never share a mutable user.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, int, tuple[Any, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[Any, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, generation, (user, token) = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Outside the lock, as it may be a round trip to a shared cache
+        if get_generation(token_user_generation_key(user.pk)) != generation:
+            self.evict(key)
+            return None
+        return copy_credentials(user, token)
+
+    def set(self, key: str, credentials: tuple[Any, Any]) -> None:
+        generation = get_generation(token_user_generation_key(credentials[0].pk))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, generation, credentials)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_user_cache = TokenUserCache(maxsize=1024, ttl=5 * 60)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that resolves known tokens without querying the database."""
+
+    def authenticate_credentials(self, key: str) -> tuple[Any, Any]:
+        if (credentials := token_user_cache.get(key)) is not None:
+            return credentials
+        # Raises AuthenticationFailed for unknown tokens and inactive users, neither is cached
+        credentials = super().authenticate_credentials(key)
+        token_user_cache.set(key, credentials)
+        return copy_credentials(*credentials)
@@ -0,0 +1,101 @@
+import hashlib
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import Favorite
+
+# The generations live in the default cache, which every process must share for a write in one
+# to invalidate the others, see the `offers.W001` check
+OFFER_LIST_GENERATION_KEY = "offers:list:generation"
+FAVORITE_OFFER_IDS_TIMEOUT = 60 * 60
+# Entries are invalidated by bumping the generation, the timeout only bounds how long
+# unreachable entries from older generations linger in the cache.
+OFFER_LIST_CACHE_TIMEOUT = 60 * 60
+
+
+class CachedResponse(Response):
+    """A response whose body has already been rendered, e.g. replayed from the cache."""
+
+    def __init__(self, content: bytes, content_type: str, **kwargs: Any) -> None:
+        super().__init__(content_type=content_type, **kwargs)
+        self.cached_content = content
+
+    @property
+    def rendered_content(self) -> bytes:  # type: ignore[override]
+        assert self.content_type is not None
+        self["Content-Type"] = self.content_type
+        return self.cached_content
+
+
+def get_generation(key: str) -> int:
+    # A missing counter restarts from the clock rather than from zero, so it cannot come back
+    # to a value that entries from before its eviction are still keyed on
+    generation: int = cache.get_or_set(key, time.time_ns, timeout=None) or 0
+    return generation
+
+
+def bump_generation(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_generation(key: str) -> None:
+    """Bump the generation right away, and again once the transaction commits.
+
+    Whatever is rebuilt in between still reads the old rows, and would otherwise be kept
+    under the new generation.
+    """
+    bump_generation(key)
+    transaction.on_commit(lambda: bump_generation(key))
+
+
+def get_offer_list_generation() -> int:
+    return get_generation(OFFER_LIST_GENERATION_KEY)
+
+
+def bump_offer_list_generation() -> None:
+    """Invalidate every cached offer listing, called whenever offers are written."""
+    invalidate_generation(OFFER_LIST_GENERATION_KEY)
+
+
+def offer_list_cache_key(request: Request, params: Iterable[str]) -> str:
+    """Key a listing on the generation, the accepted media type, and the given query parameters.
+
+    Other parameters, e.g. a cache-busting `?_=`, do not get entries of their own. The values
+    are sorted, so `?a=1&b=2` and `?b=2&a=1` share an entry.
+    """
+    query = urlencode(
+        sorted((key, sorted(request.query_params.getlist(key))) for key in set(params)),
+        doseq=True,
+    )
+    digest = hashlib.md5(
+        f"{request.accepted_media_type}?{query}".encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"offers:list:{get_offer_list_generation()}:{digest}"
+
+
+def favorite_offer_ids_key(user_id: int) -> str:
+    return f"offers:favorites:{user_id}"
+
+
+def get_favorite_offer_ids(user_id: int) -> set[int]:
+    """Return the ids of every offer the user has favorited, cached until they change."""
+    key = favorite_offer_ids_key(user_id)
+    if (offer_ids := cache.get(key)) is None:
+        offer_ids = set(Favorite.objects.filter(user_id=user_id).values_list("offer_id", flat=True))
+        cache.set(key, offer_ids, FAVORITE_OFFER_IDS_TIMEOUT)
+    result: set[int] = offer_ids
+    return result
+
+
+def invalidate_favorite_offer_ids(user_id: int) -> None:
+    cache.delete(favorite_offer_ids_key(user_id))
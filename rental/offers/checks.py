@@ -0,0 +1,36 @@
+from collections.abc import Sequence
+from typing import Any
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.checks import CheckMessage, Tags, Warning, register
+
+# Backends whose entries each process keeps to itself
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(
+    app_configs: Sequence[AppConfig] | None, **kwargs: Any
+) -> list[CheckMessage]:
+    """Warn when the default cache is not shared between processes.
+
+    The cached offer listings and the saved search index are invalidated by bumping a
+    generation in it, so with a per-process cache a write in one process leaves the others
+    serving stale listings until OFFER_LIST_CACHE_TIMEOUT.
+    """
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process, so offer writes only invalidate the "
+            "cached listings of the process making them, and saved searches are only alerted on "
+            "by that process. Revoked tokens stay cached by the other processes until they expire.",
+            hint="Use a shared cache such as Redis, e.g. by setting REDIS_URL, or serve the "
+            "API from a single process.",
+            id="offers.W001",
+        )
+    ]
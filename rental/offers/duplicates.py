@@ -0,0 +1,117 @@
+import hashlib
+import random
+import re
+import struct
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Offer, OfferDuplicate, OfferSignature, OfferSignatureBand
+
+SHINGLE_SIZE = 5
+NUM_HASHES = 64
+# 16 bands of 4 rows: offers with an estimated similarity of 0.8 become candidates with
+# probability ~0.9998, offers at 0.3 with ~0.12
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // NUM_BANDS
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed, signatures must stay comparable across processes and deployments
+_rng = random.Random(0x0FFE75)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_HASHES)
+]
+_SIGNATURE_FORMAT = f"<{NUM_HASHES}I"
+
+
+def shingles(offer: Offer) -> set[str]:
+    """Overlapping character n-grams of the offer's normalized address and text."""
+    text = re.sub(r"\W+", " ", f"{offer.address} {offer.text}".lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(offer: Offer) -> list[int] | None:
+    """Return the offer's MinHash signature, or None if it has no text to compare."""
+    if not (grams := shingles(offer)):
+        return None
+    hashes = [
+        int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest()) for gram in grams
+    ]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS
+    ]
+
+
+def band_buckets(signature: list[int]) -> list[int]:
+    """Hash each band of the signature to a signed 64-bit bucket id."""
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f"<{ROWS_PER_BAND}I", *rows), digest_size=8)
+        buckets.append(int.from_bytes(digest.digest(), signed=True))
+    return buckets
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimate the Jaccard similarity of two offers' shingles from their signatures."""
+    return sum(x == y for x, y in zip(a, b, strict=True)) / NUM_HASHES
+
+
+def flag_duplicates(offer: Offer) -> list[OfferDuplicate]:
+    """Index the offer's signature and flag the already indexed offers it nearly duplicates.
+
+    Candidates are only the offers sharing at least one LSH band bucket, found through the
+    (band, bucket) index, so the cost does not grow with the number of offers indexed. An offer
+    indexed again, e.g. after an edit, has its signature, bands and flags replaced. Each flag
+    points from the later offer of a pair to the earlier one.
+    """
+    duplicates = []
+    if (signature := minhash(offer)) is not None:
+        buckets = band_buckets(signature)
+        candidate_ids = (
+            OfferSignatureBand.objects.filter(
+                reduce(or_, (Q(band=band, bucket=bucket) for band, bucket in enumerate(buckets)))
+            )
+            .exclude(offer_id=offer.pk)
+            .values("offer_id")
+            .distinct()
+        )
+        for candidate in OfferSignature.objects.filter(offer_id__in=candidate_ids):
+            score = similarity(signature, unpack_signature(candidate.minhash))
+            if score >= SIMILARITY_THRESHOLD:
+                later, earlier = sorted([offer.pk, candidate.offer_id], reverse=True)
+                duplicates.append(
+                    OfferDuplicate(offer_id=later, original_id=earlier, similarity=score)
+                )
+
+    with transaction.atomic():
+        OfferDuplicate.objects.filter(Q(offer=offer) | Q(original=offer)).delete()
+        OfferSignatureBand.objects.filter(offer=offer).delete()
+        if signature is None:
+            # Nothing left to compare, e.g. the text was cleared
+            OfferSignature.objects.filter(offer=offer).delete()
+            return []
+        OfferSignature.objects.update_or_create(
+            offer=offer, defaults={"minhash": pack_signature(signature)}
+        )
+        OfferSignatureBand.objects.bulk_create(
+            OfferSignatureBand(offer=offer, band=band, bucket=bucket)
+            for band, bucket in enumerate(buckets)
+        )
+        OfferDuplicate.objects.bulk_create(duplicates, ignore_conflicts=True)
+    return duplicates
+
+
+def pack_signature(signature: list[int]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data: bytes | memoryview) -> list[int]:
+    return list(struct.unpack(_SIGNATURE_FORMAT, data))
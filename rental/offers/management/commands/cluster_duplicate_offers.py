@@ -0,0 +1,54 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from offers.duplicates import flag_duplicates
+from offers.models import Offer, OfferDuplicate, OfferSignature, OfferSignatureBand
+
+
+class Command(BaseCommand):
+    help = "Re-index every offer's MinHash signature and cluster near-duplicate offers."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--show", type=int, default=10, help="Number of largest clusters to print."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # Readers see the previous index until the new one is complete, and a failure keeps it
+        with transaction.atomic():
+            clusters = self.rebuild(options["chunk_size"])
+
+        largest = sorted(clusters, key=len, reverse=True)
+        self.stdout.write(self.style.SUCCESS(f"Found {len(largest)} duplicate clusters"))
+        for cluster in largest[: options["show"]]:
+            self.stdout.write(f"{len(cluster)} offers: {sorted(cluster)}")
+
+    def rebuild(self, chunk_size: int) -> list[list[int]]:
+        """Re-index every offer, returning the clusters of offer ids found."""
+        OfferDuplicate.objects.all().delete()
+        OfferSignature.objects.all().delete()
+        OfferSignatureBand.objects.all().delete()
+
+        # Union-find over offer ids, the only per-offer state kept in memory
+        parent: dict[int, int] = {}
+
+        def find(offer_id: int) -> int:
+            root = parent.setdefault(offer_id, offer_id)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        offers = Offer.objects.order_by("id").only("id", "address", "text")
+        # A single pass in id order: each offer is compared only against the offers before it
+        for offer in offers.iterator(chunk_size=chunk_size):
+            for duplicate in flag_duplicates(offer):
+                parent[find(offer.pk)] = find(duplicate.original_id)
+
+        clusters: dict[int, list[int]] = {}
+        for offer_id in parent:
+            clusters.setdefault(find(offer_id), []).append(offer_id)
+        return list(clusters.values())
@@ -0,0 +1,16 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from offers.sync import expire_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of offers deleted longer ago than the sync retention window. "
+        "Meant to be run periodically, e.g. from cron."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = expire_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired tombstones"))
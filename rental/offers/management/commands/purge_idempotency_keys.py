@@ -0,0 +1,13 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from offers.idempotency import expire_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys past their TTL. Meant to be run periodically, e.g. from cron."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = expire_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired idempotency keys"))
@@ -0,0 +1,13 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from offers.stats import rebuild_price_buckets
+
+
+class Command(BaseCommand):
+    help = "Recompute the offer price buckets behind /offers/stats/ from the offers table."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = rebuild_price_buckets()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} price buckets"))
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-19 15:22
+
+from django.db import migrations, models
+from django.db.models import Count, F, Value
+from django.db.models.functions import Least
+
+# Frozen copies of the bucket layout in offers.stats at the time of this migration
+PRICE_BUCKET_WIDTH = 250
+PRICE_BUCKET_COUNT = 40
+
+
+def populate_price_buckets(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    OfferPriceBucket = apps.get_model('offers', 'OfferPriceBucket')
+    rows = (
+        Offer.objects.order_by()
+        .annotate(bucket=Least(F('price') / PRICE_BUCKET_WIDTH, Value(PRICE_BUCKET_COUNT - 1)))
+        .values('size', 'property_type', 'bucket')
+        .annotate(count=Count('id'))
+    )
+    OfferPriceBucket.objects.bulk_create(OfferPriceBucket(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferPriceBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('ST', 'Studio'), ('1BR', '1 bedroom'), ('2BR', '2 bedrooms'), ('3BR', '3 bedrooms'), ('MBR', '3+ bedrooms')], max_length=100)),
+                ('property_type', models.CharField(choices=[('H', 'house'), ('APT', 'apartment')], max_length=100)),
+                ('bucket', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['size', 'property_type', 'bucket'],
+                'constraints': [models.UniqueConstraint(fields=('size', 'property_type', 'bucket'), name='unique_offer_price_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_price_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 15:25
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated(apps, schema_editor):
+    # Existing rows were stamped with the migration time, their creation time is more honest
+    Offer = apps.get_model('offers', 'Offer')
+    Offer.objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0002_offer_price_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offer_id', models.BigIntegerField(unique=True)),
+                ('deleted', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['deleted'],
+            },
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_updated, migrations.RunPython.noop),
+    ]
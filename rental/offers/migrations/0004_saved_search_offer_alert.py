@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 15:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0003_offer_updated_tombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_price', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_price', models.PositiveIntegerField(blank=True, null=True)),
+                ('size', models.CharField(blank=True, choices=[('ST', 'Studio'), ('1BR', '1 bedroom'), ('2BR', '2 bedrooms'), ('3BR', '3 bedrooms'), ('MBR', '3+ bedrooms')], default='', max_length=100)),
+                ('property_type', models.CharField(blank=True, choices=[('H', 'house'), ('APT', 'apartment')], default='', max_length=100)),
+                ('sharing', models.BooleanField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'saved searches',
+                'ordering': ['created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OfferAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='offers.offer')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='offers.savedsearch')),
+            ],
+            options={
+                'ordering': ['created'],
+                'indexes': [models.Index(condition=models.Q(('sent__isnull', True)), fields=['created'], name='offer_alert_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 15:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0004_saved_search_offer_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferSignature',
+            fields=[
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='offers.offer')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OfferDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_of', to='offers.offer')),
+                ('original', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicates', to='offers.offer')),
+            ],
+            options={
+                'ordering': ['created'],
+                'constraints': [models.UniqueConstraint(fields=('offer', 'original'), name='unique_offer_duplicate')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OfferSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='offers.offer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='offer_signature_band_idx')],
+            },
+        ),
+    ]
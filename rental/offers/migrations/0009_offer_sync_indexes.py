@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 17:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0008_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='offer',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='offertombstone',
+            name='deleted',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['updated', 'id'], name='offer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offertombstone',
+            index=models.Index(fields=['deleted', 'id'], name='offer_tombstone_deleted_idx'),
+        ),
+    ]
@@ -1,5 +1,58 @@
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
 from django.conf import settings
-from django.db import models
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import NotSupportedError, models, transaction
+from django.utils import timezone
+
+
+class OfferQuerySet(models.QuerySet["Offer"]):
+    def owned_by(self, user: AbstractBaseUser | AnonymousUser) -> OfferQuerySet:
+        # Filter on the `author_id` column so the user row is never joined or loaded. Anonymous
+        # users own nothing, their pk is None.
+        return self.filter(author_id=user.pk) if user.pk is not None else self.none()
+
+    def update(self, **kwargs: Any) -> int:
+        # Bulk updates send no signals, so invalidate the cached listings and move the offers
+        # between price buckets here. They skip `auto_now` too, so stamp `updated` for the
+        # change feed unless it is given.
+        from .caching import bump_offer_list_generation
+        from .stats import BUCKET_FIELDS, adjust_buckets, bucket_counts
+
+        kwargs.setdefault("updated", timezone.now())
+        with transaction.atomic(savepoint=False):
+            if BUCKET_FIELDS.isdisjoint(kwargs):
+                rows = super().update(**kwargs)
+            else:
+                deltas = bucket_counts(self, **kwargs)
+                deltas.subtract(bucket_counts(self))
+                rows = super().update(**kwargs)
+                adjust_buckets(deltas)
+        if rows:
+            bump_offer_list_generation()
+        return rows
+
+    def bulk_create(self, objs: Iterable[Offer], *args: Any, **kwargs: Any) -> list[Offer]:
+        # Sends no signals either, so count the offers in their price buckets here
+        from .caching import bump_offer_list_generation
+        from .stats import adjust_buckets, bucket_key
+
+        if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+            # Which rows were written is not known, so neither are the counts
+            raise NotSupportedError(
+                "Offers cannot be bulk created on conflict, it would skew the price buckets."
+            )
+        with transaction.atomic(savepoint=False):
+            offers = super().bulk_create(objs, *args, **kwargs)
+            adjust_buckets(
+                Counter(key for offer in offers if (key := bucket_key(offer.__dict__)) is not None)
+            )
+        bump_offer_list_generation()
+        return offers
 
 
 class Offer(models.Model):
@@ -15,6 +68,8 @@ class Offer(models.Model):
         APARTMENT = "APT", "apartment"
 
     created = models.DateTimeField(auto_now_add=True)
+    # Indexed together with the id below
+    updated = models.DateTimeField(auto_now=True)
     address = models.CharField(max_length=100, blank=True, default="")
     size = models.CharField(choices=Size.choices, default=Size.ONE_BEDROOM, max_length=100)
     property_type = models.CharField(
@@ -29,8 +84,215 @@ class Offer(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = OfferQuerySet.as_manager()
+
+    # The row as stored before the save in progress, read inside its transaction by a pre_save
+    # receiver, so the post_save receivers see what it changed. None when there is no row yet,
+    # or the save writes none of the fields they compare.
+    _stored_values: dict[str, Any] | None
+
     class Meta:
         ordering = ["created"]
+        indexes = [
+            models.Index(fields=["size"], name="offer_size_idx"),
+            models.Index(fields=["property_type"], name="offer_property_type_idx"),
+            # Serves the change feed, which reads the offers changed after a cursor in this
+            # order, and the admin's `updated` filter
+            models.Index(fields=["updated", "id"], name="offer_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.address} - {self.get_property_type_display()}"
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        # One transaction for the row and the aggregates the signal receivers keep, see
+        # `signals.py`
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Favorite(models.Model):
+    """An offer bookmarked by a user."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="favorites",
+        on_delete=models.CASCADE,
+    )
+    offer = models.ForeignKey(Offer, related_name="favorites", on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created"]
+        constraints = [models.UniqueConstraint(fields=["user", "offer"], name="unique_favorite")]
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.offer}"
+
+
+class OfferTombstone(models.Model):
+    """Records a deleted offer, so sync clients can learn about deletions incrementally."""
+
+    offer_id = models.BigIntegerField(unique=True)
+    deleted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["deleted"]
+        indexes = [
+            # Serves the change feed, which reads the deletions after a cursor in this order
+            models.Index(fields=["deleted", "id"], name="offer_tombstone_deleted_idx")
+        ]
+
+    def __str__(self) -> str:
+        return f"Offer {self.offer_id} deleted at {self.deleted}"
+
+
+class OfferPriceBucket(models.Model):
+    """Number of offers per fixed price bucket, for each size and property type.
+
+    Maintained incrementally as offers are written, see `stats.py`.
+    """
+
+    size = models.CharField(choices=Offer.Size.choices, max_length=100)
+    property_type = models.CharField(choices=Offer.PropertyType.choices, max_length=100)
+    bucket = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["size", "property_type", "bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["size", "property_type", "bucket"], name="unique_offer_price_bucket"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.size} {self.property_type} #{self.bucket}: {self.count}"
+
+
+class SavedSearchQuerySet(models.QuerySet["SavedSearch"]):
+    def owned_by(self, user: AbstractBaseUser | AnonymousUser) -> SavedSearchQuerySet:
+        # Anonymous users own nothing, their pk is None
+        return self.filter(user_id=user.pk) if user.pk is not None else self.none()
+
+
+class SavedSearch(models.Model):
+    """A renter's search criteria, alerted on whenever a matching offer is created.
+
+    Blank `size` and `property_type`, and null `sharing` and price bounds, match any offer.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="saved_searches",
+        on_delete=models.CASCADE,
+    )
+    min_price = models.PositiveIntegerField(null=True, blank=True)
+    max_price = models.PositiveIntegerField(null=True, blank=True)
+    size = models.CharField(choices=Offer.Size.choices, max_length=100, blank=True, default="")
+    property_type = models.CharField(
+        choices=Offer.PropertyType.choices, max_length=100, blank=True, default=""
+    )
+    sharing = models.BooleanField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = SavedSearchQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["created"]
+        verbose_name_plural = "saved searches"
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.size or 'any size'} {self.property_type or 'any type'}"
+
+
+class OfferAlert(models.Model):
+    """Outbox of offers matching a saved search, waiting to be sent to its owner."""
+
+    saved_search = models.ForeignKey(SavedSearch, related_name="alerts", on_delete=models.CASCADE)
+    offer = models.ForeignKey(Offer, related_name="alerts", on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(
+                fields=["created"],
+                condition=models.Q(sent__isnull=True),
+                name="offer_alert_pending_idx",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.saved_search} - {self.offer}"
+
+
+class OfferSignature(models.Model):
+    """MinHash signature of an offer's address and text, see `duplicates.py`."""
+
+    offer = models.OneToOneField(
+        Offer, primary_key=True, related_name="signature", on_delete=models.CASCADE
+    )
+    minhash = models.BinaryField()
+
+    def __str__(self) -> str:
+        return f"Signature of {self.offer_id}"
+
+
+class OfferSignatureBand(models.Model):
+    """One locality-sensitive hashing band of an offer's signature.
+
+    Offers sharing a bucket in any band are candidate near-duplicates.
+    """
+
+    offer = models.ForeignKey(Offer, related_name="signature_bands", on_delete=models.CASCADE)
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["band", "bucket"], name="offer_signature_band_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.offer_id} band {self.band}: {self.bucket}"
+
+
+class OfferDuplicate(models.Model):
+    """Flags `offer` as a likely near-duplicate of the earlier `original`."""
+
+    offer = models.ForeignKey(Offer, related_name="duplicate_of", on_delete=models.CASCADE)
+    original = models.ForeignKey(Offer, related_name="duplicates", on_delete=models.CASCADE)
+    similarity = models.FloatField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created"]
+        constraints = [
+            models.UniqueConstraint(fields=["offer", "original"], name="unique_offer_duplicate")
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.offer_id} duplicates {self.original_id} ({self.similarity:.2f})"
+
+
+class IdempotencyKey(models.Model):
+    """A client-supplied key for a create request and the response it got, see `idempotency.py`.
+
+    `status_code` and `response` stay null while the request is being handled.
+    """
+
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # Indexed for the sweeper, see the `purge_idempotency_keys` command
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="unique_idempotency_key")
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.scope}:{self.key}"
@@ -7,4 +7,5 @@ from .models import Offer
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request: Request, view: View, obj: Offer) -> bool:
-        return request.method in permissions.SAFE_METHODS or obj.author == request.user
+        # Compare foreign-key ids rather than `obj.author`, which would load the author row
+        return request.method in permissions.SAFE_METHODS or obj.author_id == request.user.pk
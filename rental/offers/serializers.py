@@ -1,19 +1,50 @@
+from typing import Any
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from .models import Offer
+from .models import Offer, SavedSearch
 
 User = get_user_model()
 
 
 class OfferSerializer(serializers.ModelSerializer[Offer]):
     author = serializers.ReadOnlyField(source="author.username")
+    # Looked up in the `favorite_offer_ids` set the view puts in the context, so a whole page
+    # costs at most one query rather than one per offer
+    favorited = serializers.SerializerMethodField()
 
     class Meta:
         model = Offer
-        fields = ["id", "address", "size", "property_type", "price", "sharing", "text", "author"]
+        fields = [
+            "id",
+            "address",
+            "size",
+            "property_type",
+            "price",
+            "sharing",
+            "text",
+            "author",
+            "favorited",
+        ]
         read_only_fields = ["id"]
 
+    def get_favorited(self, obj: Offer) -> bool:
+        return obj.pk in self.context.get("favorite_offer_ids", ())
+
+
+class SavedSearchSerializer(serializers.ModelSerializer[SavedSearch]):
+    class Meta:
+        model = SavedSearch
+        fields = ["id", "min_price", "max_price", "size", "property_type", "sharing", "created"]
+        read_only_fields = ["id", "created"]
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        min_price, max_price = attrs.get("min_price"), attrs.get("max_price")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError("min_price must not exceed max_price.")
+        return attrs
+
 
 class UserSerializer(serializers.ModelSerializer):  # type: ignore[type-arg]
     # `read_only=True` because `offers` is a reverse ForeignKey relationship (Offer.author -> User).
@@ -0,0 +1,141 @@
+from typing import Any
+
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .alerts import SAVED_SEARCH_GENERATION_KEY
+from .authentication import revoke_user_tokens, token_user_cache
+from .caching import (
+    bump_offer_list_generation,
+    invalidate_favorite_offer_ids,
+    invalidate_generation,
+)
+from .duplicates import flag_duplicates
+from .models import Favorite, Offer, OfferTombstone, SavedSearch
+from .stats import BUCKET_FIELDS, adjust_bucket, bucket_key
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender: type[Token], instance: Token, **kwargs: Any) -> None:
+    token_user_cache.evict(instance.key)
+    # Other processes learn of it through the user's generation
+    revoke_user_tokens(instance.user_id)
+
+
+# Any save may change the password or deactivate the user, either must revoke cached tokens
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_changed_user(sender: type[Any], instance: Any, **kwargs: Any) -> None:
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(user_logged_out)
+def evict_logged_out_user(sender: type[Any], user: Any, **kwargs: Any) -> None:
+    if user is not None:
+        revoke_user_tokens(user.pk)
+
+
+# The fields the receivers below compare with the row as stored before a save
+STORED_FIELDS = frozenset({"address", "text", *BUCKET_FIELDS})
+
+
+@receiver(pre_save, sender=Offer)
+def read_stored_offer(
+    sender: type[Offer], instance: Offer, update_fields: frozenset[str] | None, **kwargs: Any
+) -> None:
+    # Inside the save's transaction, see Offer.save. The lock makes concurrent saves of the
+    # offer read each other's writes, rather than compare with what they loaded.
+    if instance._state.adding or (
+        update_fields is not None and update_fields.isdisjoint(STORED_FIELDS)
+    ):
+        instance._stored_values = None
+        return
+    instance._stored_values = (
+        Offer.objects.select_for_update().filter(pk=instance.pk).values(*STORED_FIELDS).first()
+    )
+
+
+def saved_values(instance: Offer, update_fields: frozenset[str] | None) -> dict[str, Any]:
+    """Return the offer's STORED_FIELDS as the save leaves them in the row."""
+    written = STORED_FIELDS if update_fields is None else STORED_FIELDS & update_fields
+    values = dict(instance._stored_values or {})
+    values.update(
+        (field, instance.__dict__[field]) for field in written if field in instance.__dict__
+    )
+    return values
+
+
+# Edits change the signature as much as creates, so both re-index the offer, unless neither
+# its address nor its text changed. Bulk updates send no signal, run the cluster_duplicate_offers
+# command after them.
+@receiver(post_save, sender=Offer)
+def index_offer_signature(
+    sender: type[Offer],
+    instance: Offer,
+    created: bool,
+    update_fields: frozenset[str] | None,
+    **kwargs: Any,
+) -> None:
+    if created:
+        flag_duplicates(instance)
+    elif (stored := instance._stored_values) is not None:
+        saved = saved_values(instance, update_fields)
+        if any(stored[field] != saved[field] for field in ("address", "text")):
+            flag_duplicates(instance)
+
+
+@receiver(post_save, sender=Offer)
+def count_saved_offer(
+    sender: type[Offer],
+    instance: Offer,
+    created: bool,
+    update_fields: frozenset[str] | None,
+    **kwargs: Any,
+) -> None:
+    if not created and instance._stored_values is None:
+        # No bucket field was written, or the row is gone
+        return
+    old_key = None if created else bucket_key(instance._stored_values or {})
+    new_key = bucket_key(saved_values(instance, update_fields))
+    if old_key != new_key:
+        if old_key is not None:
+            adjust_bucket(old_key, -1)
+        if new_key is not None:
+            adjust_bucket(new_key, 1)
+
+
+@receiver(pre_delete, sender=Offer)
+def uncount_deleted_offer(sender: type[Offer], instance: Offer, **kwargs: Any) -> None:
+    # Inside the delete's transaction, from the row as stored rather than as loaded
+    stored = Offer.objects.select_for_update().filter(pk=instance.pk).values(*BUCKET_FIELDS).first()
+    if stored is not None and (key := bucket_key(stored)) is not None:
+        adjust_bucket(key, -1)
+
+
+# Covers every write path, including the admin and offers deleted along with their author. Bulk
+# writes send no signal, see OfferQuerySet.
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def invalidate_offer_lists(sender: type[Offer], **kwargs: Any) -> None:
+    bump_offer_list_generation()
+
+
+@receiver(post_delete, sender=Offer)
+def record_deleted_offer(sender: type[Offer], instance: Offer, **kwargs: Any) -> None:
+    OfferTombstone.objects.create(offer_id=instance.pk)
+
+
+@receiver(post_save, sender=SavedSearch)
+@receiver(post_delete, sender=SavedSearch)
+def invalidate_saved_search_index(sender: type[SavedSearch], **kwargs: Any) -> None:
+    invalidate_generation(SAVED_SEARCH_GENERATION_KEY)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorites(sender: type[Favorite], instance: Favorite, **kwargs: Any) -> None:
+    invalidate_favorite_offer_ids(instance.user_id)
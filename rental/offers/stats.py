@@ -0,0 +1,151 @@
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Count, F, QuerySet, Value
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Least
+
+from .models import Offer, OfferPriceBucket
+
+PRICE_BUCKET_WIDTH = 250
+# The last bucket is open-ended and collects every price from its lower bound upwards
+PRICE_BUCKET_COUNT = 40
+PERCENTILES = (25, 50, 75, 90)
+
+# The offer fields that decide the bucket
+BUCKET_FIELDS = frozenset({"size", "property_type", "price"})
+
+type BucketKey = tuple[str, str, int]
+
+
+def price_bucket(price: int) -> int:
+    return min(price // PRICE_BUCKET_WIDTH, PRICE_BUCKET_COUNT - 1)
+
+
+def bucket_key(values: dict[str, Any]) -> BucketKey | None:
+    """Return the bucket an offer counts towards, or None if any field it depends on is missing."""
+    try:
+        return values["size"], values["property_type"], price_bucket(values["price"])
+    except KeyError:
+        return None
+
+
+def adjust_bucket(key: BucketKey, delta: int) -> None:
+    size, property_type, bucket = key
+    with transaction.atomic():
+        # Increment in SQL so concurrent writers cannot lose updates, the row is created on
+        # first use
+        OfferPriceBucket.objects.get_or_create(
+            size=size, property_type=property_type, bucket=bucket
+        )
+        OfferPriceBucket.objects.filter(
+            size=size, property_type=property_type, bucket=bucket
+        ).update(count=F("count") + delta)
+
+
+def adjust_buckets(deltas: Counter[BucketKey]) -> None:
+    for key, delta in deltas.items():
+        if delta:
+            adjust_bucket(key, delta)
+
+
+def bucket_counts(offers: QuerySet[Offer], **values: Any) -> Counter[BucketKey]:
+    """Count the offers in each bucket, in one grouped query.
+
+    With `values`, e.g. the keyword arguments of an update, the offers are counted in the
+    buckets these would move them to.
+    """
+    fields = {
+        field: value if isinstance(value, Combinable) else Value(value)
+        for field, value in values.items()
+        if field in BUCKET_FIELDS
+    }
+    price = fields.get("price", F("price"))
+    rows = (
+        offers.order_by()
+        .annotate(
+            bucket_size=fields.get("size", F("size")),
+            bucket_property_type=fields.get("property_type", F("property_type")),
+            bucket=Least(price / PRICE_BUCKET_WIDTH, Value(PRICE_BUCKET_COUNT - 1)),
+        )
+        .values("bucket_size", "bucket_property_type", "bucket")
+        .annotate(count=Count("id"))
+    )
+    return Counter(
+        {
+            (row["bucket_size"], row["bucket_property_type"], row["bucket"]): row["count"]
+            for row in rows
+        }
+    )
+
+
+def rebuild_price_buckets() -> int:
+    """Recompute every bucket from the offers table, returning the number of buckets."""
+    with transaction.atomic():
+        counts = bucket_counts(Offer.objects.all())
+        OfferPriceBucket.objects.all().delete()
+        OfferPriceBucket.objects.bulk_create(
+            OfferPriceBucket(size=size, property_type=property_type, bucket=bucket, count=count)
+            for (size, property_type, bucket), count in counts.items()
+        )
+    return len(counts)
+
+
+def percentile(counts: list[int], q: float) -> float | None:
+    """Estimate the q-th percentile from dense bucket counts.
+
+    Offers are assumed to be spread evenly within a bucket. Estimates that land in the
+    open-ended last bucket are reported as its lower bound.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q / 100 * total
+    cumulative = 0
+    for bucket, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            lower = bucket * PRICE_BUCKET_WIDTH
+            if bucket == PRICE_BUCKET_COUNT - 1:
+                return float(lower)
+            return lower + (rank - cumulative) / count * PRICE_BUCKET_WIDTH
+        cumulative += count
+    return float((PRICE_BUCKET_COUNT - 1) * PRICE_BUCKET_WIDTH)
+
+
+def summarize(buckets: Iterable[OfferPriceBucket]) -> list[dict[str, Any]]:
+    """Group buckets, ordered by size and property type, into one summary per group."""
+    groups: dict[tuple[str, str], list[int]] = {}
+    for b in buckets:
+        counts = groups.setdefault((b.size, b.property_type), [0] * PRICE_BUCKET_COUNT)
+        counts[b.bucket] += b.count
+
+    summaries = []
+    for (size, property_type), counts in groups.items():
+        total = sum(counts)
+        if total == 0:
+            continue
+        summaries.append(
+            {
+                "size": size,
+                "property_type": property_type,
+                "count": total,
+                "median": percentile(counts, 50),
+                "percentiles": {f"p{q}": percentile(counts, q) for q in PERCENTILES},
+                "histogram": [
+                    {
+                        "min": bucket * PRICE_BUCKET_WIDTH,
+                        "max": (
+                            (bucket + 1) * PRICE_BUCKET_WIDTH
+                            if bucket < PRICE_BUCKET_COUNT - 1
+                            else None
+                        ),
+                        "count": count,
+                    }
+                    for bucket, count in enumerate(counts)
+                    if count
+                ],
+            }
+        )
+    return summaries
@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+from django.db.models import Model, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Offer, OfferTombstone
+from .serializers import OfferSerializer
+
+# Changes read per page, for each of the updated offers and the deleted ones
+SYNC_PAGE_SIZE = 1000
+# `updated` and `deleted` are stamped before the write commits, so a change stamped just before
+# a sync may only become visible after it. Changes younger than this are held back to the next
+# sync, so a cursor never moves past a change still in flight.
+SYNC_LAG = timedelta(seconds=5)
+# Tombstones are kept this long, a client that has not synced within it has to start over
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class SyncCursorExpired(APIException):
+    # The deletions since the cursor may already be compacted
+    status_code = status.HTTP_410_GONE
+    default_detail = "The cursor is too old, sync again from scratch without `since`."
+    default_code = "sync_cursor_expired"
+
+
+class SyncPosition(NamedTuple):
+    """A position in a stream of changes ordered by time, then id."""
+
+    at: datetime
+    id: int
+
+    def changes_after[M: Model](
+        self, queryset: QuerySet[M], field: str, horizon: datetime
+    ) -> QuerySet[M]:
+        # The first condition bounds the range seek on the (`field`, id) index, the second
+        # expands `(field, id) > (at, id)` past the rows with the same time
+        return (
+            queryset.filter(**{f"{field}__gte": self.at, f"{field}__lt": horizon})
+            .filter(Q(**{f"{field}__gt": self.at}) | Q(**{field: self.at, "id__gt": self.id}))
+            .order_by(field, "id")
+        )
+
+
+class SyncCursor(NamedTuple):
+    """How far a client has synced, in the updated offers and in the deleted ones."""
+
+    # None before the first sync, which starts from the oldest change
+    offers: SyncPosition | None
+    deleted: SyncPosition
+
+    def encode(self) -> str:
+        positions = [
+            None if position is None else [position.at.isoformat(), position.id]
+            for position in self
+        ]
+        return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+    @classmethod
+    def decode(cls, encoded: str) -> SyncCursor:
+        try:
+            offers, deleted = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return cls(None if offers is None else cls.position(*offers), cls.position(*deleted))
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise ValidationError({"since": ["Invalid cursor."]}) from e
+
+    @staticmethod
+    def position(at: str, id: int) -> SyncPosition:
+        if (parsed := parse_datetime(at)) is None or parsed.tzinfo is None:
+            raise ValueError
+        if not isinstance(id, int):
+            raise TypeError
+        return SyncPosition(parsed, id)
+
+
+def offer_changes(since: str | None) -> dict[str, Any]:
+    """Return the offers updated and deleted since the cursor, with the cursor to sync from next.
+
+    Without a cursor every offer is returned, as the starting point. Both kinds of changes are
+    read off an index in order from the cursor's position with a LIMIT, so a sync costs in
+    proportion to the changes since the last one, not to the number of offers. `more` is true
+    when a page was full, and the client should sync again with the new cursor.
+    """
+    now = timezone.now()
+    horizon = now - SYNC_LAG
+    start = SyncPosition(horizon, 0)
+    if since is None:
+        # Offers deleted before the start are not in the offers returned anyway
+        cursor = SyncCursor(None, start)
+    else:
+        cursor = SyncCursor.decode(since)
+        if cursor.deleted.at < now - TOMBSTONE_RETENTION:
+            raise SyncCursorExpired
+
+    offers = Offer.objects.select_related("author")
+    updated: QuerySet[Offer]
+    if cursor.offers is None:
+        updated = offers.filter(updated__lt=horizon).order_by("updated", "id")
+    else:
+        updated = cursor.offers.changes_after(offers, "updated", horizon)
+    changed = list(updated[: SYNC_PAGE_SIZE + 1])
+    deleted = list(
+        cursor.deleted.changes_after(OfferTombstone.objects.all(), "deleted", horizon)[
+            : SYNC_PAGE_SIZE + 1
+        ]
+    )
+
+    # One extra row tells whether there are more changes. A stream read to the end moves on to
+    # the horizon, which the changes still to come are stamped after, unless the cursor is past
+    # it already, e.g. from a server whose clock is ahead.
+    more_offers, more_deleted = len(changed) > SYNC_PAGE_SIZE, len(deleted) > SYNC_PAGE_SIZE
+    changed, deleted = changed[:SYNC_PAGE_SIZE], deleted[:SYNC_PAGE_SIZE]
+    next_cursor = SyncCursor(
+        SyncPosition(changed[-1].updated, changed[-1].pk)
+        if more_offers
+        else max(start, cursor.offers or start),
+        SyncPosition(deleted[-1].deleted, deleted[-1].pk)
+        if more_deleted
+        else max(start, cursor.deleted),
+    )
+    return {
+        "offers": OfferSerializer(changed, many=True).data,
+        "deleted": [tombstone.offer_id for tombstone in deleted],
+        "cursor": next_cursor.encode(),
+        "more": more_offers or more_deleted,
+    }
+
+
+def expire_tombstones() -> int:
+    """Delete the tombstones past TOMBSTONE_RETENTION, returning how many were deleted."""
+    cutoff = timezone.now() - TOMBSTONE_RETENTION
+    count, _ = OfferTombstone.objects.filter(deleted__lt=cutoff).delete()
+    return count
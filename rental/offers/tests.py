@@ -1,9 +1,46 @@
+from datetime import timedelta
+from io import StringIO
+from typing import Any
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core.management import call_command
+from django.db import NotSupportedError, connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
-from .models import Offer
+from .alerts import SavedSearchIndex
+from .authentication import (
+    CachedTokenAuthentication,
+    TokenUserCache,
+    token_user_cache,
+    token_user_generation_key,
+)
+from .caching import bump_generation
+from .duplicates import flag_duplicates, minhash, similarity
+from .idempotency import IDEMPOTENCY_KEY_TTL
+from .models import (
+    IdempotencyKey,
+    Offer,
+    OfferAlert,
+    OfferDuplicate,
+    OfferPriceBucket,
+    OfferSignature,
+    OfferTombstone,
+    SavedSearch,
+)
+from .sync import TOMBSTONE_RETENTION, SyncCursor, SyncPosition
+from .views import OfferListView
 
 User = get_user_model()
 
@@ -13,6 +50,7 @@ class OfferListViewTests(APITestCase):
 
     def setUp(self) -> None:
         """Set up test data."""
+        cache.clear()
         self.user = User.objects.create_user(username="testuser", password="testpass")
         self.offer = Offer.objects.create(
             address="123 Main St",
@@ -65,6 +103,129 @@ class OfferListViewTests(APITestCase):
         self.assertEqual(Offer.objects.count(), 1)
 
 
+class OfferListCacheTests(APITestCase):
+    """Tests for the anonymous OfferListView response cache."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.offer = Offer.objects.create(address="123 Main St", author=self.user)
+        self.url = reverse("offers:offer-list")
+
+    def test_anonymous_hit_does_not_query(self) -> None:
+        """Test that a repeated anonymous listing is served from the cache."""
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_unrecognised_params_share_entry(self) -> None:
+        """Test that parameters the listing does not read do not get cache entries of their own."""
+        self.client.get(self.url + "?_=1")
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url + "?_=2&utm_source=mail")
+
+    def test_page_params_are_keyed(self) -> None:
+        """Test that the parameters of the pages get entries of their own, in any order."""
+        Offer.objects.create(address="456 Oak Ave", author=self.user)
+        with mock.patch.object(OfferListView, "pagination_class", LimitOffsetPagination):
+            self.client.get(self.url + "?limit=1&offset=0")
+            with self.assertNumQueries(0):
+                self.client.get(self.url + "?offset=0&limit=1")
+            response = self.client.get(self.url + "?limit=1&offset=1")
+
+        self.assertEqual(response.json()["results"][0]["address"], "456 Oak Ave")
+
+    def test_browsable_api_is_not_cached(self) -> None:
+        """Test that only JSON listings are cached, not the browsable API's HTML."""
+        self.client.get(self.url, HTTP_ACCEPT="text/html")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+
+    def test_authenticated_bypasses_cache(self) -> None:
+        """Test that authenticated listings always hit the database."""
+        self.client.get(self.url)
+        # Written behind the API's back, so the cached listing is not invalidated
+        Offer.objects.create(address="456 Oak Ave", author=self.user)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data), 2)
+
+    def test_create_invalidates(self) -> None:
+        """Test that creating an offer invalidates cached listings."""
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url, {"address": "456 Oak Ave"})
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.json()), 2)
+
+    def test_update_invalidates(self) -> None:
+        """Test that updating an offer invalidates cached listings."""
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        detail_url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
+        self.client.patch(detail_url, {"address": "789 New St"})
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json()[0]["address"], "789 New St")
+
+    def test_destroy_invalidates(self) -> None:
+        """Test that deleting an offer invalidates cached listings."""
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        self.client.delete(reverse("offers:offer-detail", kwargs={"pk": self.offer.pk}))
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), [])
+
+    def test_cascade_delete_invalidates(self) -> None:
+        """Test that offers deleted along with their author invalidate cached listings."""
+        self.client.get(self.url)
+        self.user.delete()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), [])
+
+    def test_bulk_update_invalidates(self) -> None:
+        """Test that a queryset update, which sends no signals, invalidates cached listings."""
+        self.client.get(self.url)
+        Offer.objects.filter(pk=self.offer.pk).update(address="789 New St")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json()[0]["address"], "789 New St")
+
+    def test_process_local_cache_is_flagged(self) -> None:
+        """Test that the deployment checks warn about a cache each process keeps to itself."""
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+
+        local_ids = [m.id for m in run_checks(include_deployment_checks=True)]
+        with override_settings(CACHES=redis):
+            shared_ids = [m.id for m in run_checks(include_deployment_checks=True)]
+
+        self.assertIn("offers.W001", local_ids)
+        self.assertNotIn("offers.W001", shared_ids)
+
+
 class OfferDetailViewTests(APITestCase):
     """Tests for OfferDetailView."""
 
@@ -108,7 +269,7 @@ class OfferDetailViewTests(APITestCase):
         self.assertEqual(self.offer.price, 2500)
 
     def test_update_offer_as_non_author(self) -> None:
-        """Test that non-authors cannot update an offer."""
+        """Test that non-authors cannot update an offer, which they do not find."""
         self.client.force_authenticate(user=self.other_user)
         url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
         data = {
@@ -120,10 +281,35 @@ class OfferDetailViewTests(APITestCase):
         }
         response = self.client.put(url, data)
 
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.offer.refresh_from_db()
         self.assertEqual(self.offer.address, "123 Main St")
 
+    def test_update_offer_as_non_author_is_single_query(self) -> None:
+        """Test that a failed ownership check costs exactly one query."""
+        self.client.force_authenticate(user=self.other_user)
+        url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
+
+        with self.assertNumQueries(1) as queries:
+            response = self.client.patch(url, {"price": 0})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # The ownership is checked by the lookup itself
+        self.assertIn('"author_id" =', queries.captured_queries[0]["sql"])
+
+    def test_update_offer_as_author_does_not_load_author_separately(self) -> None:
+        """Test that the author row is joined, not fetched, on a successful update."""
+        self.client.force_authenticate(user=self.author)
+        url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
+
+        # One SELECT for the offer (with its author), one for the stored row inside the save's
+        # transaction, one UPDATE
+        with self.assertNumQueries(3):
+            response = self.client.patch(url, {"price": 1600})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["author"], "author")
+
     def test_update_offer_unauthenticated(self) -> None:
         """Test that unauthenticated users cannot update an offer."""
         url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
@@ -142,12 +328,12 @@ class OfferDetailViewTests(APITestCase):
         self.assertEqual(Offer.objects.count(), 0)
 
     def test_delete_offer_as_non_author(self) -> None:
-        """Test that non-authors cannot delete an offer."""
+        """Test that non-authors cannot delete an offer, which they do not find."""
         self.client.force_authenticate(user=self.other_user)
         url = reverse("offers:offer-detail", kwargs={"pk": self.offer.pk})
         response = self.client.delete(url)
 
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(Offer.objects.count(), 1)
 
     def test_delete_offer_unauthenticated(self) -> None:
@@ -166,6 +352,767 @@ class OfferDetailViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class OfferQuerySetTests(APITestCase):
+    """Tests for OfferQuerySet."""
+
+    def test_owned_by(self) -> None:
+        """Test that owned_by returns only the user's offers."""
+        author = User.objects.create_user(username="author", password="testpass")
+        other_user = User.objects.create_user(username="other", password="testpass")
+        offer = Offer.objects.create(address="123 Main St", author=author)
+        Offer.objects.create(address="456 Oak Ave", author=other_user)
+
+        self.assertQuerySetEqual(Offer.objects.owned_by(author), [offer])
+
+
+class OfferStatsViewTests(APITestCase):
+    """Tests for OfferStatsView."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        for price in (1000, 1100, 1200, 2000):
+            Offer.objects.create(size="2BR", property_type="APT", price=price, author=self.user)
+        Offer.objects.create(size="ST", property_type="H", price=50_000, author=self.user)
+        self.url = reverse("offers:offer-stats")
+
+    def stats_for(self, size: str, property_type: str) -> dict[str, Any]:
+        response = self.client.get(self.url, {"size": size, "property_type": property_type})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        result: dict[str, Any] = response.data[0]
+        return result
+
+    def test_stats(self) -> None:
+        """Test counts, percentiles and histogram for a group."""
+        stats = self.stats_for("2BR", "APT")
+
+        self.assertEqual(stats["count"], 4)
+        # Rank 2 of 4 falls two thirds into the 1000-1250 bucket, which holds three offers
+        self.assertAlmostEqual(stats["median"], 1000 + 250 * 2 / 3)
+        self.assertEqual(stats["percentiles"]["p50"], stats["median"])
+        self.assertEqual(
+            stats["histogram"],
+            [
+                {"min": 1000, "max": 1250, "count": 3},
+                {"min": 2000, "max": 2250, "count": 1},
+            ],
+        )
+
+    def test_overflow_bucket(self) -> None:
+        """Test that prices past the last bucket are counted in the open-ended bucket."""
+        stats = self.stats_for("ST", "H")
+
+        self.assertEqual(stats["histogram"], [{"min": 9750, "max": None, "count": 1}])
+
+    def test_read_is_single_query(self) -> None:
+        """Test that reading the statistics does not scan offers."""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data), 2)
+
+    def test_update_moves_offer_between_groups(self) -> None:
+        """Test that updates are reflected incrementally."""
+        offer = Offer.objects.get(price=2000)
+        offer.size = "3BR"
+        offer.save()
+
+        self.assertEqual(self.stats_for("2BR", "APT")["count"], 3)
+        self.assertEqual(self.stats_for("3BR", "APT")["count"], 1)
+
+    def test_stale_saves_are_counted_once(self) -> None:
+        """Test that saves of copies loaded before each other's writes keep the counts right."""
+        first, second = Offer.objects.get(price=2000), Offer.objects.get(price=2000)
+        first.size = "3BR"
+        first.save()
+        # Writes every field, so the offer is back to 2BR, in another bucket
+        second.price = 1000
+        second.save()
+
+        self.assertEqual(
+            self.stats_for("2BR", "APT")["histogram"], [{"min": 1000, "max": 1250, "count": 4}]
+        )
+        self.assertEqual(self.client.get(self.url, {"size": "3BR"}).data, [])
+
+    def test_bulk_update_moves_offers(self) -> None:
+        """Test that queryset updates of the bucket fields are counted, expressions included."""
+        Offer.objects.filter(price__lt=1500).update(price=F("price") + 1000)
+        Offer.objects.filter(size="ST").update(size="2BR", property_type="APT")
+
+        self.assertEqual(
+            self.stats_for("2BR", "APT")["histogram"],
+            [
+                {"min": 2000, "max": 2250, "count": 4},
+                {"min": 9750, "max": None, "count": 1},
+            ],
+        )
+
+    def test_bulk_create_is_counted(self) -> None:
+        """Test that bulk created offers are counted, and conflicts are refused."""
+        Offer.objects.bulk_create(
+            Offer(size="ST", property_type="H", price=100, author=self.user) for _ in range(2)
+        )
+
+        self.assertEqual(self.stats_for("ST", "H")["count"], 3)
+        with self.assertRaises(NotSupportedError):
+            Offer.objects.bulk_create([Offer(author=self.user)], ignore_conflicts=True)
+
+    def test_delete_removes_offer(self) -> None:
+        """Test that deletes are reflected incrementally."""
+        Offer.objects.get(price=50_000).delete()
+
+        response = self.client.get(self.url, {"size": "ST"})
+
+        self.assertEqual(response.data, [])
+
+    def test_rebuild_command(self) -> None:
+        """Test that the rebuild command matches the incrementally maintained buckets."""
+        expected = list(
+            OfferPriceBucket.objects.values_list("size", "property_type", "bucket", "count")
+        )
+        OfferPriceBucket.objects.update(count=0)
+
+        call_command("rebuild_offer_stats", stdout=StringIO())
+
+        actual = list(
+            OfferPriceBucket.objects.values_list("size", "property_type", "bucket", "count")
+        )
+        self.assertEqual(actual, expected)
+
+
+class OfferChangesViewTests(APITestCase):
+    """Tests for OfferChangesView."""
+
+    def setUp(self) -> None:
+        """Set up test data, with changes visible to the feed as soon as they are made."""
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.offer = Offer.objects.create(address="123 Main St", author=self.user)
+        self.url = reverse("offers:offer-changes")
+        lag = mock.patch("offers.sync.SYNC_LAG", timedelta(0))
+        lag.start()
+        self.addCleanup(lag.stop)
+
+    def changes(self, since: str | None = None) -> dict[str, Any]:
+        response = self.client.get(self.url, {} if since is None else {"since": since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data: dict[str, Any] = response.data
+        return data
+
+    def test_snapshot_without_cursor(self) -> None:
+        """Test that omitting the cursor returns every offer."""
+        data = self.changes()
+
+        self.assertEqual([o["id"] for o in data["offers"]], [self.offer.pk])
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["more"])
+
+    def test_empty_snapshot_has_cursor(self) -> None:
+        """Test that a snapshot without offers still moves the cursor on."""
+        self.offer.delete()
+
+        data = self.changes()
+
+        self.assertEqual(data["offers"], [])
+        self.assertEqual(self.changes(data["cursor"])["deleted"], [])
+
+    def test_changes_since_cursor(self) -> None:
+        """Test that only offers changed after the cursor are returned."""
+        cursor = self.changes()["cursor"]
+        created = Offer.objects.create(address="456 Oak Ave", author=self.user)
+        deleted = Offer.objects.create(address="789 New St", author=self.user)
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        with self.assertNumQueries(2):
+            data = self.changes(cursor)
+
+        self.assertEqual([o["id"] for o in data["offers"]], [created.pk])
+        self.assertEqual(data["deleted"], [deleted_id])
+
+        data = self.changes(data["cursor"])
+
+        self.assertEqual(data["offers"], [])
+        self.assertEqual(data["deleted"], [])
+
+    def test_update_is_a_change(self) -> None:
+        """Test that updating an offer moves it past the cursor."""
+        cursor = self.changes()["cursor"]
+        self.offer.price = 2000
+        self.offer.save()
+
+        self.assertEqual(self.changes(cursor)["offers"][0]["price"], 2000)
+
+    def test_bulk_update_is_a_change(self) -> None:
+        """Test that offers updated through a queryset move past the cursor, despite `auto_now`."""
+        cursor = self.changes()["cursor"]
+        Offer.objects.filter(pk=self.offer.pk).update(sharing=False)
+
+        self.assertEqual([o["id"] for o in self.changes(cursor)["offers"]], [self.offer.pk])
+
+    def test_same_time_changes_are_not_skipped(self) -> None:
+        """Test that offers stamped with the same time are each returned once, across pages."""
+        offers = [Offer.objects.create(address=f"{n} Elm St", author=self.user) for n in range(4)]
+        Offer.objects.update(updated=self.offer.updated)
+
+        seen: list[int] = []
+        cursor = None
+        with mock.patch("offers.sync.SYNC_PAGE_SIZE", 2):
+            while True:
+                data = self.changes(cursor)
+                seen.extend(o["id"] for o in data["offers"])
+                cursor = data["cursor"]
+                if not data["more"]:
+                    break
+
+        self.assertEqual(seen, [self.offer.pk, *(offer.pk for offer in offers)])
+
+    def test_recent_changes_are_held_back(self) -> None:
+        """Test that changes younger than the lag wait for a later sync, rather than be skipped."""
+        with mock.patch("offers.sync.SYNC_LAG", timedelta(minutes=1)):
+            data = self.changes()
+
+        self.assertEqual(data["offers"], [])
+        self.assertEqual([o["id"] for o in self.changes(data["cursor"])["offers"]], [self.offer.pk])
+
+    def test_invalid_cursor(self) -> None:
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(self.url, {"since": "yesterday"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("since", response.data)
+
+    def test_expired_cursor(self) -> None:
+        """Test that a cursor older than the tombstones kept asks for a full sync."""
+        old = timezone.now() - TOMBSTONE_RETENTION - timedelta(seconds=1)
+        cursor = SyncCursor(None, SyncPosition(old, 0)).encode()
+
+        response = self.client.get(self.url, {"since": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_compact_tombstones_command(self) -> None:
+        """Test that only the tombstones past the retention window are deleted."""
+        kept = Offer.objects.create(address="456 Oak Ave", author=self.user)
+        expired_id, kept_id = self.offer.pk, kept.pk
+        self.offer.delete()
+        kept.delete()
+        OfferTombstone.objects.filter(offer_id=expired_id).update(
+            deleted=timezone.now() - TOMBSTONE_RETENTION - timedelta(seconds=1)
+        )
+
+        call_command("compact_offer_tombstones", stdout=StringIO())
+
+        self.assertEqual(list(OfferTombstone.objects.values_list("offer_id", flat=True)), [kept_id])
+
+
+class SavedSearchIndexTests(APITestCase):
+    """Tests for SavedSearchIndex."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.user = User.objects.create_user(username="renter", password="testpass")
+
+    def search(self, **criteria: Any) -> SavedSearch:
+        return SavedSearch.objects.create(user=self.user, **criteria)
+
+    def test_match(self) -> None:
+        """Test exact criteria, wildcards and price bounds."""
+        any_offer = self.search()
+        cheap_apartment = self.search(property_type="APT", max_price=1000)
+        studio_range = self.search(size="ST", min_price=500, max_price=1500)
+        shared = self.search(sharing=True)
+        index = SavedSearchIndex(SavedSearch.objects.all())
+
+        offer = Offer(size="ST", property_type="APT", price=800, sharing=False)
+        matched = {search_id for search_id, _ in index.match(offer)}
+
+        self.assertEqual(matched, {any_offer.pk, cheap_apartment.pk, studio_range.pk})
+        self.assertNotIn(shared.pk, matched)
+
+    def test_price_bounds_are_inclusive(self) -> None:
+        """Test that offers priced exactly on a bound match."""
+        search = self.search(min_price=500, max_price=1000)
+        index = SavedSearchIndex(SavedSearch.objects.all())
+
+        for price, expected in ((499, []), (500, [search.pk]), (1000, [search.pk]), (1001, [])):
+            offer = Offer(price=price)
+            self.assertEqual([search_id for search_id, _ in index.match(offer)], expected)
+
+    def test_matches_every_containing_interval(self) -> None:
+        """Test that the index agrees with checking every search, over overlapping ranges."""
+        bounds = [None, 0, 100, 250, 500, 750, 1000]
+        searches = [
+            self.search(min_price=low, max_price=high)
+            for low in bounds
+            for high in bounds
+            if low is None or high is None or low <= high
+        ]
+        index = SavedSearchIndex(SavedSearch.objects.all())
+
+        for price in range(0, 1101, 50):
+            expected = {
+                search.pk
+                for search in searches
+                if (search.min_price or 0) <= price
+                and (search.max_price is None or price <= search.max_price)
+            }
+            matched = [search_id for search_id, _ in index.match(Offer(price=price))]
+            self.assertEqual(len(matched), len(expected))
+            self.assertEqual(set(matched), expected)
+
+
+class SavedSearchViewTests(APITestCase):
+    """Tests for the saved search views and offer alerts."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        # Forces the saved search index to be rebuilt from this test's database
+        cache.clear()
+        self.renter = User.objects.create_user(username="renter", password="testpass")
+        self.author = User.objects.create_user(username="author", password="testpass")
+        self.url = reverse("offers:saved-search-list")
+
+    def create_offer(self, **data: Any) -> None:
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post(reverse("offers:offer-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_and_list_own_searches(self) -> None:
+        """Test that users only see their own saved searches."""
+        SavedSearch.objects.create(user=self.author)
+        self.client.force_authenticate(user=self.renter)
+
+        response = self.client.post(self.url, {"size": "2BR", "max_price": 1500})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["size"], "2BR")
+
+    def test_other_users_search_not_found(self) -> None:
+        """Test that another user's saved search cannot be deleted."""
+        search = SavedSearch.objects.create(user=self.author)
+        self.client.force_authenticate(user=self.renter)
+
+        response = self.client.delete(
+            reverse("offers:saved-search-detail", kwargs={"pk": search.pk})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_price_range(self) -> None:
+        """Test that min_price above max_price is rejected."""
+        self.client.force_authenticate(user=self.renter)
+
+        response = self.client.post(self.url, {"min_price": 2000, "max_price": 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthenticated(self) -> None:
+        """Test that saved searches require authentication."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_new_offer_queues_alerts(self) -> None:
+        """Test that a new offer queues an alert for every matching search."""
+        match = SavedSearch.objects.create(user=self.renter, size="2BR", max_price=1500)
+        SavedSearch.objects.create(user=self.renter, size="ST")
+        # Authors are not alerted about their own offers
+        SavedSearch.objects.create(user=self.author)
+
+        self.create_offer(address="123 Main St", size="2BR", price=1200)
+
+        alert = OfferAlert.objects.get()
+        self.assertEqual(alert.saved_search, match)
+        self.assertIsNone(alert.sent)
+
+    def test_new_search_is_indexed(self) -> None:
+        """Test that searches saved after the index was built are matched."""
+        self.create_offer(address="123 Main St")
+        SavedSearch.objects.create(user=self.renter)
+
+        self.create_offer(address="456 Oak Ave")
+
+        self.assertEqual(OfferAlert.objects.get().offer.address, "456 Oak Ave")
+
+
+class DuplicateDetectionTests(APITestCase):
+    """Tests for near-duplicate offer detection."""
+
+    TEXT = (
+        "Bright two bedroom apartment close to the park, newly renovated kitchen, "
+        "hardwood floors throughout and a large balcony facing south."
+    )
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(username="agency", password="testpass")
+
+    def offer(self, address: str, text: str) -> Offer:
+        return Offer.objects.create(address=address, text=text, author=self.user)
+
+    def test_similarity(self) -> None:
+        """Test that small edits keep signatures similar and unrelated text does not."""
+        original = minhash(Offer(address="123 Main St", text=self.TEXT))
+        edited = minhash(Offer(address="123 Main Street", text=self.TEXT + " Call now!"))
+        unrelated = minhash(Offer(address="9 Elm Rd", text="Tiny studio, no pets."))
+        assert original is not None and edited is not None and unrelated is not None
+
+        self.assertGreaterEqual(similarity(original, edited), 0.8)
+        self.assertLess(similarity(original, unrelated), 0.3)
+
+    def test_flag_duplicates(self) -> None:
+        """Test that a repost is flagged against the original and nothing else."""
+        original = self.offer("123 Main St", self.TEXT)
+        flag_duplicates(original)
+        flag_duplicates(self.offer("9 Elm Rd", "Tiny studio, no pets."))
+
+        repost = self.offer("123 Main Street", self.TEXT + " Call now!")
+        duplicates = flag_duplicates(repost)
+
+        self.assertEqual([d.original_id for d in duplicates], [original.pk])
+        self.assertTrue(OfferDuplicate.objects.filter(offer=repost, original=original).exists())
+
+    def test_empty_offer_is_not_indexed(self) -> None:
+        """Test that offers without text are neither indexed nor flagged."""
+        self.assertEqual(flag_duplicates(self.offer("", "")), [])
+        self.assertFalse(OfferSignature.objects.exists())
+
+    def test_create_flags_duplicates(self) -> None:
+        """Test that creating an offer through the API flags duplicates."""
+        self.client.force_authenticate(user=self.user)
+        url = reverse("offers:offer-list")
+        self.client.post(url, {"address": "123 Main St", "text": self.TEXT})
+        self.client.post(url, {"address": "123 Main St.", "text": self.TEXT})
+
+        duplicate = OfferDuplicate.objects.get()
+
+        self.assertEqual(duplicate.offer.address, "123 Main St.")
+        self.assertEqual(duplicate.original.address, "123 Main St")
+
+    def test_edit_reindexes_offer(self) -> None:
+        """Test that editing an offer's text flags it or clears its flags."""
+        original = self.offer("123 Main St", self.TEXT)
+        edited = self.offer("9 Elm Rd", "Tiny studio, no pets.")
+
+        edited.address, edited.text = "123 Main Street", self.TEXT
+        edited.save()
+        self.assertTrue(OfferDuplicate.objects.filter(offer=edited, original=original).exists())
+
+        original.text = ""
+        original.save()
+        self.assertFalse(OfferDuplicate.objects.exists())
+
+    def test_cluster_command_is_atomic(self) -> None:
+        """Test that a failed rebuild keeps the previous index."""
+        self.offer("123 Main St", self.TEXT)
+        self.offer("123 Main Street", self.TEXT + " Call now!")
+
+        with (
+            mock.patch(
+                "offers.management.commands.cluster_duplicate_offers.flag_duplicates",
+                side_effect=RuntimeError,
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            call_command("cluster_duplicate_offers", stdout=StringIO())
+
+        self.assertEqual(OfferSignature.objects.count(), 2)
+        self.assertEqual(OfferDuplicate.objects.count(), 1)
+
+    def test_cluster_command(self) -> None:
+        """Test that the command clusters the existing corpus."""
+        for suffix in ("", " Call now!", " Available June."):
+            self.offer("123 Main St", self.TEXT + suffix)
+        self.offer("9 Elm Rd", "Tiny studio, no pets.")
+        out = StringIO()
+
+        call_command("cluster_duplicate_offers", stdout=out)
+
+        self.assertIn("Found 1 duplicate clusters", out.getvalue())
+        self.assertEqual(OfferSignature.objects.count(), 4)
+        self.assertEqual(OfferDuplicate.objects.count(), 3)
+
+
+class FavoriteTests(APITestCase):
+    """Tests for favorites and the favorited flag."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.offers = [
+            Offer.objects.create(address=f"{n} Main St", author=self.user) for n in range(3)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def favorite(self, offer: Offer) -> int:
+        url = reverse("offers:offer-favorite", kwargs={"pk": offer.pk})
+        return self.client.post(url).status_code
+
+    def test_favorite_and_unfavorite(self) -> None:
+        """Test that favoriting is idempotent and can be undone."""
+        self.assertEqual(self.favorite(self.offers[0]), status.HTTP_201_CREATED)
+        self.assertEqual(self.favorite(self.offers[0]), status.HTTP_200_OK)
+
+        url = reverse("offers:offer-favorite", kwargs={"pk": self.offers[0].pk})
+        response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.user.favorites.exists())
+
+    def test_favorite_nonexistent_offer(self) -> None:
+        """Test favoriting an offer that doesn't exist."""
+        url = reverse("offers:offer-favorite", kwargs={"pk": 9999})
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_marks_favorites_in_constant_queries(self) -> None:
+        """Test that the favorited flag costs one query per page, and none once cached."""
+        self.favorite(self.offers[1])
+        url = reverse("offers:offer-list")
+
+        # The offers with their authors, then the user's favorite ids
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        self.assertEqual([o["favorited"] for o in response.data], [False, True, False])
+
+    def test_favoriting_invalidates_cached_ids(self) -> None:
+        """Test that the cached favorite ids follow changes."""
+        url = reverse("offers:offer-detail", kwargs={"pk": self.offers[0].pk})
+        self.assertFalse(self.client.get(url).data["favorited"])
+
+        self.favorite(self.offers[0])
+
+        self.assertTrue(self.client.get(url).data["favorited"])
+
+    def test_anonymous_sees_no_favorites(self) -> None:
+        """Test that anonymous listings never mark favorites."""
+        self.favorite(self.offers[0])
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(reverse("offers:offer-list"))
+
+        self.assertFalse(any(o["favorited"] for o in response.data))
+
+    def test_list_favorites(self) -> None:
+        """Test listing the user's favorites, most recent first."""
+        self.favorite(self.offers[2])
+        self.favorite(self.offers[0])
+
+        response = self.client.get(reverse("offers:favorite-list"))
+
+        self.assertEqual([o["id"] for o in response.data], [self.offers[0].pk, self.offers[2].pk])
+        self.assertTrue(all(o["favorited"] for o in response.data))
+
+
+class OfferAdminTests(APITestCase):
+    """Tests for OfferAdmin."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        cache.clear()
+        self.admin = User.objects.create_superuser(username="admin", password="testpass")
+        self.client.force_login(self.admin)
+        for n in range(3):
+            Offer.objects.create(address=f"{n} Main St", size="2BR", author=self.admin)
+        self.url = reverse("admin:offers_offer_changelist")
+
+    def test_changelist(self) -> None:
+        """Test that the changelist renders and filters."""
+        response = self.client.get(self.url, {"size__exact": "2BR"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "0 Main St")
+
+    def test_changelist_queries_do_not_grow_with_offers(self) -> None:
+        """Test that authors are joined rather than fetched per row."""
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        for n in range(3, 10):
+            Offer.objects.create(address=f"{n} Main St", author=self.admin)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+
+        self.assertEqual(len(few), len(many))
+
+    def test_large_changelist_uses_estimated_count(self) -> None:
+        """Test that large unfiltered changelists show the analyzed estimate, not a COUNT(*)."""
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with (
+            mock.patch("offers.admin.ESTIMATED_COUNT_THRESHOLD", 1),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        offer_counts = [
+            q["sql"] for q in queries if "COUNT(" in q["sql"] and '"offers_offer"' in q["sql"]
+        ]
+        self.assertEqual(offer_counts, [])
+        self.assertContains(response, "About 3 offers (estimated)")
+
+    def test_unanalyzed_changelist_counts(self) -> None:
+        """Test that without statistics the changelist counts exactly, after deletes too."""
+        Offer.objects.filter(address="2 Main St").delete()
+        with mock.patch("offers.admin.ESTIMATED_COUNT_THRESHOLD", 1):
+            response = self.client.get(self.url)
+
+        self.assertContains(response, "2 offers")
+        self.assertNotContains(response, "estimated")
+
+    def test_bulk_action_is_single_update(self) -> None:
+        """Test that bulk actions write every selected offer in one UPDATE."""
+        ids = list(Offer.objects.values_list("pk", flat=True))
+        data = {"action": "mark_shared", "_selected_action": ids}
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, data)
+
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Offer.objects.filter(sharing=True).count(), 3)
+
+    def cached_listing(self) -> list[dict[str, Any]]:
+        """Return the anonymous offer listing, cached or not."""
+        response = APIClient().get(reverse("offers:offer-list"))
+        return response.json()  # type: ignore[no-any-return]
+
+    def test_writes_invalidate_cached_listings(self) -> None:
+        """Test that offers changed or deleted through the admin are not listed stale."""
+        offer = Offer.objects.get(address="0 Main St")
+        self.cached_listing()
+        change_url = reverse("admin:offers_offer_change", args=[offer.pk])
+        self.client.post(
+            change_url,
+            {
+                "address": "9 High St",
+                "size": offer.size,
+                "property_type": offer.property_type,
+                "price": offer.price,
+                "text": "Sunny",
+                "author": self.admin.pk,
+            },
+        )
+
+        self.assertIn("9 High St", [o["address"] for o in self.cached_listing()])
+
+        self.client.post(reverse("admin:offers_offer_delete", args=[offer.pk]), {"post": "yes"})
+
+        self.assertEqual(len(self.cached_listing()), 2)
+
+        ids = list(Offer.objects.values_list("pk", flat=True))
+        self.client.post(
+            self.url, {"action": "delete_selected", "_selected_action": ids, "post": "yes"}
+        )
+
+        self.assertEqual(self.cached_listing(), [])
+
+    def test_bulk_action_invalidates_cached_listings(self) -> None:
+        """Test that offers shared through a bulk action are not listed stale."""
+        self.cached_listing()
+        ids = list(Offer.objects.values_list("pk", flat=True))
+        self.client.post(self.url, {"action": "mark_shared", "_selected_action": ids})
+
+        self.assertTrue(all(o["sharing"] for o in self.cached_listing()))
+
+
+class IdempotentOfferCreateTests(APITestCase):
+    """Tests for Idempotency-Key support on OfferListView.create."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("offers:offer-list")
+        self.data = {"address": "123 Main St", "price": 1500}
+
+    def post(self, data: dict[str, Any], key: str = "key-1") -> Any:
+        return self.client.post(self.url, data, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_without_insert(self) -> None:
+        """Test that a retried create replays the stored response."""
+        first = self.post(self.data)
+
+        # Looking up the stored response is the only query
+        with self.assertNumQueries(1):
+            retry = self.post(self.data)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Offer.objects.count(), 1)
+
+    def test_different_keys_create_separately(self) -> None:
+        """Test that distinct keys are distinct requests."""
+        self.post(self.data, key="key-1")
+        self.post(self.data, key="key-2")
+
+        self.assertEqual(Offer.objects.count(), 2)
+
+    def test_key_reused_with_different_payload(self) -> None:
+        """Test that a key cannot be reused for a different request."""
+        self.post(self.data)
+
+        response = self.post({**self.data, "price": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Offer.objects.count(), 1)
+
+    def test_request_in_progress(self) -> None:
+        """Test that a concurrent duplicate is turned away while the first is running."""
+        self.post(self.data)
+        IdempotencyKey.objects.update(status_code=None, response=None)
+
+        response = self.post(self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_validation_errors_are_replayed(self) -> None:
+        """Test that a rejected request is remembered as rejected, without validating again."""
+        first = self.post({**self.data, "price": -1})
+
+        with self.assertNumQueries(1):
+            retry = self.post({**self.data, "price": -1})
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 400)
+
+    def test_keys_are_scoped_per_user(self) -> None:
+        """Test that one user's key does not replay another user's response."""
+        self.post(self.data)
+        other = User.objects.create_user(username="other", password="testpass")
+        self.client.force_authenticate(user=other)
+
+        self.post(self.data)
+
+        self.assertEqual(Offer.objects.filter(author=other).count(), 1)
+
+    def test_purge_expired_keys(self) -> None:
+        """Test that the sweeper deletes only keys past their TTL."""
+        self.post(self.data, key="old")
+        self.post(self.data, key="new")
+        IdempotencyKey.objects.filter(key="old").update(
+            created=timezone.now() - IDEMPOTENCY_KEY_TTL - timedelta(seconds=1)
+        )
+
+        call_command("purge_idempotency_keys", stdout=StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["new"])
+
+
 class UserListViewTests(APITestCase):
     """Tests for UserListView."""
 
@@ -209,3 +1156,111 @@ class UserDetailViewTests(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Tests for CachedTokenAuthentication."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        token_user_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self) -> tuple[Any, Any] | None:
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        return self.auth.authenticate(request)
+
+    def test_obtain_token_and_create_offer(self) -> None:
+        """Test that an obtained token authenticates API writes."""
+        response = self.client.post(
+            reverse("api-token-auth"), {"username": "testuser", "password": "testpass"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        response = self.client.post(reverse("offers:offer-list"), {"address": "123 Main St"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Offer.objects.get().author, self.user)
+
+    def test_cached_token_needs_no_queries(self) -> None:
+        """Test that a resolved token is served from the cache."""
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            credentials = self.authenticate()
+
+        self.assertEqual(credentials, (self.user, self.token))
+
+    def test_deleted_token_is_evicted(self) -> None:
+        """Test that deleting a token revokes it immediately."""
+        self.authenticate()
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_evicts_user(self) -> None:
+        """Test that changing the password drops the user's cached tokens."""
+        self.authenticate()
+        self.user.set_password("newpass")
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_deleted_user_is_evicted(self) -> None:
+        """Test that deleting a user revokes their tokens immediately."""
+        self.authenticate()
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_deletes_token(self) -> None:
+        """Test that logging out revokes the token."""
+        self.authenticate()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        response = self.client.post(reverse("api-token-logout"))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_revocation_reaches_other_processes(self) -> None:
+        """Test that a token revoked by another process is not served from this one's cache."""
+        self.authenticate()
+        # What the signals of a write in another process leave behind in the shared cache
+        bump_generation(token_user_generation_key(self.user.pk))
+
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_cached_user_is_not_shared(self) -> None:
+        """Test that each request gets its own copy of the cached user."""
+        first = self.authenticate()
+        assert first is not None
+        first[0].first_name = "Changed"
+
+        second = self.authenticate()
+
+        assert second is not None
+        self.assertIsNot(second[0], first[0])
+        self.assertEqual(second[0].first_name, "")
+        self.assertIs(second[1].user, second[0])
+
+    def test_lru_is_bounded(self) -> None:
+        """Test that the least recently used token is dropped once the cache is full."""
+        cache = TokenUserCache(maxsize=2, ttl=60)
+        cache.set("a", (self.user, self.token))
+        cache.set("b", (self.user, self.token))
+        cache.get("a")
+        cache.set("c", (self.user, self.token))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (self.user, self.token))
@@ -1,12 +1,29 @@
 from django.urls import path
 
-from .views import OfferDetailView, OfferListView, UserDetailView, UserListView
+from .views import (
+    FavoriteListView,
+    FavoriteView,
+    OfferChangesView,
+    OfferDetailView,
+    OfferListView,
+    OfferStatsView,
+    SavedSearchDetailView,
+    SavedSearchListView,
+    UserDetailView,
+    UserListView,
+)
 
 app_name = "offers"
 
 urlpatterns = [
     path("offers/", OfferListView.as_view(), name="offer-list"),
     path("offers/<int:pk>/", OfferDetailView.as_view(), name="offer-detail"),
+    path("offers/<int:pk>/favorite/", FavoriteView.as_view(), name="offer-favorite"),
+    path("offers/stats/", OfferStatsView.as_view(), name="offer-stats"),
+    path("offers/changes/", OfferChangesView.as_view(), name="offer-changes"),
+    path("favorites/", FavoriteListView.as_view(), name="favorite-list"),
+    path("saved-searches/", SavedSearchListView.as_view(), name="saved-search-list"),
+    path("saved-searches/<int:pk>/", SavedSearchDetailView.as_view(), name="saved-search-detail"),
     path("users/", UserListView.as_view(), name="user-list"),
     path("users/<int:pk>/", UserDetailView.as_view(), name="user-detail"),
 ]
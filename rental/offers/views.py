@@ -1,25 +1,98 @@
+from typing import Any
+
 from django.contrib.auth import get_user_model
-from rest_framework import generics, permissions
+from django.core.cache import cache
+from django.db.models import QuerySet
+from rest_framework import generics, permissions, status, views
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
 
-from .models import Offer
+from .alerts import queue_offer_alerts
+from .caching import (
+    OFFER_LIST_CACHE_TIMEOUT,
+    CachedResponse,
+    get_favorite_offer_ids,
+    offer_list_cache_key,
+)
+from .idempotency import IdempotentCreateMixin
+from .models import Favorite, Offer, OfferPriceBucket, SavedSearch
 from .permissions import IsAuthorOrReadOnly
-from .serializers import OfferSerializer, UserSerializer
+from .serializers import OfferSerializer, SavedSearchSerializer, UserSerializer
+from .stats import summarize
+from .sync import offer_changes
 
 User = get_user_model()
 
 
-class OfferListView(generics.ListCreateAPIView[Offer]):
-    queryset = Offer.objects.all()
+def authenticated_user_id(request: Request) -> int:
+    """Return the requesting user's id, in views that only admit authenticated users."""
+    assert request.user.is_authenticated
+    return request.user.pk
+
+
+def listing_params(view: generics.GenericAPIView[Any]) -> set[str]:
+    """Return the query parameters a listing depends on: its filters', ordering's and pages'.
+
+    They are read from the parameters the filter backends and the paginator document for the
+    OpenAPI schema, so a backend must document its parameters for them to be cached apart.
+    """
+    sources: list[Any] = [backend() for backend in view.filter_backends]
+    if view.paginator is not None:
+        sources.append(view.paginator)
+    return {
+        param["name"]
+        for source in sources
+        for param in source.get_schema_operation_parameters(view)
+    }
+
+
+class FavoritedOffersMixin(generics.GenericAPIView[Offer]):
+    """Lets OfferSerializer mark the offers the requesting user has favorited."""
+
+    def get_serializer_context(self) -> dict[str, Any]:
+        context = super().get_serializer_context()
+        user = self.request.user
+        if self.request.method == "GET" and user.is_authenticated:
+            context["favorite_offer_ids"] = get_favorite_offer_ids(user.pk)
+        return context
+
+
+class OfferListView(FavoritedOffersMixin, IdempotentCreateMixin, generics.ListCreateAPIView[Offer]):
+    queryset = Offer.objects.select_related("author")
     serializer_class = OfferSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        # Authenticated responses may be personalized, only anonymous listings are cached. The
+        # browsable API's HTML embeds request details, only JSON is.
+        if request.user.is_authenticated or request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+
+        # The key embeds the current generation, so it must be computed before the listing is
+        # queried. A write landing in between then bumps the generation past this entry.
+        key = offer_list_cache_key(request, listing_params(self))
+        if (cached := cache.get(key)) is not None:
+            content, content_type = cached
+            return CachedResponse(content, content_type)
+
+        response = super().list(request, *args, **kwargs)
+
+        def store(rendered: Response) -> None:
+            cache.set(key, (rendered.content, rendered["Content-Type"]), OFFER_LIST_CACHE_TIMEOUT)
+
+        response.add_post_render_callback(store)
+        return response
+
     def perform_create(self, serializer: BaseSerializer[Offer]) -> None:
-        serializer.save(author=self.request.user)
+        offer = serializer.save(author=self.request.user)
+        queue_offer_alerts(offer)
 
 
-class OfferDetailView(generics.RetrieveUpdateDestroyAPIView[Offer]):
-    queryset = Offer.objects.all()
+class OfferDetailView(FavoritedOffersMixin, generics.RetrieveUpdateDestroyAPIView[Offer]):
+    # Join the author up front, the serializer renders `author.username`
+    queryset = Offer.objects.select_related("author")
     serializer_class = OfferSerializer
     # IsAuthenticatedOrReadOnly implements has_permission() - checked before fetching the object
     # IsAuthorOrReadOnly implements has_object_permission() - checked after fetching the object
@@ -29,6 +102,90 @@ class OfferDetailView(generics.RetrieveUpdateDestroyAPIView[Offer]):
     # With both, it fails early at has_permission without the unnecessary database query.
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
 
+    def get_queryset(self) -> QuerySet[Offer]:
+        # A write resolves the object and its ownership in a single lookup on (`id`,
+        # `author_id`). Other users' offers are simply not found.
+        if self.request.method in permissions.SAFE_METHODS:
+            return super().get_queryset()
+        return Offer.objects.owned_by(self.request.user).select_related("author")
+
+
+class FavoriteListView(FavoritedOffersMixin, generics.ListAPIView[Offer]):
+    """The offers the requesting user has favorited, most recently favorited first."""
+
+    serializer_class = OfferSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[Offer]:
+        return (
+            Offer.objects.filter(favorites__user_id=authenticated_user_id(self.request))
+            .select_related("author")
+            .order_by("-favorites__created")
+        )
+
+
+class FavoriteView(views.APIView):
+    """Favorite (POST) or unfavorite (DELETE) an offer, both idempotent."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request, pk: int) -> Response:
+        offer = generics.get_object_or_404(Offer.objects.only("id"), pk=pk)
+        _, created = Favorite.objects.get_or_create(
+            user_id=authenticated_user_id(request), offer=offer
+        )
+        return Response(status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request: Request, pk: int) -> Response:
+        # Delete instances rather than the queryset, so the favorites cache is invalidated
+        for favorite in Favorite.objects.filter(
+            user_id=authenticated_user_id(request), offer_id=pk
+        ):
+            favorite.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class OfferStatsView(views.APIView):
+    """Price statistics per size and property type, read from the precomputed buckets."""
+
+    def get(self, request: Request) -> Response:
+        buckets = OfferPriceBucket.objects.filter(count__gt=0)
+        for param in ("size", "property_type"):
+            if (value := request.query_params.get(param)) is not None:
+                buckets = buckets.filter(**{param: value})
+        return Response(summarize(buckets))
+
+
+class OfferChangesView(views.APIView):
+    """Offers created, updated or deleted after the `?since=` cursor, see `offer_changes`.
+
+    Without a cursor every offer is returned, a page at a time. Each response carries the
+    opaque cursor to pass on the next request, and `more` while there are pages left.
+    """
+
+    def get(self, request: Request) -> Response:
+        return Response(offer_changes(request.query_params.get("since")))
+
+
+class SavedSearchListView(generics.ListCreateAPIView[SavedSearch]):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[SavedSearch]:
+        return SavedSearch.objects.owned_by(self.request.user)
+
+    def perform_create(self, serializer: BaseSerializer[SavedSearch]) -> None:
+        serializer.save(user=self.request.user)
+
+
+class SavedSearchDetailView(generics.RetrieveDestroyAPIView[SavedSearch]):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[SavedSearch]:
+        # Other users' searches are simply not found
+        return SavedSearch.objects.owned_by(self.request.user)
+
 
 class UserListView(generics.ListAPIView):  # type: ignore[type-arg]
     queryset = User.objects.all()
@@ -38,3 +195,13 @@ class UserListView(generics.ListAPIView):  # type: ignore[type-arg]
 class UserDetailView(generics.RetrieveAPIView):  # type: ignore[type-arg]
     queryset = User.objects.all()
     serializer_class = UserSerializer
+
+
+class TokenLogoutView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        # Deleting the token evicts it from the authentication cache, see `signals.py`
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -17,9 +17,13 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import include, path
+from offers.views import TokenLogoutView
+from rest_framework.authtoken.views import obtain_auth_token
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("offers.urls")),
     path("api-auth/", include("rest_framework.urls")),
+    path("api-token-auth/", obtain_auth_token, name="api-token-auth"),
+    path("api-token-logout/", TokenLogoutView.as_view(), name="api-token-logout"),
 ]
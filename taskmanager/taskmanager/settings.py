@@ -49,6 +49,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Last, so the view middleware above runs before it serves the view
+    "tasks.asynchronous.SyncViewMiddleware",
 ]
 
 ROOT_URLCONF = "taskmanager.urls"
@@ -78,6 +80,12 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock when a transaction begins. A transaction that reads first
+            # and then writes, like the counter updates, otherwise fails with "database is
+            # locked" under concurrent writes rather than waiting for the lock.
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
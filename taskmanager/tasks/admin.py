@@ -1,11 +1,31 @@
 from django.contrib import admin
+from django.db.models import QuerySet
+from django.http import HttpRequest
 
-from .models import Task
+from .models import Task, WebhookEndpoint
+from .search import search_tasks
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
     list_display = ("title", "priority", "completed", "created_at")
     list_filter = ("completed", "priority")
+    # Searched through the full-text index rather than with LIKE, see get_search_results
     search_fields = ("title", "description")
     readonly_fields = ("id", "created_at", "updated_at")
+
+    def get_search_results(
+        self, request: HttpRequest, queryset: QuerySet[Task], search_term: str
+    ) -> tuple[QuerySet[Task], bool]:
+        """Return the tasks matching the search box, found through the full-text index."""
+        if not search_term:
+            return queryset, False
+        return search_tasks(queryset, search_term), False
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ("url", "active", "failures", "next_attempt_at")
+    list_filter = ("active",)
+    # Kept by the `deliver_webhooks` command
+    readonly_fields = ("failures", "next_attempt_at")
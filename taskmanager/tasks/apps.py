@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TasksConfig(AppConfig):
     name = "tasks"
+
+    def ready(self) -> None:
+        """Keep the search index's sync triggers installed across migrations."""
+        from .search import install_search_triggers
+
+        post_migrate.connect(install_search_triggers, sender=self)
@@ -0,0 +1,126 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
+from django.db.models import Model, QuerySet
+from django.http import Http404, HttpRequest
+from django.http.response import HttpResponseBase
+from django.shortcuts import aget_object_or_404
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+type AsyncHandler = Callable[..., Awaitable[Response]]
+
+
+class AsyncViewSetMixin[M: Model](GenericViewSet[M]):
+    """Serves the actions that have an async handler, named `a` + the action, on the event loop.
+
+    e.g. `alist` for `list`. Under ASGI the request then does not hold a thread from the sync
+    pool while it waits on the database. The other actions are run in a thread, as Django runs
+    any sync view under ASGI. With `asynchronous=False`, passed to `as_view`, every action is
+    served synchronously. So is every request under WSGI, with SyncViewMiddleware installed.
+
+    Authentication, permissions and throttling are sync in DRF and may query the database, so
+    they run in a thread before the async handler.
+    """
+
+    asynchronous = True
+
+    @classmethod
+    def as_view(cls, actions: dict[str, Any] | None = None, **initkwargs: Any) -> Any:
+        """Return the view, marked as async so Django awaits it rather than using a thread.
+
+        The synchronous view is attached as `sync_view`, for SyncViewMiddleware.
+        """
+        view: Any = super().as_view(actions, **initkwargs)
+        if initkwargs.get("asynchronous", cls.asynchronous):
+            markcoroutinefunction(view)
+            view.sync_view = super().as_view(actions, **{**initkwargs, "asynchronous": False})
+        return view
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+        """Dispatch to the async handler of the action, or to DRF's dispatch in a thread."""
+        if not self.asynchronous:
+            return super().dispatch(request, *args, **kwargs)
+        action = self.action_map.get((request.method or "").lower())
+        if (handler := getattr(self, f"a{action}", None)) is None:
+            return sync_to_async(super().dispatch)(request, *args, **kwargs)
+        return self.adispatch(handler, request, *args, **kwargs)
+
+    async def adispatch(
+        self, handler: AsyncHandler, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponseBase:
+        """Like DRF's `dispatch`, awaiting the handler."""
+        self.args = args
+        self.kwargs = kwargs
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        self.request = drf_request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(drf_request, *args, **kwargs)
+            response = await handler(drf_request, *args, **kwargs)
+        except Exception as exc:
+            # In a thread too, exception handlers being sync code that may query the database
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(drf_request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self) -> M:
+        """Like `get_object`, reading the object with the async ORM."""
+        return await self.alookup_object(self.filter_queryset(self.get_queryset()))
+
+    async def alookup_object[R](self, queryset: QuerySet[Any, R]) -> R:
+        """Return the object of the URL from the queryset, e.g. as a row with `values_list`."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj: R = await aget_object_or_404(
+                queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError) as e:
+            raise Http404 from e
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset[R](self, queryset: QuerySet[Any, R]) -> list[R] | None:
+        """Like `paginate_queryset`, with the paginator's `apaginate_queryset` if it has one."""
+        if self.paginator is None:
+            return None
+        if (apaginate := getattr(self.paginator, "apaginate_queryset", None)) is None:
+            page = await sync_to_async(self.paginate_queryset)(queryset)  # type: ignore[arg-type]
+            return None if page is None else list(page)
+        apage: list[R] | None = await apaginate(queryset, self.request, view=self)
+        return apage
+
+
+class SyncViewMiddleware:
+    """Serves the synchronous view of an AsyncViewSetMixin route under WSGI.
+
+    Django would otherwise run the async view in an event loop of its own for every request,
+    with each query handed back to the request's thread. Under ASGI it is not used.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase]) -> None:
+        if iscoroutinefunction(get_response):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        return self.get_response(request)
+
+    def process_view(
+        self,
+        request: HttpRequest,
+        view_func: Callable[..., Any],
+        view_args: tuple[Any, ...],
+        view_kwargs: dict[str, Any],
+    ) -> HttpResponseBase | None:
+        if (sync_view := getattr(view_func, "sync_view", None)) is None:
+            return None
+        response: HttpResponseBase = sync_view(request, *view_args, **view_kwargs)
+        return response
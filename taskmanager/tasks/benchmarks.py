@@ -0,0 +1,22 @@
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection, connections
+
+
+@contextmanager
+def throwaway_database() -> Iterator[None]:
+    """Switch to a new, migrated database for the duration, deleting it afterwards.
+
+    It is a file, unlike the in-memory test database, so it takes writes from several threads.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+        name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(name, verbosity=0)
@@ -0,0 +1,153 @@
+from collections import Counter
+from typing import Any
+from uuid import UUID
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from .counters import adjust_counts, count_changes, count_key
+from .models import OutboxEvent, Task, TaskTombstone
+from .outbox import change_event, queue_task_events
+from .serializers import TaskCreateSerializer, TaskSerializer, TaskUpdateSerializer
+from .stream import notifier, task_created, task_deleted, task_updated
+
+# Bounds the work, and the time locks are held, for a single request
+BULK_MAX_ITEMS = 1000
+
+
+class BulkTaskMixin(GenericViewSet[Task]):
+    """Adds `/tasks/bulk/` to create, partially update and delete lists of tasks.
+
+    Each request is all or nothing: it is validated in full, and if any item is invalid the
+    response is 400 with a list of errors aligned with the items, `{}` for the valid ones.
+    Otherwise it is written in a single transaction, with one query per batch rather than
+    one request per task.
+    """
+
+    def validate_bulk_data(self, data: Any) -> list[Any]:
+        """Check the request body is a list of at most BULK_MAX_ITEMS items."""
+        if not isinstance(data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+        if not data:
+            raise ValidationError({"non_field_errors": ["This list may not be empty."]})
+        if len(data) > BULK_MAX_ITEMS:
+            raise ValidationError(
+                {"non_field_errors": [f"Ensure this list has at most {BULK_MAX_ITEMS} items."]}
+            )
+        return data
+
+    @action(detail=False, methods=["post"], url_path="bulk", url_name="bulk")
+    def bulk_create(self, request: Request) -> Response:
+        """Create a list of tasks with a single INSERT per batch."""
+        serializer = TaskCreateSerializer(data=self.validate_bulk_data(request.data), many=True)
+        serializer.is_valid(raise_exception=True)
+        tasks = [Task(**item) for item in serializer.validated_data]
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            adjust_counts(Counter(count_key(task) for task in tasks))
+            queue_task_events((OutboxEvent.Type.CREATED, task) for task in tasks)
+            notifier.publish_on_commit(lambda: [task_created(task) for task in tasks])
+        return Response(TaskSerializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+    def validate_ids(self, items: list[Any]) -> tuple[list[UUID | None], list[dict[str, Any]]]:
+        """Validate the id of each item, returning the ids and the errors aligned with them.
+
+        Items are either ids, or objects carrying one as `id`. The id of an invalid item is None.
+        """
+        id_field = serializers.UUIDField()
+        ids: list[UUID | None] = []
+        errors: list[dict[str, Any]] = []
+        seen: set[UUID] = set()
+        for item in items:
+            try:
+                value = item.get("id", empty) if isinstance(item, dict) else item
+                task_id = id_field.run_validation(value)
+                if task_id in seen:
+                    raise serializers.ValidationError("Duplicate id.")
+                seen.add(task_id)
+            except serializers.ValidationError as e:
+                ids.append(None)
+                errors.append({"id": e.detail})
+            else:
+                ids.append(task_id)
+                errors.append({})
+        return ids, errors
+
+    @bulk_create.mapping.patch
+    def bulk_partial_update(self, request: Request) -> Response:
+        """Partially update a list of tasks, each item identified by its `id`."""
+        items = self.validate_bulk_data(request.data)
+        ids, errors = self.validate_ids(items)
+        with transaction.atomic():
+            # Locked until the transaction ends, so concurrent writes cannot interleave
+            tasks = Task.objects.select_for_update().in_bulk([i for i in ids if i is not None])
+            fields = {"updated_at"}
+            before = [count_key(task) for task in tasks.values()]
+            was_completed = {task.pk: task.completed for task in tasks.values()}
+            for i, (task_id, item) in enumerate(zip(ids, items, strict=True)):
+                if task_id is None:
+                    continue
+                if (task := tasks.get(task_id)) is None:
+                    errors[i] = {"id": ["Not found."]}
+                    continue
+                serializer = TaskUpdateSerializer(task, data=item, partial=True)
+                if not serializer.is_valid():
+                    errors[i] = serializer.errors
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(task, field, value)
+                    fields.add(field)
+            if any(errors):
+                raise ValidationError(errors)
+
+            # bulk_update skips `auto_now`, so stamp the modification time here
+            now = timezone.now()
+            updated = [tasks[task_id] for task_id in ids if task_id is not None]
+            for task in updated:
+                task.updated_at = now
+            Task.objects.bulk_update(updated, sorted(fields))
+            adjust_counts(count_changes(before, [count_key(task) for task in updated]))
+            queue_task_events(
+                (change_event(was_completed[task.pk], task), task) for task in updated
+            )
+            notifier.publish_on_commit(
+                lambda: [task_updated(was_completed[task.pk], task) for task in updated]
+            )
+        return Response(TaskSerializer(updated, many=True).data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request: Request) -> Response:
+        """Delete a list of tasks, given by id, with a single DELETE ... WHERE id IN.
+
+        Their tombstones are written with a single INSERT.
+        """
+        ids, errors = self.validate_ids(self.validate_bulk_data(request.data))
+        with transaction.atomic():
+            found = {
+                task_id: (completed, priority)
+                for task_id, completed, priority in Task.objects.select_for_update()
+                .filter(id__in=[i for i in ids if i is not None])
+                .values_list("id", "completed", "priority")
+            }
+            for i, task_id in enumerate(ids):
+                if task_id is not None and task_id not in found:
+                    errors[i] = {"id": ["Not found."]}
+            if any(errors):
+                raise ValidationError(errors)
+            # Tasks have no relations or signals, so this is a single query
+            Task.objects.filter(id__in=found).delete()
+            adjust_counts(count_changes(found.values(), []))
+            TaskTombstone.objects.bulk_create(TaskTombstone(id=task_id) for task_id in found)
+            notifier.publish_on_commit(
+                lambda: [
+                    task_deleted(task_id, completed) for task_id, (completed, _) in found.items()
+                ]
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
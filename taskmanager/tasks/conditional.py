@@ -0,0 +1,47 @@
+from datetime import UTC, datetime, timedelta
+from typing import Protocol
+from uuid import UUID
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+class PreconditionFailed(APIException):
+    """Raised when a conditional update finds the task changed, with status 412."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The task was modified since it was fetched."
+    default_code = "precondition_failed"
+
+
+class Versioned(Protocol):
+    """A task, or a row of one, with the fields its ETag is made of."""
+
+    @property
+    def id(self) -> UUID: ...
+
+    @property
+    def updated_at(self) -> datetime: ...
+
+
+def task_etag(task: Versioned) -> str:
+    """Return the task's ETag, which changes whenever the task is saved.
+
+    `updated_at` is encoded as whole microseconds since the epoch, in integer arithmetic, as
+    a float timestamp cannot tell apart every microsecond.
+    """
+    return quote_etag(f"{task.id.hex}-{(task.updated_at - EPOCH) // timedelta(microseconds=1)}")
+
+
+def etag_matches(header: str, task: Versioned, weak: bool = False) -> bool:
+    """Tell whether an If-Match or If-None-Match header lists the task's current ETag.
+
+    If-None-Match compares weakly, ignoring a `W/` prefix, If-Match strongly.
+    """
+    etags = parse_etags(header)
+    if weak:
+        etags = [etag.removeprefix("W/") for etag in etags]
+    return "*" in etags or task_etag(task) in etags
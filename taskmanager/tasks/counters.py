@@ -0,0 +1,83 @@
+from collections import Counter
+from collections.abc import Iterable
+from functools import reduce
+from operator import or_
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .models import Task, TaskCount
+
+PRIORITIES = range(1, 6)
+
+# (completed, priority)
+type CountKey = tuple[bool, int]
+
+
+def count_key(task: Task) -> CountKey:
+    return task.completed, task.priority
+
+
+def adjust_counts(deltas: Counter[CountKey]) -> None:
+    """Apply the changes in task counts with a single UPDATE, in SQL so none can be lost.
+
+    Call it in the transaction writing the tasks, so the counts commit or roll back with them.
+    """
+    if not (changed := {key: delta for key, delta in deltas.items() if delta}):
+        return
+    whens = [
+        When(completed=completed, priority=priority, then=Value(delta))
+        for (completed, priority), delta in changed.items()
+    ]
+    TaskCount.objects.filter(
+        reduce(or_, (Q(completed=completed, priority=priority) for completed, priority in changed))
+    ).update(count=F("count") + Case(*whens, default=Value(0)))
+
+
+def count_changes(before: Iterable[CountKey], after: Iterable[CountKey]) -> Counter[CountKey]:
+    """Return the changes in counts from tasks leaving the `before` keys for the `after` ones."""
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return deltas
+
+
+def rebuild_task_counts() -> None:
+    """Recount every status and priority from the tasks table."""
+    counts = {
+        (row["completed"], row["priority"]): row["count"]
+        for row in Task.objects.order_by()
+        .values("completed", "priority")
+        .annotate(count=Count("id"))
+    }
+    with transaction.atomic():
+        TaskCount.objects.all().delete()
+        TaskCount.objects.bulk_create(
+            TaskCount(
+                completed=completed, priority=priority, count=counts.get((completed, priority), 0)
+            )
+            for completed in (False, True)
+            for priority in PRIORITIES
+        )
+
+
+def task_summary() -> dict[str, Any]:
+    """Summarize the task counts overall, by status and by priority, from the ten counters."""
+    counts = {(row.completed, row.priority): row.count for row in TaskCount.objects.all()}
+    by_priority = [
+        {
+            "priority": priority,
+            "total": counts.get((False, priority), 0) + counts.get((True, priority), 0),
+            "completed": counts.get((True, priority), 0),
+            "pending": counts.get((False, priority), 0),
+        }
+        for priority in PRIORITIES
+    ]
+    completed = sum(row["completed"] for row in by_priority)
+    pending = sum(row["pending"] for row in by_priority)
+    return {
+        "total": completed + pending,
+        "completed": completed,
+        "pending": pending,
+        "by_priority": by_priority,
+    }
@@ -0,0 +1,121 @@
+import csv
+import functools
+import io
+import itertools
+import json
+from collections.abc import AsyncIterator, Generator, Iterable, Iterator, Mapping
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# The columns exported, read with `values()` so no model instance is built per row
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "priority",
+    "completed",
+    "created_at",
+    "updated_at",
+    "claimed_until",
+]
+# Rows read from the database per round trip, and written to the response per chunk
+EXPORT_CHUNK_SIZE = 2000
+
+_encoder = JSONEncoder()
+
+
+def export_value(value: Any) -> Any:
+    """Format a value the way the API's JSON does, e.g. datetimes as ISO 8601."""
+    if value is None or isinstance(value, str | int | float):
+        return value
+    return _encoder.default(value)
+
+
+async def aiterate_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield the chunks of a sync stream, each made in the thread the sync ORM calls share.
+
+    Under ASGI the chunks are then sent as they are read, where Django would read a sync stream
+    in full before sending any of it.
+    """
+    read = sync_to_async(functools.partial(next, chunks, None))
+    try:
+        while (chunk := await read()) is not None:
+            yield chunk
+    finally:
+        # Closes the database cursor too, when the client goes away first
+        if isinstance(chunks, Generator):
+            await sync_to_async(chunks.close)()
+
+
+class StreamingRenderer(BaseRenderer):
+    """Base class for renderers writing rows of tasks, either at once or as a stream."""
+
+    charset = "utf-8"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        """Render a list of rows, or a single object such as an error, in one piece."""
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.stream(rows))
+
+    def stream(
+        self, rows: Iterable[Mapping[str, Any]], fields: list[str] | None = None
+    ) -> Iterator[bytes]:
+        """Yield the encoded rows, a chunk of rows at a time.
+
+        `fields` are the keys of every row, taken from the first row when not given.
+        """
+        raise NotImplementedError
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Renders rows as newline-delimited JSON, one object per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(
+        self, rows: Iterable[Mapping[str, Any]], fields: list[str] | None = None
+    ) -> Iterator[bytes]:
+        for chunk in itertools.batched(rows, EXPORT_CHUNK_SIZE, strict=False):
+            yield "".join(
+                json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n" for row in chunk
+            ).encode()
+
+
+class CSVRenderer(StreamingRenderer):
+    """Renders rows as CSV, with a header row."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(
+        self, rows: Iterable[Mapping[str, Any]], fields: list[str] | None = None
+    ) -> Iterator[bytes]:
+        rows = iter(rows)
+        if fields is None:
+            if (first := next(rows, None)) is None:
+                return
+            rows = itertools.chain([first], rows)
+            fields = list(first)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        # The header goes out even when there are no rows
+        for chunk in itertools.chain(
+            [()], itertools.batched(rows, EXPORT_CHUNK_SIZE, strict=False)
+        ):
+            writer.writerows(
+                {key: export_value(value) for key, value in row.items()} for row in chunk
+            )
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import mixins, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def request_fingerprint(request: Request) -> str:
+    """Hash the request payload, so a key reused for a different request can be rejected."""
+    data = request.data
+    if hasattr(data, "lists"):
+        # Form data, where every key may carry several values
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def expire_idempotency_keys() -> int:
+    """Delete the keys past their TTL, returning how many were deleted."""
+    cutoff = timezone.now() - IDEMPOTENCY_KEY_TTL
+    count, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return count
+
+
+class IdempotentCreateMixin(mixins.CreateModelMixin):
+    """Makes `create` safe to retry by sending the same `Idempotency-Key` header.
+
+    The first request with a key claims it by inserting its row, the unique constraint making
+    the claim atomic. Once the request is handled, its response is stored on the row and
+    retries replay it with a single lookup, without validating or inserting anything, a
+    rejection such as a 400 included. Only a server error releases the key to be retried. A
+    retry that arrives while the first request is still running gets 409, one with a different
+    payload gets 422.
+    """
+
+    # Provided by the view
+    handle_exception: Callable[[Exception], Response]
+
+    def get_idempotency_scope(self, request: Request) -> str:
+        """Return the namespace keys are unique in, so clients cannot replay each other's.
+
+        Anonymous clients are told apart by address, as the throttles do, hashed to fit.
+        """
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        ident = BaseThrottle().get_ident(request)
+        return f"anonymous:{hashlib.sha256(ident.encode()).hexdigest()[:32]}"
+
+    def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Create the object, or replay the response to an earlier request with the same key."""
+        if (key := request.headers.get(IDEMPOTENCY_KEY_HEADER)) is None:
+            return super().create(request, *args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValidationError({IDEMPOTENCY_KEY_HEADER: "Key is too long."})
+
+        scope = self.get_idempotency_scope(request)
+        fingerprint = request_fingerprint(request)
+        keys = IdempotencyKey.objects.filter(scope=scope, key=key)
+        if (record := keys.first()) is not None:
+            if record.created_at >= timezone.now() - IDEMPOTENCY_KEY_TTL:
+                return self.replay(record, fingerprint)
+            # Expired but not swept yet
+            keys.delete()
+
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope, key=key, fingerprint=fingerprint
+                )
+        except IntegrityError:
+            # A concurrent request claimed the key between the lookup and the insert
+            return self.replay(keys.get(), fingerprint)
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except APIException as exc:
+            # Rendered here rather than by the view, so the rejection is stored like a response
+            response = self.handle_exception(exc)
+        except Exception:
+            # Release the key, the client may retry a request that failed
+            record.delete()
+            raise
+        if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=["status_code", "response"])
+        return response
+
+    def replay(self, record: IdempotencyKey, fingerprint: str) -> Response:
+        """Return the stored response for a retry, or the reason it cannot be replayed."""
+        if record.fingerprint != fingerprint:
+            return Response(
+                {"detail": "Idempotency key was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is None:
+            return Response(
+                {"detail": "A request with this idempotency key is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        response = Response(record.response, status=record.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
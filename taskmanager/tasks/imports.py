@@ -0,0 +1,60 @@
+import csv
+import json
+from collections.abc import Iterator
+from typing import IO, Any
+
+from django.core.exceptions import ValidationError
+
+from .models import Task
+
+IMPORT_FORMATS = ("ndjson", "csv")
+# The fields read from each row, any other column is ignored
+IMPORT_FIELDS = ("title", "description", "priority", "completed")
+
+_BOOLEANS = {"true": True, "t": True, "1": True, "false": False, "f": False, "0": False}
+
+
+def read_rows(file: IO[str], format: str) -> Iterator[dict[str, Any] | str]:
+    """Yield the rows of an NDJSON or CSV input one at a time.
+
+    CSV rows are dicts, NDJSON ones the undecoded lines, so a malformed line is reported by
+    `build_task` like any other invalid row. Blank lines are skipped.
+    """
+    if format == "csv":
+        yield from csv.DictReader(file)
+    else:
+        yield from (line for line in file if line.strip())
+
+
+def build_task(row: dict[str, Any] | str) -> Task:
+    """Validate a row with the Task model's own field validators, and build its task.
+
+    Only the imported fields are checked, with `Field.clean`, which is much cheaper than a
+    serializer or `full_clean` per row. Missing fields get their model defaults.
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise ValidationError(f"Invalid JSON: {e}") from e
+    if not isinstance(row, dict):
+        raise ValidationError("Expected an object.")
+
+    values: dict[str, Any] = {}
+    errors: dict[str, list[str]] = {}
+    for name in IMPORT_FIELDS:
+        field = Task._meta.get_field(name)
+        value = row.get(name)
+        if value is None or value == "":
+            if name == "title":
+                errors[name] = ["This field is required."]
+            continue
+        if name == "completed" and isinstance(value, str):
+            value = _BOOLEANS.get(value.lower(), value)
+        try:
+            values[name] = field.clean(value, None)  # type: ignore[union-attr]
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return Task(**values)
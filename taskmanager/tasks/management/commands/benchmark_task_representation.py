@@ -0,0 +1,69 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from tasks.benchmarks import throwaway_database
+from tasks.models import Task
+from tasks.representation import task_representation
+from tasks.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare TaskSerializer with its compiled representation over rows, reading and "
+        "representing every task, then representing alone. Runs against a throwaway copy of "
+        "the database."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--tasks", type=int, default=10000, help="Tasks in the database.")
+        parser.add_argument("--rounds", type=int, default=5, help="Runs, the best one counts.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with throwaway_database():
+            Task.objects.bulk_create(
+                Task(title=f"Task {i}", description=f"Description {i}" if i % 2 else None)
+                for i in range(options["tasks"])
+            )
+            self.benchmark(options["rounds"])
+
+    def benchmark(self, rounds: int) -> None:
+        """Time both ways of representing the tasks, writing a row of results for each."""
+        tasks = list(Task.objects.all())
+        rows = list(Task.objects.values_list(*task_representation.columns))
+        serialized: Any = TaskSerializer(tasks, many=True).data
+        if serialized != task_representation(rows):
+            raise CommandError("The representations differ.")
+
+        cases: list[tuple[str, Callable[[], object], Callable[[], object]]] = [
+            (
+                "read and represent",
+                lambda: TaskSerializer(Task.objects.all(), many=True).data,
+                lambda: task_representation(Task.objects.values_list(*task_representation.columns)),
+            ),
+            (
+                "represent",
+                lambda: TaskSerializer(tasks, many=True).data,
+                lambda: task_representation(rows),
+            ),
+        ]
+        self.stdout.write(f"{'':<20} {'serializer ms':>14} {'compiled ms':>12} {'speedup':>8}")
+        for name, serializer, compiled in cases:
+            serializer_time, compiled_time = (
+                self.best(run, rounds) for run in [serializer, compiled]
+            )
+            self.stdout.write(
+                f"{name:<20} {serializer_time * 1000:>14.1f} {compiled_time * 1000:>12.1f} "
+                f"{serializer_time / compiled_time:>7.1f}x"
+            )
+
+    def best(self, run: Callable[[], object], rounds: int) -> float:
+        """Return the shortest time taken by the function over the rounds."""
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        return min(times)
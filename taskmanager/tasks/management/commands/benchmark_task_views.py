@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from collections.abc import Mapping
+from types import ModuleType
+from typing import Any
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import override_settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from tasks.benchmarks import throwaway_database
+from tasks.counters import rebuild_task_counts
+from tasks.models import Task
+from tasks.views import TaskViewSet
+
+# The action benchmarked, and a function making the request's method, path, query string and
+# body from a task id
+type Request = tuple[str, str, str, bytes]
+SCENARIOS: list[tuple[str, Any]] = [
+    ("list", lambda pk: ("GET", "/api/tasks/", "completed=false", b"")),
+    ("retrieve", lambda pk: ("GET", f"/api/tasks/{pk}/", "", b"")),
+    ("create", lambda pk: ("POST", "/api/tasks/", "", json.dumps({"title": "New"}).encode())),
+    (
+        "update",
+        lambda pk: (
+            "PATCH",
+            f"/api/tasks/{pk}/",
+            "",
+            json.dumps({"priority": random.randint(1, 5)}).encode(),
+        ),
+    ),
+    ("destroy", lambda pk: ("DELETE", f"/api/tasks/{pk}/", "", b"")),
+]
+
+
+def task_urlconf(asynchronous: bool) -> ModuleType:
+    """Return a URLconf routing the task API to TaskViewSet, with or without its async views."""
+    viewset = type("BenchmarkTaskViewSet", (TaskViewSet,), {"asynchronous": asynchronous})
+    router = DefaultRouter()
+    router.register(r"tasks", viewset, basename="task")
+    urlconf = ModuleType(f"benchmark_urls_{'async' if asynchronous else 'sync'}")
+    urlconf.urlpatterns = [path("api/", include((router.urls, "tasks")))]  # type: ignore[attr-defined]
+    return urlconf
+
+
+async def serve(application: ASGIHandler, request: Request) -> int:
+    """Serve the request as an ASGI server would, returning the response status."""
+    method, url, query, body = request
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": url,
+        "raw_path": url.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        # Localhost is an allowed host in development
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = asyncio.Event()
+    response_status = 0
+
+    async def receive() -> dict[str, Any]:
+        if messages:
+            return messages.pop()
+        # The handler listens for a disconnect while it serves the request
+        await sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Mapping[str, Any]) -> None:
+        nonlocal response_status
+        if message["type"] == "http.response.start":
+            response_status = message["status"]
+
+    await application(scope, receive, send)
+    sent.set()
+    return response_status
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second and latency of the sync and async TaskViewSet handlers, "
+        "served through Django's ASGI handler, concurrently on one event loop as an ASGI "
+        "server such as uvicorn serves them, without the network. Runs against a throwaway "
+        "copy of the database."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per run.")
+        parser.add_argument(
+            "--concurrency", type=int, default=50, help="Requests in flight at once."
+        )
+        parser.add_argument("--tasks", type=int, default=1000, help="Tasks in the database.")
+        parser.add_argument(
+            "--actions",
+            nargs="+",
+            choices=[name for name, _ in SCENARIOS],
+            default=[name for name, _ in SCENARIOS],
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with throwaway_database():
+            self.benchmark(options)
+
+    def benchmark(self, options: dict[str, Any]) -> None:
+        """Run every scenario with both handlers, writing a row of results for each."""
+        Task.objects.bulk_create(
+            Task(title=f"Task {i}", priority=i % 5 + 1, completed=i % 2 == 0)
+            for i in range(options["tasks"])
+        )
+        rebuild_task_counts()
+        ids = list(Task.objects.values_list("id", flat=True))
+
+        self.stdout.write(
+            f"{'action':<10} {'handler':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}"
+        )
+        for name, make_request in SCENARIOS:
+            if name not in options["actions"]:
+                continue
+            for asynchronous in [False, True]:
+                if name == "destroy":
+                    # Every delete needs a task of its own
+                    targets = [
+                        task.pk
+                        for task in Task.objects.bulk_create(
+                            Task(title="Delete me") for _ in range(options["requests"])
+                        )
+                    ]
+                else:
+                    targets = random.choices(ids, k=options["requests"])
+                requests = [make_request(pk) for pk in targets]
+                with override_settings(ROOT_URLCONF=task_urlconf(asynchronous)):
+                    elapsed, latencies, errors = asyncio.run(
+                        self.run(ASGIHandler(), requests, options["concurrency"])
+                    )
+                p50, p99 = (statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 98))
+                self.stdout.write(
+                    f"{name:<10} {'async' if asynchronous else 'sync':<8} "
+                    f"{len(requests) / elapsed:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>6}"
+                )
+
+    async def run(
+        self, application: ASGIHandler, requests: list[Request], concurrency: int
+    ) -> tuple[float, list[float], int]:
+        """Serve the requests, at most `concurrency` at a time.
+
+        Returns the time taken, the latency of each request and how many failed.
+        """
+        pending = iter(requests)
+        latencies: list[float] = []
+        errors = itertools.count()
+
+        async def worker() -> None:
+            for request in pending:
+                start = time.perf_counter()
+                if await serve(application, request) >= 400:
+                    next(errors)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, next(errors)
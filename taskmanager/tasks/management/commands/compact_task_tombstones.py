@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from tasks.sync import expire_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of tasks deleted longer ago than the sync retention window. "
+        "Meant to be run periodically, e.g. from cron."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Delete the expired tombstones and report how many there were."""
+        count = expire_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired tombstones"))
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from tasks.webhooks import WEBHOOK_BATCH_SIZE, ConnectionPool, deliver_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver the task events queued in the outbox to the webhook endpoints, in batches per "
+        "endpoint, posted concurrently over kept-alive connections. Runs until interrupted, "
+        "polling the outbox, or with --once until nothing is due."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=WEBHOOK_BATCH_SIZE)
+        parser.add_argument(
+            "--concurrency", type=int, default=10, help="Endpoints delivered to at once."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=1.0, help="Seconds to wait when nothing is due."
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once nothing is due, e.g. run from cron."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        pool = ConnectionPool(maxsize=options["concurrency"])
+        delivered = 0
+        try:
+            with ThreadPoolExecutor(options["concurrency"]) as executor:
+                while True:
+                    result = deliver_events(
+                        pool, executor, options["concurrency"], options["batch_size"]
+                    )
+                    delivered += result.delivered
+                    for url, reason in result.failures:
+                        self.stderr.write(f"Delivery to {url} failed: {reason}")
+                    if not result.endpoints:
+                        if options["once"]:
+                            break
+                        time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.close()
+        self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} events"))
@@ -0,0 +1,81 @@
+import itertools
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction
+
+from tasks.counters import adjust_counts, count_key
+from tasks.imports import IMPORT_FORMATS, build_task, read_rows
+from tasks.models import ImportCheckpoint, OutboxEvent, Task
+from tasks.outbox import queue_task_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks from an NDJSON or CSV file, in batches committed one at a time. "
+        "With --resume, an import that failed continues after its last committed batch."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument(
+            "--format", choices=IMPORT_FORMATS, help="Defaults to the file's extension."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--resume", action="store_true", help="Skip the rows committed by an earlier run."
+        )
+        parser.add_argument(
+            "--source", help="Name of the checkpoint to resume from. Defaults to the path."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path = options["path"]
+        format = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if format not in IMPORT_FORMATS:
+            raise CommandError("Cannot tell the format from the path, pass --format.")
+        source = options["source"] or (path if path == "-" else str(Path(path).resolve()))
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+        if not options["resume"]:
+            checkpoint.rows = 0
+            checkpoint.save(update_fields=["rows", "updated_at"])
+        skipped = checkpoint.rows
+
+        file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")  # noqa: SIM115
+        with file:
+            rows = itertools.islice(read_rows(file, format), skipped, None)
+            imported = 0
+            start = time.monotonic()
+            for batch in itertools.batched(rows, options["batch_size"], strict=False):
+                tasks = []
+                for number, row in enumerate(batch, start=skipped + imported + 1):
+                    try:
+                        tasks.append(build_task(row))
+                    except ValidationError as e:
+                        raise CommandError(
+                            f"Row {number} is invalid: {e}. {skipped + imported} rows are "
+                            "committed, fix the row and rerun with --resume."
+                        ) from e
+                with transaction.atomic():
+                    Task.objects.bulk_create(tasks)
+                    adjust_counts(Counter(count_key(task) for task in tasks))
+                    queue_task_events((OutboxEvent.Type.CREATED, task) for task in tasks)
+                    checkpoint.rows = skipped + imported + len(tasks)
+                    checkpoint.save(update_fields=["rows", "updated_at"])
+                imported += len(tasks)
+                self.stdout.write(f"{imported} rows, {self.rate(imported, start):.0f} rows/s")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} tasks ({self.rate(imported, start):.0f} rows/s)"
+                + (f", after skipping {skipped} already imported" if skipped else "")
+            )
+        )
+
+    def rate(self, rows: int, start: float) -> float:
+        return rows / max(time.monotonic() - start, 1e-9)
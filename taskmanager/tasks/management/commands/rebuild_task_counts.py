@@ -0,0 +1,14 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from tasks.counters import rebuild_task_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the task summary counters from the tasks table."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Rebuild the counters."""
+        rebuild_task_counts()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the task counters"))
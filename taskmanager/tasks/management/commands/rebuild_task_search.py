@@ -0,0 +1,14 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from tasks.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of tasks, e.g. after a VACUUM renumbered rows."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Reindex every task."""
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the task search index"))
@@ -0,0 +1,96 @@
+# Generated by Django 6.0 on 2026-10-19 15:58
+
+import itertools
+import os
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from django.db import migrations, models
+
+
+def uuid7_at(created_at):
+    """Build a UUIDv7 for an existing task from its creation time.
+
+    The 12 bits after the millisecond timestamp hold the sub-millisecond part, so rekeyed
+    tasks keep their `created_at` order down to the microsecond.
+    """
+    ms, us = divmod((created_at - datetime(1970, 1, 1, tzinfo=UTC)) // timedelta(microseconds=1), 1000)
+    rand_b = int.from_bytes(os.urandom(8)) & ((1 << 62) - 1)
+    return uuid.UUID(int=ms << 80 | 0x7 << 76 | us * 4096 // 1000 << 64 | 0b10 << 62 | rand_b)
+
+
+def rekey_tasks(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    TaskAlias = apps.get_model("tasks", "TaskAlias")
+    # The mapping is written first, in batches, then every task is rekeyed by one UPDATE
+    # reading its new id from it
+    tasks = Task.objects.order_by().values_list("id", "created_at")
+    for batch in itertools.batched(tasks.iterator(chunk_size=1000), 1000):
+        TaskAlias.objects.bulk_create(
+            TaskAlias(old_id=task_id, task_id=uuid7_at(created_at)) for task_id, created_at in batch
+        )
+    Task.objects.update(
+        id=models.Subquery(TaskAlias.objects.filter(old_id=models.OuterRef("id")).values("task_id"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_pending_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_completed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_priority_idx',
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.CreateModel(
+            name='TaskAlias',
+            fields=[
+                ('old_id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('task_id', models.UUIDField()),
+            ],
+        ),
+        # Existing random keys are replaced by UUIDv7 ones, so the primary key orders every
+        # task by creation time. The old ones are kept as aliases, to redirect links to them.
+        migrations.RunPython(rekey_tasks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['-id'], name='task_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['-id'], name='task_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority', '-id'], name='task_priority_idx'),
+        ),
+    ]
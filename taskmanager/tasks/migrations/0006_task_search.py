@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite's. The sync triggers are installed after migrating, see
+    # tasks.search.install_search_triggers.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE tasks_task_fts USING fts5("
+        "title, description, content='tasks_task', content_rowid='rowid',"
+        " tokenize='unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for trigger in ["insert", "delete", "update"]:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS tasks_task_fts_{trigger}")
+    schema_editor.execute("DROP TABLE tasks_task_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_uuid7'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
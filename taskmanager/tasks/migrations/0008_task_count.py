@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 16:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_task_counts(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    TaskCount = apps.get_model("tasks", "TaskCount")
+    counts = {
+        (row["completed"], row["priority"]): row["count"]
+        for row in Task.objects.order_by().values("completed", "priority").annotate(count=Count("id"))
+    }
+    # One row per status and priority 1-5, so writes only ever need to UPDATE
+    TaskCount.objects.bulk_create(
+        TaskCount(completed=completed, priority=priority, count=counts.get((completed, priority), 0))
+        for completed in (False, True)
+        for priority in range(1, 6)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed', models.BooleanField()),
+                ('priority', models.PositiveIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('completed', 'priority'), name='unique_task_count')],
+            },
+        ),
+        migrations.RunPython(seed_task_counts, migrations.RunPython.noop),
+    ]
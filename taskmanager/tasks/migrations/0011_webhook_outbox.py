@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 16:41
+
+import django.core.serializers.json
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2000, validators=[django.core.validators.URLValidator(schemes=['http', 'https'])])),
+                ('active', models.BooleanField(default=True)),
+                ('failures', models.PositiveIntegerField(default=0, editable=False)),
+                ('next_attempt_at', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('task.created', 'Created'), ('task.updated', 'Updated'), ('task.completed', 'Completed')], max_length=32)),
+                ('task_id', models.UUIDField()),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('endpoint', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='tasks.webhookendpoint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['endpoint', 'id'], name='outbox_event_endpoint_idx')],
+            },
+        ),
+    ]
@@ -1,13 +1,16 @@
 import uuid
 
-from django.core.validators import MaxValueValidator, MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator, URLValidator
 from django.db import models
 
 
 class Task(models.Model):
     """Model representing a task in the system."""
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # UUIDv7 keys lead with their creation time in milliseconds, so inserts append to the
+    # B-tree and the primary key orders tasks like `created_at` does
+    id = models.UUIDField(primary_key=True, default=uuid.uuid7, editable=False)
     title = models.CharField(max_length=200, db_index=True)
     description = models.TextField(blank=True, null=True)
     priority = models.PositiveIntegerField(
@@ -15,12 +18,192 @@ class Task(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)],
     )
     completed = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Indexed for the `created_after` and `created_before` filters
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by the claim endpoint, a task is claimed until its lease expires, see `claim_tasks`
+    claimed_until = models.DateTimeField(null=True, blank=True, editable=False)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
 
     class Meta:
-        ordering = ["-created_at"]
+        # Newest first, read backwards off the primary key index
+        ordering = ["-id"]
+        indexes = [
+            # Serve the `completed` and `priority` filters of the list, already in its order. The
+            # `completed` filter compiles to a bare `WHERE completed`, which a partial index per
+            # value matches but a (completed, id) one cannot seek on in SQLite.
+            models.Index(
+                fields=["-id"], condition=models.Q(completed=False), name="task_pending_idx"
+            ),
+            models.Index(
+                fields=["-id"], condition=models.Q(completed=True), name="task_completed_idx"
+            ),
+            models.Index(fields=["priority", "-id"], name="task_priority_idx"),
+            # Serve the sync endpoint, which reads the tasks changed after a cursor in this order
+            models.Index(fields=["updated_at", "id"], name="task_updated_idx"),
+            # Serve the claim endpoint, which takes the pending tasks by priority, then age.
+            # Partial for the same reason as the indexes of the `completed` filter.
+            models.Index(
+                fields=["-priority", "created_at"],
+                condition=models.Q(completed=False),
+                name="task_queue_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         """String representation of the task."""
         return self.title
+
+
+class TaskCount(models.Model):
+    """Model representing the number of tasks with a given status and priority.
+
+    There is one row per combination, created by migration 0008, kept up to date by the
+    writes of TaskViewSet and `import_tasks` and rebuilt by the `rebuild_task_counts` command.
+    """
+
+    completed = models.BooleanField()
+    priority = models.PositiveIntegerField()
+    # Signed, so tasks written around the counters and then deleted through the API cannot
+    # fail the write, the drift is left for the rebuild to correct
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["completed", "priority"], name="unique_task_count")
+        ]
+
+    def __str__(self) -> str:
+        """String representation of the count."""
+        return f"completed={self.completed}, priority={self.priority}: {self.count}"
+
+
+class TaskTombstone(models.Model):
+    """Model representing a deleted task, so sync clients can learn of the deletion.
+
+    Written in the same transaction as the delete, and compacted by the
+    `compact_task_tombstones` command once past TOMBSTONE_RETENTION.
+    """
+
+    # The id of the deleted task, which is never reused
+    id = models.UUIDField(primary_key=True, editable=False)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Serve the sync endpoint, and the compaction by `deleted_at`
+            models.Index(fields=["deleted_at", "id"], name="task_tombstone_deleted_idx")
+        ]
+
+    def __str__(self) -> str:
+        """String representation of the tombstone."""
+        return f"{self.id} deleted at {self.deleted_at}"
+
+
+class TaskAlias(models.Model):
+    """Model representing the random id a task had before migration 0005 rekeyed it.
+
+    Written by the migration, so requests for the old id are redirected to the task.
+    """
+
+    old_id = models.UUIDField(primary_key=True, editable=False)
+    # Not a foreign key, so deleting tasks is not a second DELETE. The alias of a deleted task
+    # redirects to its 404.
+    task_id = models.UUIDField()
+
+    def __str__(self) -> str:
+        """String representation of the alias."""
+        return f"{self.old_id} -> {self.task_id}"
+
+
+class WebhookEndpoint(models.Model):
+    """Model representing a URL the changes to tasks are posted to, for an integration.
+
+    Each change is queued for every active endpoint as an OutboxEvent, and delivered in
+    batches by the `deliver_webhooks` command, see `webhooks.py`.
+    """
+
+    url = models.URLField(max_length=2000, validators=[URLValidator(schemes=["http", "https"])])
+    active = models.BooleanField(default=True)
+    # Consecutive failed deliveries, which the retries back off by, reset by a successful one
+    failures = models.PositiveIntegerField(default=0, editable=False)
+    # When the next delivery is due, null for now. Also set for the time a delivery may take,
+    # as a lease, so concurrent workers do not deliver the same events.
+    next_attempt_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self) -> str:
+        """String representation of the endpoint."""
+        return self.url
+
+
+class OutboxEvent(models.Model):
+    """Model representing a change to a task, waiting to be delivered to a webhook endpoint.
+
+    Written in the same transaction as the change, so an event is queued if and only if the
+    change commits, without the write waiting on the endpoint. Deleted once delivered.
+    """
+
+    class Type(models.TextChoices):
+        CREATED = "task.created"
+        UPDATED = "task.updated"
+        COMPLETED = "task.completed"
+
+    # Indexed together with the id below
+    endpoint = models.ForeignKey(
+        WebhookEndpoint, on_delete=models.CASCADE, related_name="events", db_index=False
+    )
+    type = models.CharField(max_length=32, choices=Type)
+    task_id = models.UUIDField()
+    # The task's representation as of the change
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Serve the delivery, which reads an endpoint's events in the order they were queued
+            models.Index(fields=["endpoint", "id"], name="outbox_event_endpoint_idx")
+        ]
+
+    def __str__(self) -> str:
+        """String representation of the event."""
+        return f"{self.type} {self.task_id}"
+
+
+class IdempotencyKey(models.Model):
+    """Model representing a client-supplied key for a create request and its response.
+
+    `status_code` and `response` stay null while the request is being handled.
+    """
+
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # Indexed for the sweeper, see the `purge_idempotency_keys` command
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="unique_idempotency_key")
+        ]
+
+    def __str__(self) -> str:
+        """String representation of the idempotency key."""
+        return f"{self.scope}:{self.key}"
+
+
+class ImportCheckpoint(models.Model):
+    """Model representing how far an `import_tasks` run got through its input.
+
+    `rows` counts the input rows committed, and is updated in the same transaction as each
+    chunk, so a resumed import continues right after the last committed chunk.
+    """
+
+    source = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        """String representation of the checkpoint."""
+        return f"{self.source}: {self.rows} rows"
@@ -0,0 +1,29 @@
+from collections.abc import Iterable
+
+from .models import OutboxEvent, Task, WebhookEndpoint
+from .serializers import TaskSerializer
+
+
+def change_event(was_completed: bool, task: Task) -> OutboxEvent.Type:
+    """Return the type of event for a change to the task, which was completed or not before."""
+    if task.completed and not was_completed:
+        return OutboxEvent.Type.COMPLETED
+    return OutboxEvent.Type.UPDATED
+
+
+def queue_task_events(events: Iterable[tuple[OutboxEvent.Type, Task]]) -> None:
+    """Queue the events, each of a type and the task changed, for every active webhook endpoint.
+
+    Call it in the transaction writing the tasks, so the events commit or roll back with them.
+    The events are written with a single INSERT, and nothing is written without endpoints.
+    """
+    endpoints = list(WebhookEndpoint.objects.filter(active=True).values_list("id", flat=True))
+    if not endpoints:
+        return
+    events = list(events)
+    payloads = TaskSerializer([task for _, task in events], many=True).data
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(endpoint_id=endpoint, type=type, task_id=task.pk, payload=payload)
+        for (type, task), payload in zip(events, payloads, strict=True)
+        for endpoint in endpoints
+    )
@@ -0,0 +1,136 @@
+import base64
+import binascii
+import json
+from typing import Any, cast
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Field, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+
+class TaskCursorPagination(BasePagination):
+    """Keyset pagination over tasks, newest first.
+
+    The cursor holds the ordering values of the last task on the page, and the next page is
+    the tasks strictly after it in that order. Every page is read with an index seek and a
+    LIMIT, without a COUNT(*) or an OFFSET, so late pages cost the same as the first one.
+    """
+
+    cursor_query_param = "cursor"
+    page_size: int = api_settings.PAGE_SIZE or 10
+    # Descending. Task keys are UUIDv7, ordered by creation time and unique.
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset[R](
+        self, queryset: QuerySet[Any, R], request: Request, view: APIView | None = None
+    ) -> list[R]:
+        """Return the page of tasks following the cursor."""
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset[R](
+        self, queryset: QuerySet[Any, R], request: Request, view: APIView | None = None
+    ) -> list[R]:
+        """Like `paginate_queryset`, reading the page with the async ORM."""
+        return self.set_page([task async for task in self.page_queryset(queryset, request)])
+
+    def page_queryset[R](self, queryset: QuerySet[Any, R], request: Request) -> QuerySet[Any, R]:
+        """Return the query for the page of tasks following the cursor, plus one."""
+        self.request = request
+        self.fields = [
+            cast("Field[Any, Any]", queryset.model._meta.get_field(name)) for name in self.ordering
+        ]
+        queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        if encoded := request.query_params.get(self.cursor_query_param):
+            queryset = queryset.filter(self.after(self.decode_cursor(encoded)))
+        # One extra row tells whether there is a next page
+        return queryset[: self.page_size + 1]
+
+    def set_page[R](self, tasks: list[R]) -> list[R]:
+        """Keep the last task of the page for the next link, returning the page."""
+        self.last = tasks[self.page_size - 1] if len(tasks) > self.page_size else None
+        return tasks[: self.page_size]
+
+    def get_paginated_response(self, data: Any) -> Response:
+        """Wrap the serialized page with the link to the next one."""
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema: dict[str, Any]) -> dict[str, Any]:
+        """Describe the paginated response for the OpenAPI schema."""
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self) -> str | None:
+        """Return the URL of the next page, or None on the last page."""
+        if self.last is None:
+            return None
+        # The last task may also be a row read with `values_list(named=True)`
+        values = [field.value_to_string(cast("Model", self.last)) for field in self.fields]
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, encoded: str) -> list[Any]:
+        """Return the ordering values held by the cursor."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                field.to_python(value) for field, value in zip(self.fields, values, strict=True)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+    def after(self, values: list[Any]) -> Q:
+        """Match the tasks ordered after the given values, i.e. `(a, b) < (x, y)` expanded."""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {f: v for f, v in zip(self.ordering[:i], values[:i], strict=True)}
+            condition |= Q(**equal, **{f"{field}__lt": values[i]})
+        return condition
+
+
+class TaskPageNumberPagination(PageNumberPagination):
+    """Page number pagination, the default for the task list, with an async variant."""
+
+    async def apaginate_queryset[R](
+        self, queryset: QuerySet[Any, R], request: Request, view: APIView | None = None
+    ) -> list[R] | None:
+        """Like `paginate_queryset`, counting and reading the page with the async ORM."""
+        self.request = request
+        if not (page_size := self.get_page_size(request)):
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Cached, so the paginator does not count again, and only slices the queryset
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg) from exc
+
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls
+            self.display_page_controls = True
+
+        self.page.object_list = [
+            obj async for obj in cast("QuerySet[Any, R]", self.page.object_list)
+        ]
+        return list(self.page)
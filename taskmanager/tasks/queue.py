@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Task
+
+# The most tasks a single claim takes
+CLAIM_MAX_TASKS = 100
+# How long tasks are claimed for by default, and at most
+CLAIM_DEFAULT_LEASE = timedelta(minutes=5)
+CLAIM_MAX_LEASE = timedelta(hours=1)
+# The order tasks are claimed in, served by `task_queue_idx`
+QUEUE_ORDERING = ["-priority", "created_at"]
+
+
+class ClaimNotHeld(APIException):
+    """Raised when a claim is acknowledged or released for tasks it no longer holds."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The claim does not hold these tasks, its lease may have expired."
+    default_code = "claim_not_held"
+
+
+def claimable_tasks(now: datetime) -> QuerySet[Task]:
+    """Return the pending tasks that are not claimed, or whose lease has expired."""
+    return Task.objects.filter(completed=False).filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lte=now)
+    )
+
+
+def claim_tasks(limit: int, lease: timedelta) -> tuple[uuid.UUID, datetime, list[Task]]:
+    """Claim the first `limit` claimable tasks in the queue for the lease.
+
+    Returns the claim's token, the end of its lease and the tasks claimed, in queue order.
+    The candidates are read off `task_queue_idx` and locked with SKIP LOCKED where the
+    database has it, so concurrent claims take different tasks rather than wait for each
+    other. The UPDATE checks again that each one is claimable, so a task is never claimed
+    twice, e.g. on SQLite, where transactions take the database's write lock instead. It also
+    stamps `updated_at`, so sync clients see the lease change.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    claimed_until = now + lease
+    with transaction.atomic():
+        ids = list(
+            claimable_tasks(now)
+            .order_by(*QUEUE_ORDERING)
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:limit]
+        )
+        claimable_tasks(now).filter(id__in=ids).update(
+            claimed_until=claimed_until, claim_token=token, updated_at=now
+        )
+        tasks = list(Task.objects.filter(id__in=ids, claim_token=token).order_by(*QUEUE_ORDERING))
+    return token, claimed_until, tasks
+
+
+def lock_claimed_tasks(token: uuid.UUID, ids: list[uuid.UUID] | None, now: datetime) -> list[Task]:
+    """Lock the tasks of the claim with the token, the given ids or all of them, in queue order.
+
+    Call it in a transaction. Raises ClaimNotHeld unless the claim still holds each task, with
+    its lease not expired, as another worker may have claimed the task since.
+    """
+    held = Task.objects.filter(claim_token=token, claimed_until__gt=now)
+    if ids is not None:
+        held = held.filter(id__in=ids)
+    tasks = list(held.select_for_update().order_by(*QUEUE_ORDERING))
+    if not tasks or (ids is not None and len(tasks) < len(set(ids))):
+        raise ClaimNotHeld
+    return tasks
+
+
+def end_claim(tasks: list[Task], now: datetime, **values: Any) -> None:
+    """Clear the claim on the tasks, writing the other values with it, in a single UPDATE."""
+    values = {"claimed_until": None, "claim_token": None, "updated_at": now, **values}
+    Task.objects.filter(id__in=[task.pk for task in tasks]).update(**values)
+    for task in tasks:
+        for field, value in values.items():
+            setattr(task, field, value)
@@ -0,0 +1,118 @@
+from collections.abc import Callable, Iterable, Sequence
+from datetime import datetime, tzinfo
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import TaskSerializer
+
+# Serializer fields whose representation of a value is the value itself, when read from a
+# column of one of these model fields, e.g. `str(value)` for a string
+IDENTITY_FIELDS: dict[
+    type[serializers.Field[Any, Any, Any, Any]], tuple[type[models.Field[Any, Any]], ...]
+] = {
+    serializers.CharField: (models.CharField, models.TextField),
+    serializers.IntegerField: (models.IntegerField,),
+    serializers.BooleanField: (models.BooleanField,),
+}
+
+
+def iso_datetime(field: serializers.DateTimeField) -> Callable[[datetime, tzinfo | None], Any]:
+    """Return the field's ISO 8601 representation, given the time zone to show datetimes in.
+
+    DateTimeField looks up the active time zone for every value, this takes it once per call.
+    """
+
+    def represent(value: datetime, tz: tzinfo | None) -> Any:
+        if tz is None or timezone.is_naive(value):
+            return field.to_representation(value)
+        value_string = value.astimezone(tz).isoformat()
+        if value_string.endswith("+00:00"):
+            value_string = value_string[:-6] + "Z"
+        return value_string
+
+    return represent
+
+
+class RowRepresentation:
+    """A serializer's representation, compiled into a function of a row of column values.
+
+    The rows are read with `values_list(*columns)`, so no model instance is built, and the
+    function makes the dict for a row in a single expression, rather than looking up each
+    attribute and dispatching to each field. The output is the serializer's: values a field
+    would change are passed to its `to_representation`, or an equivalent inlined for UUIDs
+    and datetimes, which follow the active time zone.
+
+    Only fields reading a column of the model are supported.
+    """
+
+    def __init__(self, serializer_class: type[serializers.ModelSerializer[Any]]) -> None:
+        serializer = serializer_class()
+        model: type[models.Model] = serializer_class.Meta.model
+        self.columns: list[str] = []
+        items: list[str] = []
+        namespace: dict[str, Any] = {}
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(str(field.source))
+            except FieldDoesNotExist:
+                model_field = None
+            if (
+                not isinstance(model_field, models.Field)
+                or not model_field.concrete
+                or model_field.is_relation
+            ):
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{field.field_name} is not a column."
+                )
+
+            value = f"row[{len(self.columns)}]"
+            self.columns.append(model_field.attname)
+            if isinstance(model_field, IDENTITY_FIELDS.get(type(field), ())):
+                expression = value
+            else:
+                convert = f"convert_{len(items)}"
+                if type(field) is serializers.UUIDField and field.uuid_format == "hex_verbose":
+                    namespace[convert] = str
+                    expression = f"{convert}({value})"
+                elif (
+                    type(field) is serializers.DateTimeField
+                    and not hasattr(field, "timezone")
+                    and str(getattr(field, "format", api_settings.DATETIME_FORMAT)).lower()
+                    == ISO_8601
+                ):
+                    namespace[convert] = iso_datetime(field)
+                    expression = f"{convert}({value}, tz)"
+                else:
+                    namespace[convert] = field.to_representation
+                    expression = f"{convert}({value})"
+                # The serializer shows None as is, without calling the field
+                if model_field.null:
+                    expression = f"None if {value} is None else {expression}"
+            items.append(f"{field.field_name!r}: {expression}")
+
+        source = f"def represent(row, tz):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f"<{serializer_class.__name__} representation>", "exec"), namespace)
+        self.compiled: Callable[[Sequence[Any], tzinfo | None], dict[str, Any]] = namespace[
+            "represent"
+        ]
+
+    def __call__(self, rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+        """Return the representation of each row."""
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [self.compiled(row, tz) for row in rows]
+
+    def represent(self, row: Sequence[Any]) -> dict[str, Any]:
+        """Return the representation of a row."""
+        return self([row])[0]
+
+
+# The representation of TaskSerializer, for the list and retrieve actions
+task_representation = RowRepresentation(TaskSerializer)
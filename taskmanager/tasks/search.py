@@ -0,0 +1,89 @@
+import re
+from typing import Any
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q, QuerySet, Value
+
+from .models import Task
+
+# An FTS5 index over title and description, created by migration 0006. It stores no text of
+# its own and is kept in sync with the task table by the triggers below.
+SEARCH_TABLE = "tasks_task_fts"
+
+SEARCH_TRIGGERS = {
+    f"{SEARCH_TABLE}_insert": f"""
+        AFTER INSERT ON tasks_task BEGIN
+            INSERT INTO {SEARCH_TABLE} (rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END""",
+    f"{SEARCH_TABLE}_delete": f"""
+        AFTER DELETE ON tasks_task BEGIN
+            INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END""",
+    f"{SEARCH_TABLE}_update": f"""
+        AFTER UPDATE OF title, description ON tasks_task BEGIN
+            INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO {SEARCH_TABLE} (rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END""",
+}
+
+
+def install_search_triggers(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """Create any missing sync trigger, rebuilding the index if one was missing.
+
+    Runs after every `migrate`: on SQLite, altering a table copies it into a new one, which
+    drops its triggers and may renumber its rows, so both have to be put back.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tasks_task'"
+        )
+        missing = SEARCH_TRIGGERS.keys() - {name for (name,) in cursor.fetchall()}
+        for name in missing:
+            cursor.execute(f"CREATE TRIGGER {name} {SEARCH_TRIGGERS[name]}")
+        if missing:
+            rebuild_search_index(using)
+
+
+def rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> None:
+    """Reindex every task from the task table."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(text: str) -> str:
+    """Turn free text into an FTS5 query matching tasks containing every word, in any order.
+
+    Each word is quoted, so the FTS5 operators and syntax errors cannot come from user input.
+    """
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", text))
+
+
+def search_tasks(queryset: QuerySet[Task], text: str) -> QuerySet[Task]:
+    """Filter the tasks to those matching the text, annotated with their `rank`, lower is better.
+
+    The match is answered by the FTS5 index, ranked by BM25 with title hits weighing ten times
+    as much as description ones. The index is joined on `rowid`, so MATCH runs once and the
+    rank of each task comes from the join. Backends other than SQLite fall back to substring
+    matching.
+    """
+    if not (expression := match_expression(text)):
+        return queryset.annotate(rank=Value(0.0)).none()
+    if connections[queryset.db].vendor != "sqlite":
+        words = re.findall(r"\w+", text)
+        return queryset.filter(
+            *(Q(title__icontains=word) | Q(description__icontains=word) for word in words)
+        ).annotate(rank=Value(0.0))
+    # `extra` is the only way to add a table without a relation to the FROM clause
+    return queryset.extra(
+        select={"rank": f"bm25({SEARCH_TABLE}, 10.0, 1.0)"},
+        tables=[SEARCH_TABLE],
+        where=[f"{SEARCH_TABLE}.rowid = tasks_task.rowid", f"{SEARCH_TABLE} MATCH %s"],
+        params=[expression],
+    )
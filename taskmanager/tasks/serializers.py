@@ -1,8 +1,11 @@
+from datetime import timedelta
 from typing import Any
 
 from rest_framework import serializers
 
 from .models import Task
+from .pagination import TaskCursorPagination
+from .queue import CLAIM_DEFAULT_LEASE, CLAIM_MAX_LEASE, CLAIM_MAX_TASKS
 
 
 class BaseTaskSerializer(serializers.ModelSerializer[Task]):
@@ -26,8 +29,14 @@ class TaskSerializer(BaseTaskSerializer):
     """Serializer for the Task model."""
 
     class Meta(BaseTaskSerializer.Meta):
-        fields = ["id", *BaseTaskSerializer.Meta.fields, "created_at", "updated_at"]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        fields = [
+            "id",
+            *BaseTaskSerializer.Meta.fields,
+            "created_at",
+            "updated_at",
+            "claimed_until",
+        ]
+        read_only_fields = ["id", "created_at", "updated_at", "claimed_until"]
 
 
 class TaskCreateSerializer(BaseTaskSerializer):
@@ -46,3 +55,38 @@ class TaskUpdateSerializer(BaseTaskSerializer):
             "priority": {"required": False},
             "completed": {"required": False},
         }
+
+
+class TaskFilterSerializer(serializers.Serializer[Any]):
+    """Serializer validating the query parameters that filter the task list."""
+
+    priority = serializers.IntegerField(required=False, min_value=1, max_value=5)
+    # A half-open range, `created_after` inclusive and `created_before` exclusive
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    search = serializers.CharField(required=False)
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        """Reject a search paged with a cursor, which seeks on the id rather than the rank."""
+        if attrs.get("search") and TaskCursorPagination.cursor_query_param in self.initial_data:
+            message = "Search results are ordered by relevance, page them by number."
+            raise serializers.ValidationError({TaskCursorPagination.cursor_query_param: message})
+        return attrs
+
+
+class TaskClaimSerializer(serializers.Serializer[Any]):
+    """Serializer validating a claim on the next tasks of the queue."""
+
+    limit = serializers.IntegerField(default=1, min_value=1, max_value=CLAIM_MAX_TASKS)
+    lease = serializers.DurationField(
+        default=CLAIM_DEFAULT_LEASE, min_value=timedelta(seconds=1), max_value=CLAIM_MAX_LEASE
+    )
+
+
+class TaskClaimedSerializer(serializers.Serializer[Any]):
+    """Serializer validating the tasks of a claim to acknowledge or release, all without `ids`."""
+
+    claim_token = serializers.UUIDField()
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, min_length=1, max_length=CLAIM_MAX_TASKS
+    )
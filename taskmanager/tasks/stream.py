@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import json
+import threading
+from collections.abc import AsyncIterator, Callable, Mapping
+from typing import Any, Literal, NamedTuple
+from uuid import UUID
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Task
+from .serializers import TaskSerializer
+
+# Seconds between comments sent on an idle stream, so proxies do not time it out
+STREAM_KEEPALIVE = 15
+# Changes a subscriber may fall behind by before its stream is reset
+STREAM_MAX_QUEUED = 1000
+
+
+class StreamUnavailable(APIException):
+    """Raised when the stream is requested of a sync server, which cannot hold it open."""
+
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "The change stream is only served under ASGI."
+    default_code = "stream_unavailable"
+
+
+class TaskChange(NamedTuple):
+    """A committed change to a task, as sent to the stream's subscribers."""
+
+    type: Literal["created", "updated", "deleted"]
+    # The task's representation, or its id for a deletion
+    data: dict[str, Any]
+    # The task's `completed` before and after the change, whichever there are
+    completed: frozenset[bool]
+
+
+def task_created(task: Task) -> TaskChange:
+    """Return the change creating the task."""
+    return TaskChange("created", TaskSerializer(task).data, frozenset([task.completed]))
+
+
+def task_updated(was_completed: bool, task: Task) -> TaskChange:
+    """Return the change updating the task, which was completed or not before."""
+    return TaskChange(
+        "updated", TaskSerializer(task).data, frozenset([was_completed, task.completed])
+    )
+
+
+def task_deleted(task_id: UUID, completed: bool) -> TaskChange:
+    """Return the change deleting the task with the id."""
+    return TaskChange("deleted", {"id": str(task_id)}, frozenset([completed]))
+
+
+def encode_event(event: str, data: Any) -> bytes:
+    """Return a server-sent event of the type, with the data as JSON."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n".encode()
+
+
+class Subscription:
+    """A stream's queue of the changes matching its `completed` filter, if it has one.
+
+    Created on the stream's event loop, and fed from any thread.
+    """
+
+    def __init__(self, completed: bool | None) -> None:
+        self.completed = completed
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[TaskChange] = asyncio.Queue(STREAM_MAX_QUEUED)
+        # Set when the subscriber fell too far behind and changes were dropped
+        self.overflowed = False
+
+    def put(self, changes: list[TaskChange]) -> None:
+        """Queue the changes matching the filter, from any thread."""
+        if self.completed is not None:
+            changes = [change for change in changes if self.completed in change.completed]
+        # RuntimeError if the loop is closed, the stream then going away
+        if changes:
+            with contextlib.suppress(RuntimeError):
+                self.loop.call_soon_threadsafe(self.enqueue, changes)
+
+    def enqueue(self, changes: list[TaskChange]) -> None:
+        """Queue the changes, on the stream's loop."""
+        for change in changes:
+            try:
+                self.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self.overflowed = True
+                return
+
+
+class TaskNotifier:
+    """Fans the changes to tasks committed in this process out to the streams subscribed.
+
+    The writes publish the changes they make, so a stream costs no queries however many
+    clients there are. Writes served by other processes are not seen: running several would
+    need a broker between them, such as Redis pub/sub or PostgreSQL's LISTEN/NOTIFY.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: set[Subscription] = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self, completed: bool | None) -> Subscription:
+        """Return a new subscription to the changes, on the running event loop."""
+        subscription = Subscription(completed)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop queueing changes for the subscription."""
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish_on_commit(self, changes: Callable[[], list[TaskChange]]) -> None:
+        """Publish the changes once the current transaction commits, none if it rolls back.
+
+        `changes` makes them, serializing the tasks as they are now, and is only called when
+        there are subscriptions, so writes pay nothing without streams.
+        """
+        if not self.subscriptions:
+            return
+        published = changes()
+        transaction.on_commit(lambda: self.publish(published))
+
+    def publish(self, changes: list[TaskChange]) -> None:
+        """Queue the changes for every subscription, from any thread."""
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.put(changes)
+
+
+notifier = TaskNotifier()
+
+
+async def task_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    """Yield the subscription's changes as server-sent events, until the client goes away.
+
+    A stream that falls too far behind ends with a `reset` event, after which the client
+    should fetch the tasks again and reconnect.
+    """
+    try:
+        # Opens the stream, rather than waiting on the first change
+        yield b": connected\n\n"
+        while not subscription.overflowed:
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), STREAM_KEEPALIVE)
+            except TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield encode_event(change.type, change.data)
+        yield encode_event("reset", {})
+    finally:
+        notifier.unsubscribe(subscription)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renders a response that is not a stream, such as an error, as a single event."""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        """Render the data as an `error` event."""
+        return encode_event("error", data)
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+from uuid import UUID
+
+from django.db.models import Model, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Task, TaskTombstone
+from .serializers import TaskSerializer
+
+# Changes read per page, for each of the updated tasks and the deleted ones
+SYNC_PAGE_SIZE = 1000
+# `updated_at` and `deleted_at` are stamped before the write commits, so a change stamped just
+# before a sync may only become visible after it. Changes younger than this are held back to
+# the next sync, so a cursor never moves past a change still in flight.
+SYNC_LAG = timedelta(seconds=5)
+# Tombstones are kept this long, a client that has not synced within it has to start over
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class SyncCursorExpired(APIException):
+    """Raised when the deletions since a cursor may already be compacted, with status 410."""
+
+    status_code = status.HTTP_410_GONE
+    default_detail = "The cursor is too old, sync again from scratch without `since`."
+    default_code = "sync_cursor_expired"
+
+
+class SyncPosition(NamedTuple):
+    """A position in a stream of changes ordered by time, then id."""
+
+    at: datetime
+    id: UUID
+
+    def changes_after[M: Model](
+        self, queryset: QuerySet[M], field: str, horizon: datetime
+    ) -> QuerySet[M]:
+        """Return the rows after this position and before the horizon, in order.
+
+        The first condition bounds the range seek on the (`field`, id) index, the second
+        expands `(field, id) > (at, id)` past the rows with the same time.
+        """
+        return (
+            queryset.filter(**{f"{field}__gte": self.at, f"{field}__lt": horizon})
+            .filter(Q(**{f"{field}__gt": self.at}) | Q(**{field: self.at, "id__gt": self.id}))
+            .order_by(field, "id")
+        )
+
+
+class SyncCursor(NamedTuple):
+    """How far a client has synced, in the updated tasks and in the deleted ones."""
+
+    # None before the first sync, which starts from the oldest task
+    tasks: SyncPosition | None
+    deleted: SyncPosition
+
+    def encode(self) -> str:
+        """Return the cursor as an opaque string for the client to send back."""
+        positions = [
+            None if position is None else [position.at.isoformat(), position.id.hex]
+            for position in self
+        ]
+        return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+    @classmethod
+    def decode(cls, encoded: str) -> SyncCursor:
+        """Return the cursor encoded in the string, raising ValidationError if it is invalid."""
+        try:
+            tasks, deleted = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return cls(None if tasks is None else cls.position(*tasks), cls.position(*deleted))
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise ValidationError({"since": ["Invalid cursor."]}) from e
+
+    @staticmethod
+    def position(at: str, id: str) -> SyncPosition:
+        """Parse a position encoded by `encode`."""
+        if (parsed := parse_datetime(at)) is None or parsed.tzinfo is None:
+            raise ValueError
+        return SyncPosition(parsed, UUID(hex=id))
+
+
+def task_changes(since: str | None) -> dict[str, Any]:
+    """Return the tasks updated and deleted since the cursor, with the cursor to sync from next.
+
+    Without a cursor every task is returned, as the starting point. Both kinds of changes are
+    read off an index in order from the cursor's position with a LIMIT, so a sync costs in
+    proportion to the changes since the last one, not to the number of tasks. `more` is true
+    when a page was full, and the client should sync again with the new cursor.
+    """
+    now = timezone.now()
+    horizon = now - SYNC_LAG
+    start = SyncPosition(horizon, UUID(int=0))
+    if since is None:
+        # Tasks deleted before the start are not in the tasks returned anyway
+        cursor = SyncCursor(None, start)
+    else:
+        cursor = SyncCursor.decode(since)
+        if cursor.deleted.at < now - TOMBSTONE_RETENTION:
+            raise SyncCursorExpired
+
+    if cursor.tasks is None:
+        updated = Task.objects.filter(updated_at__lt=horizon).order_by("updated_at", "id")
+    else:
+        updated = cursor.tasks.changes_after(Task.objects.all(), "updated_at", horizon)
+    tasks = list(updated[: SYNC_PAGE_SIZE + 1])
+    deleted = list(
+        cursor.deleted.changes_after(TaskTombstone.objects.all(), "deleted_at", horizon)[
+            : SYNC_PAGE_SIZE + 1
+        ]
+    )
+
+    # One extra row tells whether there are more changes. A stream read to the end moves on
+    # to the horizon, which the changes still to come are stamped after, unless the cursor is
+    # past it already, e.g. from a server whose clock is ahead.
+    more_tasks, more_deleted = len(tasks) > SYNC_PAGE_SIZE, len(deleted) > SYNC_PAGE_SIZE
+    tasks, deleted = tasks[:SYNC_PAGE_SIZE], deleted[:SYNC_PAGE_SIZE]
+    next_cursor = SyncCursor(
+        SyncPosition(tasks[-1].updated_at, tasks[-1].id)
+        if more_tasks
+        else max(start, cursor.tasks or start),
+        SyncPosition(deleted[-1].deleted_at, deleted[-1].id)
+        if more_deleted
+        else max(start, cursor.deleted),
+    )
+    return {
+        "tasks": TaskSerializer(tasks, many=True).data,
+        "deleted": [tombstone.id for tombstone in deleted],
+        "cursor": next_cursor.encode(),
+        "more": more_tasks or more_deleted,
+    }
+
+
+def expire_tombstones() -> int:
+    """Delete the tombstones past TOMBSTONE_RETENTION, returning how many were deleted."""
+    cutoff = timezone.now() - TOMBSTONE_RETENTION
+    count, _ = TaskTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return count
@@ -1,10 +1,58 @@
-from datetime import UTC
+import asyncio
+import contextlib
+import csv
+import importlib
+import io
+import json
+import socket
+import tempfile
+import threading
+import uuid
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from inspect import iscoroutinefunction
+from io import StringIO
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
 
-from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 
-from .models import Task
+from .bulk import BULK_MAX_ITEMS
+from .conditional import task_etag
+from .export import EXPORT_FIELDS
+from .idempotency import IDEMPOTENCY_KEY_TTL
+from .models import (
+    IdempotencyKey,
+    ImportCheckpoint,
+    OutboxEvent,
+    Task,
+    TaskAlias,
+    TaskCount,
+    TaskTombstone,
+    WebhookEndpoint,
+)
+from .queue import QUEUE_ORDERING, claimable_tasks
+from .representation import RowRepresentation, task_representation
+from .search import SEARCH_TABLE, install_search_triggers
+from .serializers import TaskSerializer
+from .stream import STREAM_MAX_QUEUED, notifier, task_deleted, task_events
+from .sync import TOMBSTONE_RETENTION, SyncCursor, SyncPosition
+from .views import TaskViewSet
+from .webhooks import WEBHOOK_RETRY_BASE
 
 
 class TaskViewSetTests(APITestCase):
@@ -228,3 +276,1528 @@ class TaskViewSetTests(APITestCase):
         self.assertEqual(self.task1.pk, original_id)
         # Verify created_at was not changed
         self.assertEqual(self.task1.created_at, original_created_at)
+
+
+class TaskFilterTests(APITestCase):
+    """Tests for filtering the task list by priority and creation time."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-list")
+        self.now = timezone.now()
+        for i, priority in enumerate([1, 3, 3, 5]):
+            task = Task.objects.create(title=f"Task {i}", priority=priority)
+            Task.objects.filter(pk=task.pk).update(created_at=self.now - timedelta(days=i))
+
+    def titles(self, params: dict[str, str]) -> list[str]:
+        """List the tasks with the given query parameters, returning their titles."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["title"] for task in response.data["results"]]
+
+    def plan(self, params: dict[str, str]) -> str:
+        """Return the query plan of the task list with the given query parameters."""
+        request = Request(APIRequestFactory().get(self.url, params))
+        return TaskViewSet(request=request, action="list").get_queryset().explain()
+
+    def test_filter_priority(self) -> None:
+        """Test filtering tasks by priority."""
+        self.assertEqual(self.titles({"priority": "3"}), ["Task 2", "Task 1"])
+
+    def test_filter_created_range(self) -> None:
+        """Test filtering tasks by a half-open creation time range."""
+        params = {
+            "created_after": (self.now - timedelta(days=2)).isoformat(),
+            "created_before": (self.now - timedelta(days=1)).isoformat(),
+        }
+
+        self.assertEqual(self.titles(params), ["Task 2"])
+
+    def test_filter_created_after_date(self) -> None:
+        """Test that a plain date is accepted as midnight."""
+        tomorrow = (self.now + timedelta(days=1)).date().isoformat()
+
+        self.assertEqual(self.titles({"created_after": tomorrow}), [])
+
+    def test_invalid_filters(self) -> None:
+        """Test that invalid filter values are rejected."""
+        for params in [{"priority": "6"}, {"priority": "high"}, {"created_after": "yesterday"}]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_only_apply_to_lists(self) -> None:
+        """Test that a single task is found whatever the list filters say."""
+        task = Task.objects.get(title="Task 0")
+        url = reverse("tasks:task-detail", args=[task.pk])
+        params = "?priority=abc&search=nothing"
+
+        retrieved = self.client.get(url + params)
+        updated = self.client.patch(url + params, {"title": "Renamed"})
+
+        self.assertEqual(retrieved.status_code, status.HTTP_200_OK)
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(updated.data["title"], "Renamed")
+
+    def test_filters_use_indexes(self) -> None:
+        """Test that filtered lists are read from an index in order, without sorting."""
+        cases = [
+            ({"completed": "true"}, "task_completed_idx"),
+            (
+                {"completed": "false", "created_after": self.now.isoformat()},
+                "task_pending_idx",
+            ),
+            ({"priority": "3"}, "task_priority_idx"),
+            # Read backwards off the primary key, which is in creation order already
+            ({}, "sqlite_autoindex_tasks_task_1"),
+            ({"created_before": self.now.isoformat()}, "sqlite_autoindex_tasks_task_1"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                plan = self.plan(params)
+                self.assertIn(f"USING INDEX {index}", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+class TaskCursorPaginationTests(APITestCase):
+    """Tests for cursor pagination of the task list."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-list")
+        Task.objects.bulk_create(Task(title=f"Task {i}", completed=i % 2 == 0) for i in range(25))
+
+    def walk(self, params: dict[str, str]) -> list[str]:
+        """Follow the next links from the first page, returning every task id seen."""
+        ids: list[str] = []
+        response = self.client.get(self.url, {**params, "cursor": ""})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids.extend(task["id"] for task in response.data["results"])
+            if response.data["next"] is None:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def test_walk_all_pages(self) -> None:
+        """Test that following the cursors returns every task once, in order."""
+        expected = [str(pk) for pk in Task.objects.values_list("pk", flat=True)]
+
+        self.assertEqual(self.walk({}), expected)
+
+    def test_walk_filtered_pages(self) -> None:
+        """Test that the completed filter is kept across pages."""
+        expected = [
+            str(pk) for pk in Task.objects.filter(completed=True).values_list("pk", flat=True)
+        ]
+
+        self.assertEqual(self.walk({"completed": "true"}), expected)
+
+    def test_no_count_or_offset(self) -> None:
+        """Test that a page is read with a single LIMIT query."""
+        first = self.client.get(self.url, {"cursor": ""})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"].upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor(self) -> None:
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskKeyTests(APITestCase):
+    """Tests for the time-ordered task primary keys."""
+
+    def test_keys_follow_creation_order(self) -> None:
+        """Test that tasks get UUIDv7 keys that sort in creation order."""
+        tasks = Task.objects.bulk_create(Task(title=f"Task {i}") for i in range(100))
+
+        self.assertTrue(all(task.pk.version == 7 for task in tasks))
+        self.assertEqual(
+            list(Task.objects.values_list("pk", flat=True)), [task.pk for task in reversed(tasks)]
+        )
+
+    def test_rekeyed_tasks_keep_creation_order(self) -> None:
+        """Test that the migration's keys for existing tasks sort like their creation times."""
+        migration = importlib.import_module("tasks.migrations.0005_task_uuid7")
+        start = datetime(2026, 1, 1, tzinfo=UTC)
+        times = [start + timedelta(microseconds=n) for n in (0, 1, 999, 1000, 1001, 10**9)]
+
+        keys = [migration.uuid7_at(created_at) for created_at in times]
+
+        self.assertEqual(sorted(keys), keys)
+        self.assertTrue(all(key.version == 7 for key in keys))
+        # The leading 48 bits are the Unix time in milliseconds
+        self.assertEqual(keys[-1].int >> 80, int(times[-1].timestamp() * 1000))
+
+    def test_rekey_is_one_update(self) -> None:
+        """Test that the migration rekeys every task in one statement, keeping an alias to each."""
+        migration = importlib.import_module("tasks.migrations.0005_task_uuid7")
+        old = {Task.objects.create(id=uuid.uuid4(), title=f"Legacy {i}").pk for i in range(3)}
+
+        with CaptureQueriesContext(connection) as queries:
+            migration.rekey_tasks(django_apps, None)
+
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        aliases = dict(TaskAlias.objects.values_list("old_id", "task_id"))
+        self.assertEqual(set(aliases), old)
+        self.assertEqual(set(Task.objects.values_list("pk", flat=True)), set(aliases.values()))
+
+    def test_old_ids_redirect(self) -> None:
+        """Test that requests for a task by its id from before the rekey are redirected."""
+        migration = importlib.import_module("tasks.migrations.0005_task_uuid7")
+        old_id = uuid.uuid4()
+        Task.objects.create(id=old_id, title="Legacy")
+        migration.rekey_tasks(django_apps, None)
+        task = Task.objects.get()
+
+        # The old id in the query string is left alone
+        query = f"format=json&ref={old_id}"
+        retrieved = self.client.get(f"{reverse('tasks:task-detail', args=[old_id])}?{query}")
+        updated = self.client.patch(reverse("tasks:task-detail", args=[old_id]), {"title": "New"})
+        missing = self.client.get(reverse("tasks:task-detail", args=[uuid.uuid4()]))
+
+        self.assertEqual(task.pk.version, 7)
+        self.assertEqual(retrieved.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+        self.assertEqual(
+            retrieved["Location"], f"{reverse('tasks:task-detail', args=[task.pk])}?{query}"
+        )
+        self.assertEqual(updated.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkTaskTests(APITestCase):
+    """Tests for the bulk task actions."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-bulk")
+        self.tasks = Task.objects.bulk_create(Task(title=f"Task {i}") for i in range(3))
+
+    def statements(self, queries: CaptureQueriesContext) -> list[str]:
+        """Return the captured SQL, without the savepoints of the transaction."""
+        return [
+            q["sql"] for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+
+    def test_bulk_create(self) -> None:
+        """Test creating a list of tasks with a single insert."""
+        data = [{"title": f"New {i}", "priority": 2} for i in range(50)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([task["title"] for task in response.data], [d["title"] for d in data])
+        self.assertTrue(all(task["id"] and task["created_at"] for task in response.data))
+        self.assertEqual(Task.objects.filter(title__startswith="New").count(), 50)
+        # The INSERT, the UPDATE of the summary counters and the SELECT of the webhook endpoints,
+        # of which there are none to queue events for
+        self.assertEqual(len(self.statements(queries)), 3)
+
+    def test_bulk_create_reports_item_errors(self) -> None:
+        """Test that one invalid task rejects the batch, with errors aligned to the items."""
+        data = [{"title": "Good"}, {"title": "Bad", "priority": 6}]
+
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("priority", response.data[1])
+        self.assertFalse(Task.objects.filter(title="Good").exists())
+
+    def test_bulk_partial_update(self) -> None:
+        """Test updating a list of tasks with a single update query."""
+        data = [
+            {"id": str(self.tasks[0].pk), "completed": True},
+            {"id": str(self.tasks[1].pk), "priority": 4, "title": "Renamed"},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The SELECT ... FOR UPDATE, the UPDATE, the UPDATE of the summary counters and the
+        # SELECT of the webhook endpoints
+        self.assertEqual(len(self.statements(queries)), 4)
+        self.tasks[0].refresh_from_db()
+        self.tasks[1].refresh_from_db()
+        self.assertTrue(self.tasks[0].completed)
+        self.assertEqual(self.tasks[0].title, "Task 0")
+        self.assertEqual((self.tasks[1].priority, self.tasks[1].title), (4, "Renamed"))
+        self.assertGreater(self.tasks[1].updated_at, self.tasks[1].created_at)
+
+    def test_bulk_partial_update_reports_item_errors(self) -> None:
+        """Test that missing, duplicate and invalid items reject the batch."""
+        task_id = str(self.tasks[0].pk)
+        data = [
+            {"id": task_id, "completed": True},
+            {"id": task_id, "completed": True},
+            {"id": str(uuid.uuid4())},
+            {"id": str(self.tasks[1].pk), "priority": 0},
+            {"title": "No id"},
+        ]
+
+        response = self.client.patch(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1], {"id": ["Duplicate id."]})
+        self.assertEqual(response.data[2], {"id": ["Not found."]})
+        self.assertIn("priority", response.data[3])
+        self.assertEqual(response.data[4], {"id": ["This field is required."]})
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+
+    def test_bulk_destroy(self) -> None:
+        """Test deleting a list of tasks with a single delete query."""
+        data = [str(task.pk) for task in self.tasks[:2]]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Task.objects.all()), [self.tasks[2]])
+        deletes = [sql for sql in self.statements(queries) if sql.startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertIn(" IN (", deletes[0])
+
+    def test_bulk_destroy_reports_item_errors(self) -> None:
+        """Test that a missing task rejects the batch and deletes nothing."""
+        data = [str(self.tasks[0].pk), str(uuid.uuid4()), "not-a-uuid"]
+
+        response = self.client.delete(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1], {"id": ["Not found."]})
+        self.assertIn("id", response.data[2])
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_bulk_requires_list(self) -> None:
+        """Test that the body must be a non-empty list within the size limit."""
+        for data in [{"title": "Task"}, [], [{"title": "Task"}] * (BULK_MAX_ITEMS + 1)]:
+            with self.subTest(data=type(data)):
+                response = self.client.post(self.url, data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("non_field_errors", response.data)
+
+
+class TaskSearchTests(APITestCase):
+    """Tests for full-text search of tasks."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-list")
+        self.invoice = Task.objects.create(title="Send invoice", description="To the client")
+        self.review = Task.objects.create(title="Review", description="Check the invoice totals")
+        self.other = Task.objects.create(title="Water the plants")
+
+    def search(self, text: str) -> list[str]:
+        """Search the task list, returning the titles of the results."""
+        response = self.client.get(self.url, {"search": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["title"] for task in response.data["results"]]
+
+    def test_ranks_title_matches_first(self) -> None:
+        """Test that a match in the title ranks above one in the description."""
+        self.assertEqual(self.search("invoice"), ["Send invoice", "Review"])
+
+    def test_ranks_from_a_join(self) -> None:
+        """Test that the index is matched once, joined to the tasks, rather than per task."""
+        with CaptureQueriesContext(connection) as queries:
+            self.search("invoice")
+
+        listing = queries[-1]["sql"]
+        self.assertEqual(listing.count(" MATCH "), 1)
+        self.assertIn(f"{SEARCH_TABLE}.rowid = tasks_task.rowid", listing)
+        self.assertNotIn("(SELECT", listing)
+
+    def test_search_rejects_cursor(self) -> None:
+        """Test that search results cannot be paged with a cursor, which ignores the rank."""
+        response = self.client.get(self.url, {"search": "invoice", "cursor": ""})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", response.data)
+
+    def test_matches_every_word(self) -> None:
+        """Test that every word must match, in any order and case."""
+        self.assertEqual(self.search("TOTALS invoice"), ["Review"])
+        self.assertEqual(self.search("invoice plants"), [])
+
+    def test_query_syntax_is_escaped(self) -> None:
+        """Test that FTS5 operators in the search are treated as words."""
+        self.assertEqual(self.search('invoice" OR "plants'), [])
+        self.assertEqual(self.search("*:()"), [])
+
+    def test_index_follows_writes(self) -> None:
+        """Test that creates, updates and deletes, including bulk ones, are reindexed."""
+        Task.objects.filter(pk=self.other.pk).update(description="Then file the invoice")
+        self.review.delete()
+        Task.objects.bulk_create([Task(title="Invoice reminder")])
+
+        self.assertEqual(
+            self.search("invoice"), ["Invoice reminder", "Send invoice", "Water the plants"]
+        )
+
+    def test_triggers_are_reinstalled(self) -> None:
+        """Test that a missing trigger is recreated and the index rebuilt after migrating."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {SEARCH_TABLE}_insert")
+        Task.objects.create(title="Unindexed invoice")
+        self.assertNotIn("Unindexed invoice", self.search("invoice"))
+
+        install_search_triggers()
+        Task.objects.create(title="Indexed invoice")
+
+        self.assertIn("Unindexed invoice", self.search("invoice"))
+        self.assertIn("Indexed invoice", self.search("invoice"))
+
+    def test_admin_search_uses_index(self) -> None:
+        """Test that the admin search box is answered by the full-text index."""
+        User.objects.create_superuser("admin", password="password")
+        self.client.login(username="admin", password="password")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:tasks_task_changelist"), {"q": "totals"})
+
+        self.assertEqual(list(response.context["cl"].result_list), [self.review])
+        self.assertTrue(any(" MATCH " in q["sql"] for q in queries))
+
+
+class TaskExportTests(APITestCase):
+    """Tests for the streaming task export."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-export")
+        Task.objects.create(title="First", description='Commas, "quotes"\nand lines')
+        Task.objects.create(title="Second", priority=4, completed=True)
+
+    def export(self, params: dict[str, str]) -> Any:
+        """Export the tasks, returning the response and its content."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, response.getvalue().decode()
+
+    def test_export_ndjson(self) -> None:
+        """Test that NDJSON rows match the API's representation of the tasks."""
+        response, content = self.export({})
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in content.splitlines()]
+        expected = TaskSerializer(Task.objects.all(), many=True).data
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_export_csv(self) -> None:
+        """Test that CSV rows match the API's representation of the tasks."""
+        response, content = self.export({"format": "csv"})
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="tasks.csv"')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        expected = TaskSerializer(Task.objects.all(), many=True).data
+        self.assertEqual([row["id"] for row in rows], [task["id"] for task in expected])
+        self.assertEqual(rows[1]["description"], 'Commas, "quotes"\nand lines')
+        self.assertEqual(rows[0]["created_at"], expected[0]["created_at"])
+
+    def test_export_honors_filters(self) -> None:
+        """Test that the export applies the list's filters."""
+        _, content = self.export({"completed": "true", "priority": "4"})
+
+        self.assertEqual([json.loads(line)["title"] for line in content.splitlines()], ["Second"])
+
+    def test_export_empty_csv_has_header(self) -> None:
+        """Test that an empty CSV export still carries its header."""
+        _, content = self.export({"format": "csv", "search": "nothing"})
+
+        self.assertEqual(content.splitlines(), [",".join(EXPORT_FIELDS)])
+
+    def test_export_streams_in_chunks(self) -> None:
+        """Test that rows are written out a chunk at a time, as they are read."""
+        Task.objects.bulk_create(Task(title=f"Task {i}") for i in range(25))
+        with (
+            patch("tasks.views.EXPORT_CHUNK_SIZE", 10),
+            patch("tasks.export.EXPORT_CHUNK_SIZE", 10),
+        ):
+            response = self.client.get(self.url)
+            chunks = iter(response)
+
+            # Nothing is read until the response is consumed, and then a single query
+            with CaptureQueriesContext(connection) as queries:
+                first = next(chunks)
+            rest = b"".join(chunks)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first.count(b"\n"), 10)
+        self.assertEqual(rest.count(b"\n"), 17)
+
+    async def test_export_streams_under_asgi(self) -> None:
+        """Test that under ASGI the chunks are sent as they are read, not read in full first."""
+        await Task.objects.abulk_create(Task(title=f"Task {i}") for i in range(25))
+        with (
+            patch("tasks.views.EXPORT_CHUNK_SIZE", 10),
+            patch("tasks.export.EXPORT_CHUNK_SIZE", 10),
+        ):
+            response = await self.async_client.get(self.url)
+            # Django's ASGI handler sends an async stream as it goes, and buffers a sync one
+            self.assertTrue(response.is_async)  # type: ignore[attr-defined]
+            chunks = [chunk async for chunk in response.streaming_content]  # type: ignore[attr-defined]
+
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [10, 10, 7])
+
+
+class ImportTasksCommandTests(TestCase):
+    """Tests for the import_tasks management command."""
+
+    def setUp(self) -> None:
+        """Set up a directory for the input files."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name: str, content: str) -> str:
+        """Write an input file, returning its path."""
+        path = self.directory / name
+        path.write_text(content)
+        return str(path)
+
+    def import_tasks(self, *args: str) -> str:
+        """Run the command, returning its output."""
+        out = StringIO()
+        call_command("import_tasks", *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_ndjson_in_batches(self) -> None:
+        """Test that every row is imported, a batch per transaction."""
+        lines = [json.dumps({"title": f"Task {i}", "priority": i % 5 + 1}) for i in range(5)]
+        path = self.write("tasks.ndjson", "\n".join(lines) + "\n\n")
+
+        output = self.import_tasks(path, "--batch-size", "2")
+
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertEqual(Task.objects.get(title="Task 3").priority, 4)
+        self.assertEqual(output.count("rows/s"), 4)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 5)
+        self.assertEqual(TaskCount.objects.get(completed=False, priority=4).count, 1)
+
+    def test_import_csv(self) -> None:
+        """Test that CSV values are converted and extra columns ignored."""
+        path = self.write(
+            "tasks.csv",
+            "title,description,priority,completed,id\nFirst,,3,true,x\nSecond,Text,,False,y\n",
+        )
+
+        self.import_tasks(path)
+
+        first, second = Task.objects.order_by("title")
+        self.assertEqual((first.priority, first.completed, first.description), (3, True, None))
+        self.assertEqual(
+            (second.priority, second.completed, second.description), (1, False, "Text")
+        )
+
+    def test_resume_after_invalid_row(self) -> None:
+        """Test that a failed import keeps its committed batches and resumes after them."""
+        rows = [{"title": f"Task {i}", "priority": 2} for i in range(5)]
+        rows[3]["priority"] = 6
+        path = self.write("tasks.ndjson", "".join(json.dumps(row) + "\n" for row in rows))
+
+        with self.assertRaisesMessage(CommandError, "Row 4 is invalid"):
+            self.import_tasks(path, "--batch-size", "2")
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 2)
+
+        rows[3]["priority"] = 5
+        self.write("tasks.ndjson", "".join(json.dumps(row) + "\n" for row in rows))
+        output = self.import_tasks(path, "--batch-size", "2", "--resume")
+
+        self.assertIn("after skipping 2 already imported", output)
+        self.assertEqual(
+            sorted(Task.objects.values_list("title", flat=True)), [f"Task {i}" for i in range(5)]
+        )
+
+    def test_invalid_rows(self) -> None:
+        """Test that malformed and invalid rows are reported with their field errors."""
+        cases = [
+            ("{not json", "Invalid JSON"),
+            ("[1, 2]", "Expected an object"),
+            ('{"priority": 2}', "title"),
+            ('{"title": "Task", "priority": "high"}', "priority"),
+            ('{"title": "Task", "priority": 0}', "priority"),
+            ('{"title": "' + "x" * 201 + '"}', "title"),
+        ]
+        for line, message in cases:
+            with self.subTest(line=line[:30]):
+                path = self.write("tasks.ndjson", line + "\n")
+                with self.assertRaisesMessage(CommandError, message):
+                    self.import_tasks(path)
+        self.assertFalse(Task.objects.exists())
+
+    def test_unknown_format(self) -> None:
+        """Test that the format must be given when the extension does not tell it."""
+        path = self.write("tasks.txt", "")
+
+        with self.assertRaisesMessage(CommandError, "--format"):
+            self.import_tasks(path)
+
+
+class TaskSummaryTests(APITestCase):
+    """Tests for the task summary and its counters."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-list")
+        self.summary_url = reverse("tasks:task-summary")
+
+    def summary(self) -> dict[str, Any]:
+        """Fetch the summary, checking it is read with a single query."""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.summary_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return dict(response.data)
+
+    def recount(self) -> dict[str, Any]:
+        """Compute the summary the slow way, from the tasks."""
+        return {
+            "total": Task.objects.count(),
+            "completed": Task.objects.filter(completed=True).count(),
+            "pending": Task.objects.filter(completed=False).count(),
+            "by_priority": [
+                {
+                    "priority": priority,
+                    "total": Task.objects.filter(priority=priority).count(),
+                    "completed": Task.objects.filter(priority=priority, completed=True).count(),
+                    "pending": Task.objects.filter(priority=priority, completed=False).count(),
+                }
+                for priority in range(1, 6)
+            ],
+        }
+
+    def test_counts_follow_writes(self) -> None:
+        """Test that creates, updates and deletes through the API move the counters."""
+        for i in range(6):
+            self.client.post(self.url, {"title": f"Task {i}", "priority": i % 3 + 1})
+        ids = list(Task.objects.order_by("pk").values_list("pk", flat=True))
+        self.client.patch(reverse("tasks:task-detail", args=[ids[0]]), {"completed": True})
+        self.client.patch(
+            reverse("tasks:task-detail", args=[ids[1]]), {"completed": True, "priority": 5}
+        )
+        self.client.put(reverse("tasks:task-detail", args=[ids[2]]), {"title": "Renamed"})
+        self.client.delete(reverse("tasks:task-detail", args=[ids[3]]))
+
+        summary = self.summary()
+
+        self.assertEqual(summary, self.recount())
+        self.assertEqual((summary["total"], summary["completed"]), (5, 2))
+
+    def test_counts_follow_bulk_writes(self) -> None:
+        """Test that the bulk actions move the counters."""
+        bulk_url = reverse("tasks:task-bulk")
+        created = self.client.post(
+            bulk_url, [{"title": f"Task {i}", "priority": i + 1} for i in range(5)], format="json"
+        ).data
+        self.client.patch(
+            bulk_url,
+            [{"id": task["id"], "completed": True, "priority": 2} for task in created[:3]],
+            format="json",
+        )
+        self.client.delete(bulk_url, [created[0]["id"], created[4]["id"]], format="json")
+
+        self.assertEqual(self.summary(), self.recount())
+
+    def test_failed_write_leaves_counts(self) -> None:
+        """Test that the counters roll back with a write that fails."""
+        self.client.post(self.url, {"title": "Task"})
+
+        with (
+            patch.object(Task, "save", side_effect=RuntimeError),
+            self.assertRaises(RuntimeError),
+        ):
+            self.client.post(self.url, {"title": "Task"})
+
+        self.assertEqual(self.summary()["total"], 1)
+
+    def test_rebuild(self) -> None:
+        """Test that the rebuild command recounts writes made around the counters."""
+        Task.objects.bulk_create(Task(title="Task", priority=3, completed=True) for _ in range(4))
+        self.assertEqual(self.summary()["total"], 0)
+
+        call_command("rebuild_task_counts", stdout=StringIO())
+
+        self.assertEqual(self.summary(), self.recount())
+
+
+class TaskSyncTests(APITestCase):
+    """Tests for the delta sync endpoint."""
+
+    def setUp(self) -> None:
+        """Set up test data, with changes visible to sync as soon as they are made."""
+        self.url = reverse("tasks:task-sync")
+        self.tasks = [Task.objects.create(title=f"Task {i}") for i in range(4)]
+        lag = patch("tasks.sync.SYNC_LAG", timedelta(0))
+        lag.start()
+        self.addCleanup(lag.stop)
+
+    def sync(self, since: str | None = None) -> dict[str, Any]:
+        """Sync from the cursor, returning the response data."""
+        response = self.client.get(self.url, {} if since is None else {"since": since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data: dict[str, Any] = response.data
+        return data
+
+    def test_initial_sync(self) -> None:
+        """Test that a sync without a cursor returns every task."""
+        data = self.sync()
+
+        self.assertEqual([task["title"] for task in data["tasks"]], [f"Task {i}" for i in range(4)])
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["more"])
+
+    def test_changes_since(self) -> None:
+        """Test that a sync returns only the tasks changed and deleted since the cursor."""
+        cursor = self.sync()["cursor"]
+        created = Task.objects.create(title="New")
+        self.client.patch(reverse("tasks:task-detail", args=[self.tasks[0].pk]), {"priority": 5})
+        self.client.delete(reverse("tasks:task-detail", args=[self.tasks[1].pk]))
+        self.client.delete(reverse("tasks:task-bulk"), [str(self.tasks[2].pk)], format="json")
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.sync(cursor)
+
+        self.assertEqual(len(queries), 2)
+        # In the order they were changed
+        self.assertEqual(
+            [task["id"] for task in data["tasks"]], [str(created.pk), str(self.tasks[0].pk)]
+        )
+        self.assertEqual(data["tasks"][1]["priority"], 5)
+        self.assertEqual(data["deleted"], [self.tasks[1].pk, self.tasks[2].pk])
+        self.assertEqual(self.sync(data["cursor"])["tasks"], [])
+
+    def test_pages(self) -> None:
+        """Test that changes past a page are returned by the following syncs, each once."""
+        cursor = self.sync()["cursor"]
+        for task in self.tasks:
+            task.save()
+        self.client.delete(
+            reverse("tasks:task-bulk"), [str(task.pk) for task in self.tasks[:3]], format="json"
+        )
+
+        updated: list[str] = []
+        deleted: list[uuid.UUID] = []
+        with patch("tasks.sync.SYNC_PAGE_SIZE", 2):
+            while True:
+                data = self.sync(cursor)
+                updated.extend(task["id"] for task in data["tasks"])
+                deleted.extend(data["deleted"])
+                cursor = data["cursor"]
+                if not data["more"]:
+                    break
+
+        self.assertEqual(updated, [str(self.tasks[3].pk)])
+        self.assertEqual(sorted(deleted), sorted(task.pk for task in self.tasks[:3]))
+
+    def test_recent_changes_held_back(self) -> None:
+        """Test that changes within the lag are left to a later sync, not skipped."""
+        cursor = self.sync()["cursor"]
+        task = Task.objects.create(title="New")
+
+        with patch("tasks.sync.SYNC_LAG", timedelta(seconds=5)):
+            data = self.sync(cursor)
+
+        self.assertEqual(data["tasks"], [])
+        # The cursor does not move back to the earlier horizon either
+        later = self.sync(data["cursor"])
+        self.assertEqual([t["id"] for t in later["tasks"]], [str(task.pk)])
+
+    def test_invalid_cursor(self) -> None:
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(self.url, {"since": "garbage"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_cursor(self) -> None:
+        """Test that a cursor older than the tombstones kept asks for a full sync."""
+        old = timezone.now() - TOMBSTONE_RETENTION - timedelta(seconds=1)
+        cursor = SyncCursor(None, SyncPosition(old, uuid.UUID(int=0))).encode()
+
+        response = self.client.get(self.url, {"since": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_changes_use_indexes(self) -> None:
+        """Test that the changes are read off an index in order, without sorting."""
+        position = SyncPosition(timezone.now(), uuid.UUID(int=0))
+        cases = [
+            (
+                position.changes_after(Task.objects.all(), "updated_at", timezone.now()),
+                "task_updated_idx",
+            ),
+            (
+                position.changes_after(TaskTombstone.objects.all(), "deleted_at", timezone.now()),
+                "task_tombstone_deleted_idx",
+            ),
+        ]
+        for queryset, index in cases:
+            with self.subTest(index=index):
+                plan = queryset.explain()
+                self.assertRegex(plan, rf"USING (COVERING )?INDEX {index}\b")
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_compact_tombstones(self) -> None:
+        """Test that compaction deletes only tombstones past the retention window."""
+        for task in self.tasks[:2]:
+            self.client.delete(reverse("tasks:task-detail", args=[task.pk]))
+        TaskTombstone.objects.filter(id=self.tasks[0].pk).update(
+            deleted_at=timezone.now() - TOMBSTONE_RETENTION - timedelta(seconds=1)
+        )
+
+        call_command("compact_task_tombstones", stdout=StringIO())
+
+        self.assertEqual(
+            list(TaskTombstone.objects.values_list("id", flat=True)), [self.tasks[1].pk]
+        )
+
+
+class TaskAsyncViewTests(APITestCase):
+    """Tests for the async handlers of TaskViewSet."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.tasks = [Task.objects.create(title=f"Task {i}", priority=i + 1) for i in range(3)]
+        self.factory = APIRequestFactory()
+
+    def call(
+        self, actions: dict[str, str], request: Any, asynchronous: bool, **kwargs: Any
+    ) -> tuple[int, bytes]:
+        """Serve the request with the sync or the async handlers, returning status and body."""
+        view = TaskViewSet.as_view(actions, asynchronous=asynchronous)
+        response = (
+            async_to_sync(view)(request, **kwargs) if asynchronous else view(request, **kwargs)
+        )
+        response.render()
+        return response.status_code, response.content
+
+    def test_views_are_async(self) -> None:
+        """Test that the routes of the CRUD actions are served on the event loop."""
+        for url in [
+            reverse("tasks:task-list"),
+            reverse("tasks:task-detail", args=[self.tasks[0].pk]),
+        ]:
+            with self.subTest(url=url):
+                self.assertTrue(iscoroutinefunction(resolve(url).func))
+
+    def test_sync_view_under_wsgi(self) -> None:
+        """Test that under WSGI the routes are served synchronously, without an event loop."""
+        with patch.object(TaskViewSet, "adispatch") as adispatch:
+            response = self.client.get(reverse("tasks:task-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        adispatch.assert_not_called()
+
+    async def test_async_view_under_asgi(self) -> None:
+        """Test that under ASGI the routes are served by the async handlers."""
+        with patch.object(
+            TaskViewSet, "alist", autospec=True, side_effect=TaskViewSet.alist
+        ) as alist:
+            response = await self.async_client.get(reverse("tasks:task-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        alist.assert_called_once()
+
+    def test_reads_match_sync(self) -> None:
+        """Test that the async list and retrieve respond like the sync ones."""
+        detail = {"get": "retrieve"}
+        cases: list[tuple[dict[str, str], dict[str, Any], dict[str, Any]]] = [
+            ({"get": "list"}, {}, {}),
+            ({"get": "list"}, {"completed": "false", "priority": "2"}, {}),
+            ({"get": "list"}, {"page": "9"}, {}),
+            ({"get": "list"}, {"cursor": ""}, {}),
+            (detail, {}, {"pk": self.tasks[0].pk}),
+            (detail, {}, {"pk": uuid.uuid7()}),
+            (detail, {}, {"pk": "not-a-uuid"}),
+        ]
+        for actions, params, kwargs in cases:
+            with self.subTest(params=params, kwargs=kwargs):
+                request = self.factory.get("/api/tasks/", params)
+                self.assertEqual(
+                    self.call(actions, request, asynchronous=True, **kwargs),
+                    self.call(actions, request, asynchronous=False, **kwargs),
+                )
+
+    def test_writes(self) -> None:
+        """Test that the async create, update and destroy write the tasks and counters."""
+        create = self.factory.post("/api/tasks/", {"title": "New", "priority": 5}, format="json")
+        created = self.call({"post": "create"}, create, asynchronous=True)
+        task = Task.objects.get(title="New")
+        update = self.factory.patch("/api/tasks/", {"completed": True}, format="json")
+        updated = self.call(
+            {"patch": "partial_update"}, update, asynchronous=True, pk=self.tasks[1].pk
+        )
+        destroy = self.factory.delete("/api/tasks/")
+        destroyed = self.call({"delete": "destroy"}, destroy, asynchronous=True, pk=task.pk)
+
+        self.assertEqual(created[0], status.HTTP_201_CREATED)
+        self.assertEqual(updated[0], status.HTTP_200_OK)
+        self.assertEqual(destroyed[0], status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+        self.assertTrue(TaskTombstone.objects.filter(pk=task.pk).exists())
+        self.tasks[1].refresh_from_db()
+        self.assertTrue(self.tasks[1].completed)
+        self.assertEqual(self.client.get(reverse("tasks:task-summary")).data["completed"], 1)
+
+    def test_invalid_writes(self) -> None:
+        """Test that validation and precondition errors are returned by the async handlers."""
+        create = self.factory.post("/api/tasks/", {"priority": 9}, format="json")
+        update = self.factory.put("/api/tasks/", {"title": "Renamed"}, HTTP_IF_MATCH='"stale"')
+
+        self.assertEqual(
+            self.call({"post": "create"}, create, asynchronous=True)[0],
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.call({"put": "update"}, update, asynchronous=True, pk=self.tasks[0].pk)[0],
+            status.HTTP_412_PRECONDITION_FAILED,
+        )
+
+
+class TaskRepresentationTests(APITestCase):
+    """Tests for the compiled representation of TaskSerializer."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        Task.objects.create(title="Plain")
+        Task.objects.create(title="Full", description="Described", priority=5, completed=True)
+
+    def test_matches_serializer(self) -> None:
+        """Test that rows are represented exactly like tasks by TaskSerializer."""
+        rows = Task.objects.values_list(*task_representation.columns)
+        for tz in ["UTC", "Asia/Kolkata"]:
+            with self.subTest(tz=tz), timezone.override(tz):
+                self.assertEqual(
+                    task_representation(rows), TaskSerializer(Task.objects.all(), many=True).data
+                )
+
+    def test_reads_rows(self) -> None:
+        """Test that the list and retrieve actions build no task instances."""
+        task = Task.objects.first()
+        assert task is not None
+        expected = TaskSerializer(task).data
+
+        with patch.object(Task, "from_db", side_effect=AssertionError):
+            listed = self.client.get(reverse("tasks:task-list"))
+            cursor = self.client.get(reverse("tasks:task-list"), {"cursor": ""})
+            retrieved = self.client.get(reverse("tasks:task-detail", args=[task.pk]))
+
+        self.assertEqual(listed.data["results"][0], expected)
+        self.assertEqual(cursor.data["results"][0], expected)
+        self.assertEqual(retrieved.data, expected)
+
+    def test_unsupported_field(self) -> None:
+        """Test that a serializer field not reading a column is refused."""
+
+        class TitleLengthSerializer(serializers.ModelSerializer[Task]):
+            length = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Task
+                fields = ["title", "length"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            RowRepresentation(TitleLengthSerializer)
+
+
+class TaskClaimTests(APITestCase):
+    """Tests for claiming tasks from the queue."""
+
+    def setUp(self) -> None:
+        """Set up test data, created in order so the lower indexes are older."""
+        self.url = reverse("tasks:task-claim")
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", priority=priority, completed=completed)
+            for i, (priority, completed) in enumerate(
+                [(3, False), (5, False), (3, False), (1, False), (5, True)]
+            )
+        ]
+
+    def claim(self, **data: Any) -> list[str]:
+        """Claim tasks, returning their titles."""
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["title"] for task in response.data["results"]]
+
+    def test_claim_by_priority_then_age(self) -> None:
+        """Test that pending tasks are claimed highest priority first, then oldest first."""
+        response = self.client.post(self.url, {"limit": 3, "lease": "60"}, format="json")
+
+        self.assertEqual(
+            [task["title"] for task in response.data["results"]], ["Task 1", "Task 0", "Task 2"]
+        )
+        claimed = Task.objects.filter(claim_token=response.data["claim_token"])
+        self.assertEqual(claimed.count(), 3)
+        for task in claimed:
+            assert task.claimed_until is not None
+            self.assertAlmostEqual(
+                task.claimed_until, response.data["claimed_until"], delta=timedelta(seconds=1)
+            )
+        self.assertAlmostEqual(
+            response.data["claimed_until"],
+            timezone.now() + timedelta(seconds=60),
+            delta=timedelta(seconds=5),
+        )
+
+    def test_no_double_claims(self) -> None:
+        """Test that claimed tasks are skipped until their lease expires."""
+        first = self.claim(limit=2)
+        second = self.claim(limit=5)
+        Task.objects.filter(title="Task 1").update(claimed_until=timezone.now())
+        third = self.claim(limit=5)
+
+        self.assertEqual(first, ["Task 1", "Task 0"])
+        self.assertEqual(second, ["Task 2", "Task 3"])
+        self.assertEqual(third, ["Task 1"])
+        self.assertEqual(self.claim(), [])
+
+    def test_claim_rechecks_tasks(self) -> None:
+        """Test that a task claimed after it was picked as a candidate is not claimed again."""
+        original = QuerySet.update
+
+        def claim_first(queryset: QuerySet[Task], **kwargs: Any) -> int:
+            # A concurrent claim takes the first candidate in between
+            original(
+                Task.objects.filter(title="Task 1"),
+                claimed_until=timezone.now() + timedelta(minutes=1),
+            )
+            return original(queryset, **kwargs)
+
+        with patch.object(QuerySet, "update", claim_first):
+            claimed = self.claim(limit=2)
+
+        self.assertEqual(claimed, ["Task 0"])
+
+    def test_invalid_claims(self) -> None:
+        """Test that out of range limits and leases are rejected."""
+        for data in [{"limit": 0}, {"limit": 101}, {"lease": "0"}, {"lease": "2:00:00"}]:
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_claim_uses_index(self) -> None:
+        """Test that the candidates are read off the queue index in order, without sorting."""
+        plan = claimable_tasks(timezone.now()).order_by(*QUEUE_ORDERING)[:10].explain()
+
+        self.assertIn("USING INDEX task_queue_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_claim_is_synced(self) -> None:
+        """Test that a claim stamps `updated_at`, so delta sync reports the lease."""
+        before = Task.objects.get(title="Task 1").updated_at
+
+        self.claim()
+
+        task = Task.objects.get(title="Task 1")
+        assert task.claimed_until is not None
+        self.assertGreater(task.updated_at, before)
+        self.assertEqual(
+            self.client.get(reverse("tasks:task-detail", args=[task.pk])).data["claimed_until"],
+            serializers.DateTimeField().to_representation(task.claimed_until),
+        )
+
+    def test_ack_completes_claimed_tasks(self) -> None:
+        """Test that acknowledging a claim completes its tasks, counts and events included."""
+        WebhookEndpoint.objects.create(url="https://example.com/hook")
+        summary = reverse("tasks:task-summary")
+        completed = self.client.get(summary).data["completed"]
+        claim = self.client.post(self.url, {"limit": 2}, format="json").data
+        acked_id = claim["results"][0]["id"]
+
+        response = self.client.post(
+            reverse("tasks:task-ack"),
+            {"claim_token": claim["claim_token"], "ids": [acked_id]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task["id"] for task in response.data["results"]], [acked_id])
+        acked = Task.objects.get(pk=acked_id)
+        self.assertTrue(acked.completed)
+        self.assertIsNone(acked.claim_token)
+        self.assertEqual(Task.objects.filter(claim_token=claim["claim_token"]).count(), 1)
+        self.assertEqual(self.client.get(summary).data["completed"], completed + 1)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list("type", "task_id")),
+            [(OutboxEvent.Type.COMPLETED, acked.pk)],
+        )
+
+    def test_release_returns_tasks_to_queue(self) -> None:
+        """Test that released tasks can be claimed again before their lease ends."""
+        claim = self.client.post(self.url, {"limit": 2}, format="json").data
+
+        response = self.client.post(
+            reverse("tasks:task-release"), {"claim_token": claim["claim_token"]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertFalse(Task.objects.filter(completed=True, title__in=["Task 0", "Task 1"]))
+        self.assertEqual(self.claim(limit=2), ["Task 1", "Task 0"])
+
+    def test_claim_token_is_checked(self) -> None:
+        """Test that tasks are only acknowledged or released by the claim that holds them."""
+        claim = self.client.post(self.url, {"limit": 1}, format="json").data
+        other = self.client.post(self.url, {"limit": 1}, format="json").data
+        Task.objects.filter(claim_token=other["claim_token"]).update(claimed_until=timezone.now())
+        cases = [
+            {"claim_token": str(uuid.uuid4())},
+            {"claim_token": claim["claim_token"], "ids": [other["results"][0]["id"]]},
+            # Holding one of the tasks is not enough
+            {
+                "claim_token": claim["claim_token"],
+                "ids": [claim["results"][0]["id"], str(uuid.uuid4())],
+            },
+            # Nor once the lease has expired
+            {"claim_token": other["claim_token"]},
+        ]
+        for name in ["task-ack", "task-release"]:
+            for data in cases:
+                with self.subTest(name=name, data=data):
+                    response = self.client.post(reverse(f"tasks:{name}"), data, format="json")
+                    self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(Task.objects.filter(claim_token=claim["claim_token"]).count(), 1)
+        self.assertFalse(Task.objects.filter(completed=True).exclude(title="Task 4").exists())
+
+
+class WebhookReceiver(ThreadingHTTPServer):
+    """A local HTTP server standing in for webhook endpoints, recording what is posted to it."""
+
+    def __init__(self) -> None:
+        """Listen on a free port, answering with `status`."""
+        self.status = 200
+        # (path, client port, body) of each request
+        self.requests: list[tuple[str, int, Any]] = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keeps connections alive
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                receiver.requests.append((self.path, self.client_address[1], body))
+                self.send_response(receiver.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+    def url(self, path: str) -> str:
+        """Return the URL of a path on the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}{path}"
+
+    def batches(self, path: str) -> list[list[str]]:
+        """Return the titles of the tasks in each batch posted to the path, in order."""
+        return [
+            [event["task"]["title"] for event in body["events"]]
+            for request_path, _, body in self.requests
+            if request_path == path
+        ]
+
+
+class TaskWebhookTests(APITestCase):
+    """Tests for the outbox of task events and their delivery to webhooks."""
+
+    def setUp(self) -> None:
+        """Start a receiver with two endpoints on it, and an inactive one."""
+        self.receiver = WebhookReceiver()
+        threading.Thread(target=self.receiver.serve_forever, daemon=True).start()
+        self.addCleanup(self.receiver.server_close)
+        self.addCleanup(self.receiver.shutdown)
+        self.endpoints = [
+            WebhookEndpoint.objects.create(url=self.receiver.url(path)) for path in ["/a", "/b"]
+        ]
+        WebhookEndpoint.objects.create(url=self.receiver.url("/inactive"), active=False)
+
+    def deliver(self, *args: str) -> StringIO:
+        """Deliver the events that are due, returning the command's error output."""
+        err = StringIO()
+        call_command("deliver_webhooks", "--once", *args, stdout=StringIO(), stderr=err)
+        return err
+
+    def test_writes_queue_events(self) -> None:
+        """Test that creating, updating and completing tasks queues events for active endpoints."""
+        self.client.post(reverse("tasks:task-list"), {"title": "One"}, format="json")
+        url = reverse("tasks:task-detail", args=[Task.objects.get().pk])
+        self.client.patch(url, {"priority": 2}, format="json")
+        self.client.patch(url, {"completed": True}, format="json")
+        self.client.post(reverse("tasks:task-bulk"), [{"title": "Two"}], format="json")
+
+        for endpoint in self.endpoints:
+            events = endpoint.events.order_by("id")
+            self.assertEqual(
+                [(event.type, event.payload["title"]) for event in events],
+                [
+                    (OutboxEvent.Type.CREATED, "One"),
+                    (OutboxEvent.Type.UPDATED, "One"),
+                    (OutboxEvent.Type.COMPLETED, "One"),
+                    (OutboxEvent.Type.CREATED, "Two"),
+                ],
+            )
+            self.assertEqual(events[1].payload["priority"], 2)
+        self.assertEqual(OutboxEvent.objects.count(), 8)
+
+    def test_events_roll_back_with_write(self) -> None:
+        """Test that no event is queued for a write that fails."""
+        task = Task.objects.create(title="Task")
+        response = self.client.patch(
+            reverse("tasks:task-detail", args=[task.id]),
+            {"title": "Stale"},
+            format="json",
+            HTTP_IF_MATCH='"stale"',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_delivery_in_batches(self) -> None:
+        """Test that events are posted in order, in batches per endpoint, and then dequeued."""
+        self.client.post(
+            reverse("tasks:task-bulk"), [{"title": f"Task {i}"} for i in range(3)], format="json"
+        )
+
+        self.deliver("--batch-size", "2", "--concurrency", "2")
+
+        for path in ["/a", "/b"]:
+            self.assertEqual(self.receiver.batches(path), [["Task 0", "Task 1"], ["Task 2"]])
+        self.assertEqual(self.receiver.batches("/inactive"), [])
+        self.assertFalse(OutboxEvent.objects.exists())
+        # The second batches reuse the connections of the first
+        self.assertLessEqual(len({port for _, port, _ in self.receiver.requests}), 2)
+
+    def test_failed_delivery_is_retried_with_backoff(self) -> None:
+        """Test that a failed batch is kept, and retried once its backoff is over."""
+        self.client.post(reverse("tasks:task-list"), {"title": "Task"}, format="json")
+        self.receiver.status = 500
+
+        failed = timezone.now()
+        err = self.deliver()
+        self.deliver()
+
+        self.assertIn("HTTP 500", err.getvalue())
+        self.assertEqual(len(self.receiver.requests), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        for endpoint in WebhookEndpoint.objects.filter(active=True):
+            assert endpoint.next_attempt_at is not None
+            self.assertEqual(endpoint.failures, 1)
+            self.assertGreaterEqual(endpoint.next_attempt_at, failed + WEBHOOK_RETRY_BASE / 2)
+
+        self.receiver.status = 204
+        WebhookEndpoint.objects.update(next_attempt_at=timezone.now())
+        self.deliver()
+
+        self.assertEqual(len(self.receiver.requests), 4)
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertFalse(WebhookEndpoint.objects.filter(failures__gt=0).exists())
+
+    def test_unreachable_endpoint(self) -> None:
+        """Test that an endpoint that cannot be connected to is retried later."""
+        # A port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        WebhookEndpoint.objects.update(url=f"http://127.0.0.1:{port}/")
+        self.client.post(reverse("tasks:task-list"), {"title": "Task"}, format="json")
+
+        err = self.deliver()
+
+        self.assertIn("Delivery to", err.getvalue())
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        self.assertEqual(WebhookEndpoint.objects.filter(failures=1).count(), 2)
+
+
+class TaskStreamTests(APITestCase):
+    """Tests for the stream of changes to tasks."""
+
+    def setUp(self) -> None:
+        """Set up the URL."""
+        self.url = reverse("tasks:task-stream")
+
+    async def open_stream(self, **params: str) -> Any:
+        """Open a stream, returning the iterator of its chunks once it is subscribed."""
+        response = await self.async_client.get(self.url, params)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)  # type: ignore[attr-defined]
+        # The first chunk is sent once the stream is subscribed
+        await anext(events)
+        return events
+
+    async def next_event(self, events: Any) -> tuple[str, Any]:
+        """Return the type and data of the next event of a stream, skipping comments."""
+        while (chunk := await asyncio.wait_for(anext(events), 5)).startswith(b":"):
+            pass
+        event, data = chunk.decode().strip().splitlines()
+        return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    def write_tasks(self) -> None:
+        """Create, update and delete tasks through the API, committing as a request would."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("tasks:task-list"), {"title": "Pending"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("tasks:task-list"), {"title": "Done", "completed": True}, format="json"
+            )
+        for task in Task.objects.order_by("id"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse("tasks:task-detail", args=[task.pk]), {"completed": True}, format="json"
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("tasks:task-detail", args=[task.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("tasks:task-bulk"), [{"title": "Last"}], format="json")
+
+    async def test_stream_pushes_changes(self) -> None:
+        """Test that committed changes fan out to every stream, filtered like the list."""
+        streams = [await self.open_stream(), await self.open_stream(completed="false")]
+
+        await sync_to_async(self.write_tasks)()
+
+        received = [
+            [await self.next_event(events) for _ in range(n)]
+            for events, n in zip(streams, [7, 3], strict=True)
+        ]
+        self.assertEqual(
+            [(event, data.get("title")) for event, data in received[0]],
+            [
+                ("created", "Pending"),
+                ("created", "Done"),
+                ("updated", "Pending"),
+                ("deleted", None),
+                ("updated", "Done"),
+                ("deleted", None),
+                ("created", "Last"),
+            ],
+        )
+        # Pending left the filter when it was completed, and the completed task never was in it
+        self.assertEqual(
+            [(event, data.get("title"), data.get("completed")) for event, data in received[1]],
+            [
+                ("created", "Pending", False),
+                ("updated", "Pending", True),
+                ("created", "Last", False),
+            ],
+        )
+        for events in streams:
+            # The server cancels the response when the client disconnects
+            waiting = asyncio.ensure_future(anext(events))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await waiting
+        self.assertFalse(notifier.subscriptions)
+
+    def test_no_work_without_streams(self) -> None:
+        """Test that writes do not make or publish changes when nothing is subscribed."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse("tasks:task-list"), {"title": "Task"}, format="json")
+
+        self.assertEqual(callbacks, [])
+
+    def test_stream_needs_asgi(self) -> None:
+        """Test that the stream is refused under WSGI, which cannot hold it open."""
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_slow_stream_is_reset(self) -> None:
+        """Test that a stream falling too far behind is told to start over."""
+        subscription = notifier.subscribe(None)
+        notifier.publish([task_deleted(uuid.uuid4(), False)] * (STREAM_MAX_QUEUED + 1))
+        await asyncio.sleep(0)
+
+        events = [event async for event in task_events(subscription)]
+
+        self.assertEqual(events[-1], b"event: reset\ndata: {}\n\n")
+        self.assertFalse(notifier.subscriptions)
+
+
+class TaskConditionalRequestTests(APITestCase):
+    """Tests for ETags and conditional requests on task detail."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.task = Task.objects.create(title="Task", priority=2)
+        self.url = reverse("tasks:task-detail", kwargs={"pk": self.task.pk})
+
+    def test_not_modified(self) -> None:
+        """Test that a matching If-None-Match gets an empty 304."""
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_tells_microseconds_apart(self) -> None:
+        """Test that saves a microsecond apart get different ETags, however far from the epoch."""
+        updated_at = datetime(2300, 1, 1, microsecond=1, tzinfo=UTC)
+        next_updated_at = updated_at + timedelta(microseconds=1)
+
+        self.assertNotEqual(
+            task_etag(Task(id=self.task.pk, updated_at=updated_at)),
+            task_etag(Task(id=self.task.pk, updated_at=next_updated_at)),
+        )
+
+    def test_etag_changes_on_update(self) -> None:
+        """Test that an update returns a new ETag, and stale copies are sent again."""
+        etag = self.client.get(self.url)["ETag"]
+
+        updated = self.client.patch(self.url, {"title": "Renamed"})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertNotEqual(updated["ETag"], etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], updated["ETag"])
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_if_match(self) -> None:
+        """Test that an update with the current ETag is applied with a single UPDATE."""
+        etag = self.client.get(self.url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {"completed": True}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.completed)
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"updated_at" =', updates[0].split("WHERE")[1])
+        self.assertFalse(any("FOR UPDATE" in q["sql"] for q in queries))
+
+    def test_stale_if_match(self) -> None:
+        """Test that an update based on an outdated copy is rejected."""
+        etag = self.client.get(self.url)["ETag"]
+        self.client.patch(self.url, {"priority": 3})
+
+        response = self.client.put(self.url, {"title": "Lost"}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.priority), ("Task", 3))
+
+    def test_concurrent_update(self) -> None:
+        """Test that the conditional UPDATE catches a write between the read and the update."""
+        etag = self.client.get(self.url)["ETag"]
+        stale = Task.objects.get(pk=self.task.pk)
+        self.client.patch(self.url, {"priority": 3})
+
+        with patch.object(TaskViewSet, "aget_object", return_value=stale):
+            conditional = self.client.patch(self.url, {"priority": 4}, HTTP_IF_MATCH=etag)
+            unconditional = self.client.patch(self.url, {"completed": True})
+
+        self.assertEqual(conditional.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        # Without If-Match the update is retried on the fresh task
+        self.assertEqual(unconditional.status_code, status.HTTP_200_OK)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.priority, self.task.completed), (3, True))
+        self.assertEqual(TaskCount.objects.get(completed=True, priority=3).count, 1)
+
+
+class IdempotentTaskCreateTests(APITestCase):
+    """Tests for Idempotency-Key support on TaskViewSet.create."""
+
+    def setUp(self) -> None:
+        """Set up test data."""
+        self.url = reverse("tasks:task-list")
+        self.data = {"title": "New Task", "priority": 2}
+
+    def post(self, data: dict[str, Any], key: str = "key-1") -> Any:
+        """POST a task with an idempotency key."""
+        return self.client.post(self.url, data, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_without_insert(self) -> None:
+        """Test that a retried create replays the stored response."""
+        first = self.post(self.data)
+
+        # Looking up the stored response is the only query
+        with self.assertNumQueries(1):
+            retry = self.post(self.data)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_without_key(self) -> None:
+        """Test that requests without a key are never deduplicated."""
+        self.client.post(self.url, self.data)
+        self.client.post(self.url, self.data)
+
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_key_reused_with_different_payload(self) -> None:
+        """Test that a key cannot be reused for a different request."""
+        self.post(self.data)
+
+        response = self.post({**self.data, "priority": 5})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_validation_errors_are_replayed(self) -> None:
+        """Test that a rejected request is remembered as rejected."""
+        first = self.post({"title": "Invalid Task", "priority": 0})
+
+        with self.assertNumQueries(1):
+            retry = self.post({"title": "Invalid Task", "priority": 0})
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 400)
+
+    def test_anonymous_keys_are_scoped_per_client(self) -> None:
+        """Test that anonymous clients at different addresses cannot replay each other's keys."""
+        self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY="key-1", REMOTE_ADDR="10.0.0.1")
+
+        response = self.client.post(
+            self.url, self.data, HTTP_IDEMPOTENCY_KEY="key-1", REMOTE_ADDR="10.0.0.2"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_request_in_progress(self) -> None:
+        """Test that a concurrent duplicate is turned away while the first is running."""
+        self.post(self.data)
+        IdempotencyKey.objects.update(status_code=None, response=None)
+
+        response = self.post(self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_purge_expired_keys(self) -> None:
+        """Test that the sweeper deletes only keys past their TTL."""
+        self.post(self.data, key="old")
+        self.post(self.data, key="new")
+        IdempotencyKey.objects.filter(key="old").update(
+            created_at=timezone.now() - IDEMPOTENCY_KEY_TTL - timedelta(seconds=1)
+        )
+
+        call_command("purge_idempotency_keys", stdout=StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["new"])
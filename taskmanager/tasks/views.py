@@ -1,19 +1,108 @@
+from collections import Counter
+from typing import Any
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import QuerySet
-from rest_framework import viewsets
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import BasePagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
 
-from .models import Task
+from .asynchronous import AsyncViewSetMixin
+from .bulk import BulkTaskMixin
+from .conditional import PreconditionFailed, etag_matches, task_etag
+from .counters import adjust_counts, count_changes, count_key, task_summary
+from .export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FIELDS,
+    CSVRenderer,
+    NDJSONRenderer,
+    StreamingRenderer,
+    aiterate_chunks,
+)
+from .idempotency import IDEMPOTENCY_KEY_HEADER, IdempotentCreateMixin
+from .models import OutboxEvent, Task, TaskAlias, TaskTombstone
+from .outbox import change_event, queue_task_events
+from .pagination import TaskCursorPagination, TaskPageNumberPagination
+from .queue import claim_tasks, end_claim, lock_claimed_tasks
+from .representation import task_representation
+from .search import search_tasks
 from .serializers import (
+    TaskClaimedSerializer,
+    TaskClaimSerializer,
     TaskCreateSerializer,
+    TaskFilterSerializer,
     TaskSerializer,
     TaskUpdateSerializer,
 )
+from .stream import (
+    EventStreamRenderer,
+    StreamUnavailable,
+    notifier,
+    task_created,
+    task_deleted,
+    task_events,
+    task_updated,
+)
+from .sync import task_changes
+
 
+class TaskViewSet(
+    AsyncViewSetMixin[Task], IdempotentCreateMixin, BulkTaskMixin, viewsets.ModelViewSet[Task]
+):
+    """ViewSet for handling Task CRUD operations.
 
-class TaskViewSet(viewsets.ModelViewSet[Task]):
-    """ViewSet for handling Task CRUD operations."""
+    The CRUD actions have async handlers, reading with the async ORM. Django's async ORM has no
+    transactions, so their writes, which update the counters in the same transaction, still run
+    in a thread, one per write.
+    """
 
     queryset = Task.objects.all()
+    pagination_class = TaskPageNumberPagination
+
+    @property
+    def paginator(self) -> BasePagination | None:
+        """Return the cursor paginator when a `cursor` is passed, page numbers otherwise."""
+        if not hasattr(self, "_paginator"):
+            if TaskCursorPagination.cursor_query_param in self.request.query_params:
+                self._paginator = TaskCursorPagination()
+            else:
+                return super().paginator
+        return self._paginator
+
+    def handle_exception(self, exc: Exception) -> Response:
+        """Handle the exception, redirecting a task not found by an id from before UUIDv7."""
+        if isinstance(exc, Http404) and (task_id := self.aliased_task_id()) is not None:
+            # The same route with the new id, e.g. with its format suffix, and the same query
+            match = self.request.resolver_match
+            assert match is not None
+            location = reverse(match.view_name, kwargs={**self.kwargs, "pk": task_id})
+            if query := self.request.META.get("QUERY_STRING"):
+                location = f"{location}?{query}"
+            return Response(
+                status=status.HTTP_308_PERMANENT_REDIRECT, headers={"Location": location}
+            )
+        return super().handle_exception(exc)
+
+    def aliased_task_id(self) -> UUID | None:
+        """Return the id migration 0005 gave the task with the URL's id, if it rekeyed one."""
+        if (pk := self.kwargs.get("pk")) is None:
+            return None
+        try:
+            return TaskAlias.objects.filter(old_id=pk).values_list("task_id", flat=True).first()
+        except ValidationError:
+            return None
 
     def get_serializer_class(self) -> type[BaseSerializer[Task]]:
         """Return appropriate serializer class based on the request method."""
@@ -25,14 +114,338 @@ class TaskViewSet(viewsets.ModelViewSet[Task]):
             case _:
                 return TaskSerializer
 
+    def perform_create(self, serializer: BaseSerializer[Task]) -> None:
+        """Save the new task, count it in the summary and queue its event, in one transaction."""
+        with transaction.atomic():
+            task = serializer.save()
+            adjust_counts(Counter([count_key(task)]))
+            queue_task_events([(OutboxEvent.Type.CREATED, task)])
+            notifier.publish_on_commit(lambda: [task_created(task)])
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """List the tasks, read as rows rather than model instances."""
+        rows = self.task_rows()
+        if (page := self.paginate_queryset(rows)) is not None:
+            return self.get_paginated_response(task_representation(page))
+        return Response(task_representation(rows))
+
+    async def alist(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `list`, reading the page with the async ORM."""
+        rows = self.task_rows()
+        if (page := await self.apaginate_queryset(rows)) is not None:
+            return self.get_paginated_response(task_representation(page))
+        return Response(task_representation([row async for row in rows]))
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Return the task with its ETag, or 304 if the client's copy is still current."""
+        row = get_object_or_404(self.task_rows(), pk=self.kwargs["pk"])
+        self.check_object_permissions(request, row)
+        return self.conditional_response(row)
+
+    async def aretrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `retrieve`, reading the task with the async ORM."""
+        return self.conditional_response(await self.alookup_object(self.task_rows()))
+
+    def task_rows(self) -> QuerySet[Task, Any]:
+        """Return the tasks as rows of the columns TaskSerializer reads, for list and retrieve.
+
+        Their representation is made by `task_representation`, identical to TaskSerializer's
+        but without a model instance and a serializer field call per value.
+        """
+        return self.filter_queryset(self.get_queryset()).values_list(
+            *task_representation.columns, named=True
+        )
+
+    def conditional_response(self, task: Any) -> Response:
+        """Return the task row with its ETag, or an empty 304 if If-None-Match lists the ETag."""
+        headers = {"ETag": task_etag(task)}
+        if_none_match = self.request.headers.get("If-None-Match")
+        if if_none_match is not None and etag_matches(if_none_match, task, weak=True):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(task_representation.represent(task), headers=headers)
+
+    async def acreate(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `create`, saving the task in a thread for its transaction."""
+        if IDEMPOTENCY_KEY_HEADER in request.headers:
+            return await sync_to_async(self.create)(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        await sync_to_async(self.perform_create)(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Update the task, returning its new ETag."""
+        task = self.get_object()
+        serializer = self.get_serializer(
+            task, data=request.data, partial=kwargs.pop("partial", False)
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data, headers={"ETag": task_etag(task)})
+
+    async def aupdate(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `update`, reading the task with the async ORM."""
+        task = await self.aget_object()
+        serializer = self.get_serializer(
+            task, data=request.data, partial=kwargs.pop("partial", False)
+        )
+        serializer.is_valid(raise_exception=True)
+        await self.aperform_update(serializer)
+        return Response(serializer.data, headers={"ETag": task_etag(task)})
+
+    async def apartial_update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `partial_update`, reading the task with the async ORM."""
+        kwargs["partial"] = True
+        return await self.aupdate(request, *args, **kwargs)
+
+    def perform_update(self, serializer: BaseSerializer[Task]) -> None:
+        """Save the task with a compare-and-set on `updated_at`, rather than a row lock.
+
+        With an If-Match header, a task changed since the client fetched it is rejected with
+        412. Without one, the update is retried on the fresh task, last write winning.
+        """
+        task = serializer.instance
+        assert task is not None
+        conditional = self.check_if_match(task)
+        while not self.compare_and_set(task, serializer.validated_data):
+            if conditional:
+                raise PreconditionFailed
+            try:
+                task.refresh_from_db()
+            except Task.DoesNotExist as e:
+                raise NotFound from e
+
+    async def aperform_update(self, serializer: BaseSerializer[Task]) -> None:
+        """Like `perform_update`, rereading the task with the async ORM."""
+        task = serializer.instance
+        assert task is not None
+        conditional = self.check_if_match(task)
+        while not await sync_to_async(self.compare_and_set)(task, serializer.validated_data):
+            if conditional:
+                raise PreconditionFailed
+            try:
+                await task.arefresh_from_db()
+            except Task.DoesNotExist as e:
+                raise NotFound from e
+
+    def check_if_match(self, task: Task) -> bool:
+        """Return whether the request has an If-Match header, raising 412 if it is stale."""
+        if (if_match := self.request.headers.get("If-Match")) is None:
+            return False
+        if not etag_matches(if_match, task):
+            raise PreconditionFailed
+        return True
+
+    def compare_and_set(self, task: Task, values: dict[str, Any]) -> bool:
+        """Write the values to the task if it is unchanged since it was read, in one UPDATE.
+
+        Returns whether it was. The task's status and priority as read are then known to be the
+        ones replaced, so the summary counters move from them, and the event queued tells
+        whether the update completed the task.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if not Task.objects.filter(pk=task.pk, updated_at=task.updated_at).update(
+                **values, updated_at=now
+            ):
+                return False
+            before = count_key(task)
+            for field, value in values.items():
+                setattr(task, field, value)
+            task.updated_at = now
+            adjust_counts(count_changes([before], [count_key(task)]))
+            completed, _ = before
+            queue_task_events([(change_event(completed, task), task)])
+            notifier.publish_on_commit(lambda: [task_updated(completed, task)])
+        return True
+
+    def perform_destroy(self, instance: Task) -> None:
+        """Delete the task, uncount it and leave its tombstone, in one transaction."""
+        with transaction.atomic():
+            before = (
+                Task.objects.select_for_update()
+                .values_list("completed", "priority")
+                .filter(pk=instance.pk)
+                .first()
+            )
+            # The instance loses its pk on delete
+            pk = instance.pk
+            instance.delete()
+            if before is not None:
+                adjust_counts(count_changes([before], []))
+                TaskTombstone.objects.create(id=pk)
+                completed, _ = before
+                notifier.publish_on_commit(lambda: [task_deleted(pk, completed)])
+
+    async def adestroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """Like `destroy`, reading the task with the async ORM."""
+        await sync_to_async(self.perform_destroy)(await self.aget_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     def get_queryset(self) -> QuerySet[Task]:
         """Filter queryset based on query parameters."""
         qs = super().get_queryset()
 
         # Filter by completion status if provided
-        completed = self.request.query_params.get("completed", None)
-        if completed is not None:
-            is_completed = completed.lower() == "true"
-            qs = qs.filter(completed=is_completed)
+        if (completed := self.completed_filter()) is not None:
+            qs = qs.filter(completed=completed)
+
+        # The other filters only narrow listings, a single task is found by its id alone
+        if self.action not in ("list", "export"):
+            return qs
+
+        # Filter by priority and creation time, each served by an index in Task.Meta.indexes
+        filters = TaskFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        if (priority := filters.validated_data.get("priority")) is not None:
+            qs = qs.filter(priority=priority)
+        if (created_after := filters.validated_data.get("created_after")) is not None:
+            qs = qs.filter(created_at__gte=created_after)
+        if (created_before := filters.validated_data.get("created_before")) is not None:
+            qs = qs.filter(created_at__lt=created_before)
+
+        # Full-text search, best matches first
+        if search := filters.validated_data.get("search"):
+            qs = search_tasks(qs, search).order_by("rank", "-id")
 
         return qs
+
+    def completed_filter(self) -> bool | None:
+        """Return the status the `completed` query parameter filters by, None without one."""
+        completed = self.request.query_params.get("completed", None)
+        return None if completed is None else completed.lower() == "true"
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request: Request) -> StreamingHttpResponse:
+        """Stream every task matching the list filters, as NDJSON or CSV (`?format=csv`).
+
+        Rows are read in chunks with a server-side cursor where the database has them, and
+        written out as they are read, so memory use does not grow with the export.
+        """
+        return self.export_response(asynchronous=False)
+
+    async def aexport(self, request: Request) -> StreamingHttpResponse:
+        """Like `export`, under ASGI reading each chunk in a thread as it is sent."""
+        # Django would read an async stream in full before sending any of it
+        return self.export_response(asynchronous="wsgi.input" not in request.META)
+
+    def export_response(self, asynchronous: bool) -> StreamingHttpResponse:
+        """Return the export's response, streaming an async iterator if `asynchronous`."""
+        rows = self.get_queryset().values(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        renderer = self.request.accepted_renderer
+        assert isinstance(renderer, StreamingRenderer)
+        chunks = renderer.stream(rows, EXPORT_FIELDS)
+        response = StreamingHttpResponse(
+            aiterate_chunks(chunks) if asynchronous else chunks,
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
+
+    @action(detail=False)
+    def summary(self, request: Request) -> Response:
+        """Count all tasks by status and priority, read from counters rather than the tasks.
+
+        The list filters do not apply, the counters only cover the whole table.
+        """
+        return Response(task_summary())
+
+    @action(detail=False)
+    def sync(self, request: Request) -> Response:
+        """Return the tasks updated and the ids deleted since the `since` cursor.
+
+        The list filters do not apply: a task leaving a filter would have to be reported as
+        deleted, so clients sync every task and filter their own copy.
+        """
+        return Response(task_changes(request.query_params.get("since")))
+
+    @action(detail=False, methods=["post"])
+    def claim(self, request: Request) -> Response:
+        """Claim the next `limit` pending tasks by priority, then age, for the `lease`.
+
+        Tasks claimed by another worker are skipped until their lease expires. The response
+        holds the claim's token and expiry with the tasks, which are fewer when the queue runs
+        short.
+        """
+        params = TaskClaimSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        token, claimed_until, tasks = claim_tasks(**params.validated_data)
+        return Response(
+            {
+                "claim_token": token,
+                "claimed_until": claimed_until,
+                "results": TaskSerializer(tasks, many=True).data,
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def ack(self, request: Request) -> Response:
+        """Complete the tasks of the claim with `claim_token`, the `ids` given or all of them.
+
+        Answers 409, and completes none, unless the claim still holds each one. They are
+        written in one transaction with their counts and events, like any update.
+        """
+        params = TaskClaimedSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = lock_claimed_tasks(
+                params.validated_data["claim_token"], params.validated_data.get("ids"), now
+            )
+            before = [count_key(task) for task in tasks]
+            was_completed = {task.pk: task.completed for task in tasks}
+            end_claim(tasks, now, completed=True)
+            adjust_counts(count_changes(before, [count_key(task) for task in tasks]))
+            queue_task_events((change_event(was_completed[task.pk], task), task) for task in tasks)
+            notifier.publish_on_commit(
+                lambda: [task_updated(was_completed[task.pk], task) for task in tasks]
+            )
+        return Response({"results": TaskSerializer(tasks, many=True).data})
+
+    @action(detail=False, methods=["post"])
+    def release(self, request: Request) -> Response:
+        """Put the tasks of the claim with `claim_token` back in the queue, like `ack` does.
+
+        For a worker giving up on tasks, which are then claimable again before the lease ends.
+        """
+        params = TaskClaimedSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = lock_claimed_tasks(
+                params.validated_data["claim_token"], params.validated_data.get("ids"), now
+            )
+            end_claim(tasks, now)
+        return Response({"results": TaskSerializer(tasks, many=True).data})
+
+    @action(detail=False, renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def stream(self, request: Request) -> Response:
+        """Push the changes to tasks as server-sent events, served by `astream` under ASGI.
+
+        A sync view would hold a thread for as long as the stream is open.
+        """
+        raise StreamUnavailable
+
+    async def astream(self, request: Request) -> StreamingHttpResponse:
+        """Push the tasks created, updated and deleted, from now on, as server-sent events.
+
+        The events are `created` and `updated`, with the task as data, and `deleted`, with its
+        id. With `?completed=`, only the changes to tasks with that status are sent, as in the
+        list, where an update is sent if the task had the status before or after it, so a
+        client sees tasks leave its filter. The other list filters do not apply.
+
+        The changes come from the in-process notifier rather than the database, and a client
+        should fetch the tasks after connecting, to start from the events it missed.
+        """
+        if "wsgi.input" in request.META:
+            # Django would read the whole stream before sending any of it
+            raise StreamUnavailable
+        subscription = notifier.subscribe(self.completed_filter())
+        response = StreamingHttpResponse(
+            task_events(subscription), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Not buffered by nginx
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,206 @@
+import json
+import random
+import threading
+from collections import defaultdict
+from concurrent.futures import Executor, as_completed
+from datetime import datetime, timedelta
+from http.client import HTTPConnection, HTTPSConnection
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from .models import OutboxEvent, WebhookEndpoint
+
+# The most events posted to an endpoint in one request
+WEBHOOK_BATCH_SIZE = 100
+# Seconds to wait on an endpoint to connect, and then for each read of its response
+WEBHOOK_TIMEOUT = 10
+# How long an endpoint is leased to the worker delivering to it, longer than a delivery takes
+WEBHOOK_LEASE = timedelta(minutes=5)
+# The delay before retrying after the first failure, doubled by each one after, up to the max
+WEBHOOK_RETRY_BASE = timedelta(seconds=10)
+WEBHOOK_RETRY_MAX = timedelta(hours=1)
+
+# (scheme, host, port)
+type Origin = tuple[str, str, int | None]
+
+
+class ConnectionPool:
+    """Keeps the connections to each origin open between requests, for any thread to reuse.
+
+    Delivering a batch then costs a round trip, rather than a TCP and TLS handshake first.
+    """
+
+    def __init__(self, timeout: float = WEBHOOK_TIMEOUT, maxsize: int = 10) -> None:
+        self.timeout = timeout
+        # The most idle connections kept per origin
+        self.maxsize = maxsize
+        self.idle: defaultdict[Origin, list[HTTPConnection]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def post(self, url: str, body: bytes, headers: dict[str, str]) -> int:
+        """POST the body to the URL, returning the status code of the response."""
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname or "", parts.port)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            connection, reused = self.acquire(origin)
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                response.read()
+            except Exception as e:
+                connection.close()
+                # The server may have closed an idle connection, try the next one
+                if reused and isinstance(e, ConnectionError):
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(origin, connection)
+            return response.status
+
+    def acquire(self, origin: Origin) -> tuple[HTTPConnection, bool]:
+        """Return an idle connection to the origin, or a new one, and whether it was idle."""
+        with self.lock:
+            if self.idle[origin]:
+                return self.idle[origin].pop(), True
+        scheme, host, port = origin
+        connection_class = HTTPSConnection if scheme == "https" else HTTPConnection
+        return connection_class(host, port, timeout=self.timeout), False
+
+    def release(self, origin: Origin, connection: HTTPConnection) -> None:
+        """Keep the connection for the next request to the origin, unless enough are kept."""
+        with self.lock:
+            if len(self.idle[origin]) < self.maxsize:
+                self.idle[origin].append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self.lock:
+            connections = [connection for idle in self.idle.values() for connection in idle]
+            self.idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+class DeliveryResult(NamedTuple):
+    """What a round of deliveries did."""
+
+    # Endpoints leased, delivered to or not
+    endpoints: int
+    delivered: int
+    # The URL of each endpoint that failed, with the reason
+    failures: list[tuple[str, str]]
+
+
+def due_endpoints(now: datetime) -> QuerySet[WebhookEndpoint]:
+    """Return the active endpoints with events queued, whose next delivery is due."""
+    return WebhookEndpoint.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+        Exists(OutboxEvent.objects.filter(endpoint=OuterRef("pk"))),
+        active=True,
+    )
+
+
+def lease_endpoints(limit: int) -> list[WebhookEndpoint]:
+    """Lease up to `limit` due endpoints for WEBHOOK_LEASE, to deliver their events.
+
+    Each lease is taken with an UPDATE checking that the endpoint is still due, so two
+    workers never lease the same endpoint. A worker that dies leaves its leases to expire.
+    """
+    now = timezone.now()
+    leased = []
+    for endpoint in due_endpoints(now).order_by("id")[:limit]:
+        if due_endpoints(now).filter(pk=endpoint.pk).update(next_attempt_at=now + WEBHOOK_LEASE):
+            leased.append(endpoint)
+    return leased
+
+
+def encode_batch(events: list[OutboxEvent]) -> bytes:
+    """Return the body posted for a batch of events."""
+    return json.dumps(
+        {
+            "events": [
+                {
+                    "id": event.pk,
+                    "type": event.type,
+                    "created_at": event.created_at,
+                    "task": event.payload,
+                }
+                for event in events
+            ]
+        },
+        cls=DjangoJSONEncoder,
+    ).encode()
+
+
+def retry_delay(failures: int) -> timedelta:
+    """Return how long to wait after the given number of consecutive failures.
+
+    The delay doubles with each failure, and is jittered down by up to half so endpoints that
+    failed together are not all retried at once.
+    """
+    delay = min(WEBHOOK_RETRY_BASE * (1 << min(failures - 1, 32)), WEBHOOK_RETRY_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def deliver_events(
+    pool: ConnectionPool, executor: Executor, concurrency: int, batch_size: int
+) -> DeliveryResult:
+    """Post a batch of the queued events to each of up to `concurrency` due endpoints.
+
+    The batches are posted concurrently on the executor, while the database is only used from
+    the calling thread. A delivered batch is deleted from the outbox. A batch is delivered
+    once the endpoint answers with a 2xx status, so an endpoint may receive it again if the
+    answer is lost, and should deduplicate by event id. After a failure the endpoint's events
+    are retried with exponential backoff, still in order.
+    """
+    endpoints = lease_endpoints(concurrency)
+    batches = {
+        endpoint: list(endpoint.events.order_by("id")[:batch_size]) for endpoint in endpoints
+    }
+    futures = {
+        executor.submit(
+            pool.post, endpoint.url, encode_batch(events), {"Content-Type": "application/json"}
+        ): endpoint
+        for endpoint, events in batches.items()
+    }
+
+    delivered = 0
+    failures = []
+    for future in as_completed(futures):
+        endpoint = futures[future]
+        try:
+            status_code = future.result()
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+        else:
+            if 200 <= status_code < 300:
+                events = batches[endpoint]
+                with transaction.atomic():
+                    OutboxEvent.objects.filter(id__in=[event.pk for event in events]).delete()
+                    update_endpoint(endpoint, failures=0, next_attempt_at=None)
+                delivered += len(events)
+                continue
+            reason = f"HTTP {status_code}"
+        endpoint.failures += 1
+        update_endpoint(
+            endpoint,
+            failures=endpoint.failures,
+            next_attempt_at=timezone.now() + retry_delay(endpoint.failures),
+        )
+        failures.append((endpoint.url, reason))
+    return DeliveryResult(len(endpoints), delivered, failures)
+
+
+def update_endpoint(endpoint: WebhookEndpoint, **values: Any) -> None:
+    """Record the outcome of a delivery, releasing the endpoint's lease."""
+    WebhookEndpoint.objects.filter(pk=endpoint.pk).update(**values)